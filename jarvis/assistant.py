@@ -22,6 +22,9 @@ from jarvis.modules.calendar import CalendarManager
 from jarvis.modules.search import WebSearch
 from jarvis.modules.files import FileManager
 from jarvis.modules.system import SystemControl
+from jarvis.utils.readiness import Readiness
+from jarvis.utils.persistence import flush_all
+from jarvis.utils.sentences import iter_sentences
 
 # Настройка логирования
 logging.basicConfig(
@@ -47,17 +50,25 @@ class JarvisAssistant:
         # Инициализация основных компонентов
         logger.info("Инициализация JARVIS...")
         
-        self.speech_recognizer = SpeechRecognizer(self.config)
+        # Тяжёлые модели (Vosk, LLM, эмбеддинги) грузятся в фоне,
+        # готовность каждой отслеживается отдельно
+        self.readiness = Readiness()
+        
         self.speech_synthesizer = SpeechSynthesizer(self.config)
-        self.nlp_processor = NLPProcessor(self.config)
-        self.memory_system = MemorySystem(self.config)
+        self.readiness.mark_ready('tts')
+        
+        self.speech_recognizer = SpeechRecognizer(self.config, lazy=True)
+        self.nlp_processor = NLPProcessor(self.config, lazy=True)
+        self.memory_system = MemorySystem(self.config, lazy=True)
         self.learning_system = LearningSystem(self.config, self.memory_system)
-        self.continuous_learning = ContinuousLearning(self.config, self.memory_system, self.nlp_processor)
         
-        # Связывание continuous_learning с GUI
-        if hasattr(self, 'gui') and self.gui:
-            self.continuous_learning.gui = self.gui
-            self.gui.continuous_learning = self.continuous_learning
+        # Создаётся после загрузки памяти
+        self.continuous_learning = None
+        
+        self.readiness.start('stt', self.speech_recognizer.load)
+        self.readiness.start('memory', self.memory_system.load)
+        self.readiness.start('nlp', self.nlp_processor.load)
+        self.readiness.start('learning', self._load_continuous_learning, after=['memory'])
         
         # Инициализация модулей функционала
         self.task_manager = TaskManager(self.memory_system)
@@ -69,7 +80,18 @@ class JarvisAssistant:
         # Словарь команд для быстрого доступа
         self.command_handlers = self._register_commands()
         
-        logger.info("JARVIS готов к работе!")
+        logger.info("JARVIS запущен, модели загружаются в фоне")
+    
+    def _load_continuous_learning(self):
+        """Создание системы непрерывного обучения (в фоновом потоке)"""
+        continuous_learning = ContinuousLearning(self.config, self.memory_system, self.nlp_processor)
+        
+        # Связывание continuous_learning с GUI
+        if getattr(self, 'gui', None):
+            continuous_learning.gui = self.gui
+            self.gui.continuous_learning = continuous_learning
+        
+        self.continuous_learning = continuous_learning
     
     def _load_config(self, config_path):
         """Загрузка конфигурации"""
@@ -128,14 +150,22 @@ class JarvisAssistant:
         
         return False
     
-    async def process_command(self, user_input):
-        """Обработка команды пользователя"""
+    async def process_command(self, user_input, on_sentence=None):
+        """
+        Обработка команды пользователя
+        
+        Args:
+            user_input: Текст команды
+            on_sentence: Корутина, получающая ответ LLM по предложениям
+                         во время генерации (None - ответ целиком)
+        """
         try:
-            # Логирование взаимодействия для обучения
-            interaction_id = await self.learning_system.log_interaction(user_input)
-            
-            # Получение контекста из памяти
-            context = await self.memory_system.get_context(user_input)
+            # Логирование взаимодействия и поиск контекста в памяти идут параллельно:
+            # эмбеддинг и запрос к базе выполняются в пуле памяти, не в цикле событий
+            interaction_id, context = await asyncio.gather(
+                self.learning_system.log_interaction(user_input),
+                self.memory_system.get_context(user_input)
+            )
             
             # Анализ намерения через NLP
             intent = await self.nlp_processor.analyze_intent(user_input, context)
@@ -143,7 +173,7 @@ class JarvisAssistant:
             logger.info(f"Намерение: {intent['action']}, Уверенность: {intent['confidence']}")
             
             # Выполнение команды
-            response = await self._execute_command(intent, user_input, context)
+            response = await self._execute_command(intent, user_input, context, on_sentence)
             
             # Обучение на основе результата
             await self.learning_system.learn_from_interaction(
@@ -159,7 +189,7 @@ class JarvisAssistant:
             logger.error(f"Ошибка обработки команды: {e}")
             return "Извините, произошла ошибка при обработке вашего запроса"
     
-    async def _execute_command(self, intent, user_input, context):
+    async def _execute_command(self, intent, user_input, context, on_sentence=None):
         """Выполнение конкретной команды"""
         action = intent['action']
         entities = intent.get('entities', {})
@@ -170,11 +200,20 @@ class JarvisAssistant:
                 return await handler(user_input, entities)
         
         # Если нет специфической команды - общение через LLM
-        return await self.nlp_processor.generate_response(
-            user_input, 
-            context,
-            personality="jarvis"
-        )
+        if on_sentence is None:
+            return await self.nlp_processor.generate_response(
+                user_input, 
+                context,
+                personality="jarvis"
+            )
+        
+        # Потоковый ответ: каждое готовое предложение уходит дальше, пока генерация продолжается
+        sentences = []
+        stream = self.nlp_processor.stream_response(user_input, context, personality="jarvis")
+        async for sentence in iter_sentences(stream):
+            sentences.append(sentence)
+            await on_sentence(sentence)
+        return " ".join(sentences)
     
     async def conversation_loop(self):
         """Основной цикл общения"""
@@ -211,13 +250,24 @@ class JarvisAssistant:
                     conversation_active = False
                     continue
                 
-                # Обработка команды
-                response = await self.process_command(user_input)
+                # Обработка команды: ответ LLM озвучивается по предложениям
+                # по ходу генерации, ответы команд - целиком
+                spoken = []
+                
+                async def speak_sentence(sentence):
+                    spoken.append(sentence)
+                    await self.speech_synthesizer.speak(sentence)
+                
+                streaming = self.config.get('nlp', {}).get('streaming', True)
+                response = await self.process_command(
+                    user_input, on_sentence=speak_sentence if streaming else None
+                )
                 
                 logger.info(f"JARVIS: {response}")
                 
                 # Озвучивание ответа
-                await self.speech_synthesizer.speak(response)
+                if not spoken:
+                    await self.speech_synthesizer.speak(response)
                 
             except Exception as e:
                 logger.error(f"Ошибка в цикле общения: {e}")
@@ -227,18 +277,31 @@ class JarvisAssistant:
         """Запуск ассистента"""
         self.running = True
         
+        # Приветствие и ожидание активации нужны только TTS и STT,
+        # память, LLM и обучение догружаются в фоне
+        if not await self.readiness.wait_async('stt'):
+            logger.error("Распознавание речи недоступно")
+            await self.speech_synthesizer.speak("Модуль распознавания речи недоступен, сэр")
+            await self.shutdown()
+            return
+        
+        # Контекст дня - только если память уже загружена
+        daily_context = None
+        if self.memory_system.is_ready():
+            daily_context = asyncio.ensure_future(self.memory_system.get_daily_context())
+        
         # Приветствие
-        greeting = await self._get_greeting()
+        greeting = await self._get_greeting(daily_context)
         await self.speech_synthesizer.speak(greeting)
+        logger.info(f"Время до первого ответа: {self.readiness.since_start():.1f} с")
         
         # Подтверждение готовности
         await asyncio.sleep(0.5)
         await self.speech_synthesizer.speak("Да, сэр")
         
-        # Запуск НЕПРЕРЫВНОГО обучения 24/7
+        # Запуск НЕПРЕРЫВНОГО обучения 24/7 (после загрузки)
         if self.config.get('autonomous_learning', {}).get('continuous', True):
-            asyncio.create_task(self.continuous_learning.start_continuous_learning())
-            logger.info(" НЕПРЕРЫВНОЕ обучение 24/7 запущено!")
+            asyncio.create_task(self._start_learning_when_ready())
         
         try:
             while self.running:
@@ -254,8 +317,20 @@ class JarvisAssistant:
         finally:
             await self.shutdown()
     
+    async def _start_learning_when_ready(self):
+        """Запуск непрерывного обучения после фоновой загрузки"""
+        if not await self.readiness.wait_async('learning'):
+            logger.error("Непрерывное обучение не запущено: система обучения не загружена")
+            return
+        
+        await self.continuous_learning.start_continuous_learning()
+        logger.info(" НЕПРЕРЫВНОЕ обучение 24/7 запущено!")
+    
     async def _handle_learning_command(self, user_input, entities):
         """Обработка команд обучения"""
+        if self.continuous_learning is None:
+            return "Система обучения ещё загружается, сэр"
+        
         if "статистика" in user_input.lower() or "отчет" in user_input.lower():
             stats = await self.continuous_learning.get_realtime_stats()
             response = f"Статистика непрерывного обучения:\n"
@@ -281,6 +356,9 @@ class JarvisAssistant:
     
     async def _get_learning_report(self, user_input, entities):
         """Получение подробного отчета об обучении"""
+        if self.continuous_learning is None:
+            return "Система обучения ещё загружается, сэр"
+        
         stats = await self.continuous_learning.get_realtime_stats()
         
         response = " ПОДРОБНЫЙ ОТЧЕТ О НЕПРЕРЫВНОМ ОБУЧЕНИИ\n\n"
@@ -295,8 +373,13 @@ class JarvisAssistant:
         
         return response
     
-    async def _get_greeting(self):
-        """Получение приветствия в зависимости от времени"""
+    async def _get_greeting(self, daily_context=None):
+        """
+        Получение приветствия в зависимости от времени
+        
+        Args:
+            daily_context: Уже запущенная загрузка контекста дня (опционально)
+        """
         hour = datetime.now().hour
         
         if 5 <= hour < 12:
@@ -308,8 +391,12 @@ class JarvisAssistant:
         else:
             greeting = "Доброй ночи, сэр"
         
-        # Добавление персонализированной информации
-        context = await self.memory_system.get_daily_context()
+        # Добавление персонализированной информации (если память уже загружена)
+        if daily_context is None:
+            if not self.memory_system.is_ready():
+                return greeting
+            daily_context = self.memory_system.get_daily_context()
+        context = await daily_context
         if context.get('pending_tasks'):
             greeting += f". У вас {len(context['pending_tasks'])} задач на сегодня"
         
@@ -326,6 +413,9 @@ class JarvisAssistant:
         # Закрытие соединений
         await self.memory_system.close()
         
+        # Запись отложенных JSON-файлов (профиль, задачи, календарь, статистика)
+        flush_all()
+        
         await self.speech_synthesizer.speak("Система отключена. До свидания, сэр")
         logger.info("JARVIS отключен")
 
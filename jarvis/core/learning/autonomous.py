@@ -14,7 +14,8 @@ import feedparser
 import requests
 from bs4 import BeautifulSoup
 from ddgs import DDGS
-import hashlib
+
+from jarvis.utils.persistence import save_json_later
 
 logger = logging.getLogger(__name__)
 
@@ -73,9 +74,7 @@ class AutonomousLearning:
     
     def _save_topics(self, topics: List[str]):
         """Сохранение тем"""
-        topics_file = Path("data/learning_topics.json")
-        with open(topics_file, 'w', encoding='utf-8') as f:
-            json.dump({'topics': topics}, f, ensure_ascii=False, indent=2)
+        save_json_later(Path("data/learning_topics.json"), lambda: {'topics': topics})
     
     def _get_news_sources(self) -> List[Dict]:
         """RSS-ленты для обучения"""
@@ -199,7 +198,7 @@ class AutonomousLearning:
                     knowledge = f"Статья: {title}. {summary}"
                     
                     # Сохранение в память
-                    await self.memory.store_memory(
+                    await self.memory.ingest_async(
                         knowledge,
                         memory_type="learned_knowledge",
                         metadata={
@@ -251,7 +250,7 @@ class AutonomousLearning:
                     knowledge = f"Тема '{topic}': {title}. {body}"
                     
                     # Сохранение
-                    await self.memory.store_memory(
+                    await self.memory.ingest_async(
                         knowledge,
                         memory_type="learned_knowledge",
                         metadata={
@@ -298,7 +297,7 @@ class AutonomousLearning:
                 
                 knowledge = f"Тренд: {result.get('title', '')}. {result.get('body', '')}"
                 
-                await self.memory.store_memory(
+                await self.memory.ingest_async(
                     knowledge,
                     memory_type="learned_knowledge",
                     metadata={
@@ -344,7 +343,7 @@ class AutonomousLearning:
                     summary = await self.nlp.summarize_text(text, max_length=200)
                     
                     # Сохранение детального знания
-                    await self.memory.store_memory(
+                    await self.memory.ingest_async(
                         f"Детальное изучение: {summary}",
                         memory_type="deep_knowledge",
                         metadata={
@@ -371,12 +370,9 @@ class AutonomousLearning:
         if not url:
             return True
         
-        # Создаем хэш URL для быстрой проверки
-        url_hash = hashlib.md5(url.encode()).hexdigest()
-        
-        # Ищем в памяти
+        # Точный поиск URL по лексическому индексу (без эмбеддинга)
         try:
-            results = await self.memory.recall_memory(url_hash, n_results=1)
+            results = await self.memory.recall_memory(url, n_results=1, exact=True)
             return len(results) > 0
         except:
             return False
@@ -411,10 +407,8 @@ class AutonomousLearning:
             logger.error(f"  ❌ Ошибка обновления интересов: {e}")
     
     def _save_stats(self):
-        """Сохранение статистики"""
-        stats_file = Path("data/learning_stats.json")
-        with open(stats_file, 'w', encoding='utf-8') as f:
-            json.dump(self.stats, f, ensure_ascii=False, indent=2)
+        """Сохранение статистики (отложенная атомарная запись)"""
+        save_json_later(Path("data/learning_stats.json"), lambda: self.stats)
     
     async def add_topic(self, topic: str):
         """Добавление новой темы для изучения"""
@@ -46,7 +46,8 @@ class ContinuousLearning:
         if TURBO_GPU_AVAILABLE:
             try:
                 logger.info("Инициализация Turbo GPU...")
-                self.turbo_gpu = TurboLearningSystem(batch_size=1024, num_workers=32)
+                self.turbo_gpu = TurboLearningSystem(batch_size=1024, num_workers=32,
+                                                    memory_system=memory_system)
                 logger.info("Turbo GPU готова")
             except Exception as e:
                 logger.error(f"Ошибка Turbo GPU: {e}")
@@ -27,6 +27,8 @@ import threading
 from urllib.parse import urlparse
 import hashlib
 
+from jarvis.core.memory.chunker import TextChunker, join_documents
+
 logger = logging.getLogger(__name__)
 
 
@@ -270,7 +272,8 @@ class FullWebLearningSystem:
     
     def __init__(self, turbo_system=None, memory_system=None, topics_list=None, num_workers=10):
         self.turbo_system = turbo_system
-        self.memory_system = memory_system
+        # Векторы чанков считает и сохраняет только писатель памяти
+        self.memory_system = memory_system or getattr(turbo_system, 'memory_system', None)
         self.num_workers = num_workers
         
         self.crawler = UniversalWebCrawler()
@@ -293,8 +296,6 @@ class FullWebLearningSystem:
         self.data_dir = Path('data/web_knowledge')
         self.data_dir.mkdir(parents=True, exist_ok=True)
         
-        self.embeddings_batch = []
-        self.batch_size = 300
         self.lock = threading.Lock()
         
         # Dashboard support
@@ -390,82 +391,33 @@ class FullWebLearningSystem:
             if self.dashboard and thread_id is not None:
                 self.dashboard.update_thread_status(thread_id, topic, 'saving')
             
-            # Сохраняем в память - BATCH метод с массовым добавлением!
+            # Сохраняем в память через очередь пакетной записи
             memory_added = 0
             if self.memory_system:
-                logger.info(f"Попытка сохранить {topic} в память...")
                 try:
-                    chunks = self._split_content(full_content, max_size=400)
-                    logger.info(f"Создано {len(chunks)} чанков для {topic}")
+                    # Чанки по предложениям под окно модели эмбеддингов. Каждый чанк
+                    # кодируется один раз - писателем памяти, общей моделью
+                    chunks = self._chunker().chunks(join_documents(all_content), prefix=f"{topic}: ")
                     
-                    # ТУРБО ОПТИМИЗАЦИЯ: Batch добавление ВСЕХ чанков сразу!
-                    if chunks[:5]:
-                        import datetime
-                        
-                        # МЕТОД 1: Прямой доступ к ChromaDB (быстро)
-                        try:
-                            # Подготовка batch данных
-                            batch_embeddings = []
-                            batch_documents = []
-                            batch_metadatas = []
-                            batch_ids = []
-                            
-                            # Генерация эмбеддингов для ВСЕХ чанков СРАЗУ (векторизация!)
-                            texts = [f"{topic}: {chunk}" for chunk in chunks[:5]]
-                            batch_embeddings = self.memory_system.embedder.encode(texts).tolist()
-                            
-                            # Подготовка метаданных
-                            base_timestamp = datetime.datetime.now().timestamp()
-                            for idx, (chunk, embedding) in enumerate(zip(chunks[:5], batch_embeddings)):
-                                batch_documents.append(f"{topic}: {chunk}")
-                                batch_metadatas.append({
-                                    'type': 'knowledge',
-                                    'timestamp': datetime.datetime.now().isoformat(),
-                                    'importance': 0.7,
-                                    'topic': topic,
-                                    'source': 'web_crawler',
-                                    'auto_learned': True
-                                })
-                                batch_ids.append(f"knowledge_{base_timestamp}_{idx}")
-                            
-                            # МАССОВОЕ добавление одним вызовом!
-                            self.memory_system.collection.add(
-                                embeddings=batch_embeddings,
-                                documents=batch_documents,
-                                metadatas=batch_metadatas,
-                                ids=batch_ids
-                            )
-                            
-                            memory_added = len(batch_documents)
-                            logger.info(f"✅ Batch сохранение: {memory_added} записей")
-                            
-                        except Exception as batch_error:
-                            logger.warning(f"Batch метод не сработал: {batch_error}")
-                            logger.info("Переключаюсь на асинхронный метод...")
-                            
-                            # МЕТОД 2: FALLBACK - асинхронный метод через asyncio (медленнее, но надёжнее)
-                            import asyncio
-                            for chunk in chunks[:5]:
-                                try:
-                                    asyncio.run(self.memory_system.store_memory(
-                                        content=f"{topic}: {chunk}",
-                                        memory_type="knowledge",
-                                        metadata={
-                                            'topic': topic,
-                                            'source': 'web_crawler',
-                                            'auto_learned': True
-                                        }
-                                    ))
-                                    memory_added += 1
-                                except Exception as e:
-                                    logger.error(f"Ошибка сохранения чанка: {e}")
-                            
-                            logger.info(f"✅ Async сохранение: {memory_added} записей")
-                        
-                        with self.lock:
-                            self.stats['memory_records_added'] += memory_added
-                        
-                        logger.info(f"В память добавлено {memory_added} записей для {topic}")
+                    # Писатель памяти объединит чанки всех потоков в крупные батчи
+                    for chunk in chunks:
+                        accepted = self.memory_system.ingest(
+                            content=chunk,
+                            memory_type="knowledge",
+                            metadata={
+                                'importance': 0.7,
+                                'topic': topic,
+                                'source': 'web_crawler',
+                                'auto_learned': True
+                            }
+                        )
+                        if accepted:
+                            memory_added += 1
+                    
+                    with self.lock:
+                        self.stats['memory_records_added'] += memory_added
+                    
+                    logger.info(f"В очередь памяти поставлено {memory_added} записей для {topic}")
                 
                 except Exception as e:
                     logger.error(f"Ошибка памяти для {topic}: {e}", exc_info=True)
@@ -479,12 +431,6 @@ class FullWebLearningSystem:
                 'entities': list(entities)[:20],
             })
             
-            # Embeddings
-            chunks = self._split_content(full_content)
-            with self.lock:
-                for chunk in chunks:
-                    self.embeddings_batch.append(f"{topic}: {chunk}")
-            
             with self.lock:
                 self.studied_topics.add(topic)
                 self.stats['topics_studied'] += 1
@@ -508,21 +454,6 @@ class FullWebLearningSystem:
             
             return False
     
-    def process_embeddings_batch(self):
-        """Обработка embeddings"""
-        with self.lock:
-            if not self.embeddings_batch or not self.turbo_system:
-                return
-            
-            batch = self.embeddings_batch.copy()
-            self.embeddings_batch = []
-        
-        try:
-            self.turbo_system.learn_batch(batch, category="web")
-            logger.info(f"GPU: {len(batch)} embeddings")
-        except Exception as e:
-            logger.debug(f"GPU ошибка: {e}")
-    
     def start_web_learning(self):
         """Запуск веб-обучения"""
         logger.info("="*80)
@@ -561,9 +492,6 @@ class FullWebLearningSystem:
                     for future in as_completed(futures):
                         processed += 1
                         
-                        if len(self.embeddings_batch) >= self.batch_size:
-                            self.process_embeddings_batch()
-                        
                         if processed % 50 == 0:
                             self._print_stats(processed, total_topics)
         
@@ -571,8 +499,9 @@ class FullWebLearningSystem:
             logger.info("\nОстановка")
         
         finally:
-            if self.embeddings_batch:
-                self.process_embeddings_batch()
+            # Дожидаемся записи всех поставленных в очередь чанков
+            if self.memory_system:
+                self.memory_system.flush(timeout=60)
             
             self._print_final_stats(total_topics)
     
@@ -581,11 +510,11 @@ class FullWebLearningSystem:
         """Алиас для start_web_learning()"""
         return self.start_web_learning()
     
-    def _split_content(self, content, max_size=1500):
-        chunks = []
-        for i in range(0, len(content), max_size):
-            chunks.append(content[i:i+max_size])
-        return chunks
+    def _chunker(self):
+        """Чанкер под окно модели эмбеддингов (общий с памятью)"""
+        if self.memory_system:
+            return self.memory_system.text_chunker()
+        return TextChunker()
     
     def _save_fast(self, topic, data):
         try:
@@ -24,6 +24,8 @@ from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 
+from jarvis.core.memory.chunker import TextChunker, join_documents
+
 logger = logging.getLogger(__name__)
 
 
@@ -258,7 +260,8 @@ class HybridLearningSystem:
     
     def __init__(self, turbo_system=None, memory_system=None, topics_list=None, num_workers=15):
         self.turbo_system = turbo_system
-        self.memory_system = memory_system  # ВАЖНО: для сохранения в память
+        # ВАЖНО: для сохранения в память (векторы чанков считает только её писатель)
+        self.memory_system = memory_system or getattr(turbo_system, 'memory_system', None)
         self.num_workers = num_workers
         
         # Компоненты
@@ -285,9 +288,6 @@ class HybridLearningSystem:
         self.data_dir = Path('data/hybrid_knowledge')
         self.data_dir.mkdir(parents=True, exist_ok=True)
         
-        # Batch для embeddings
-        self.embeddings_batch = []
-        self.batch_size = 500
         self.lock = threading.Lock()
         
         logger.info(f"Hybrid Learning готова ({num_workers} потоков)")
@@ -335,12 +335,12 @@ class HybridLearningSystem:
             # ВАЖНО: Сохраняем в memory_system!
             if self.memory_system:
                 try:
-                    # Разбиваем на чанки для памяти
-                    chunks = self._split_fast(full_content, max_size=500)
+                    # Чанки для памяти: каждый кодируется один раз, общей моделью
+                    chunks = self._chunker().chunks(join_documents(all_content), prefix=f"{topic}: ")
                     
-                    for chunk in chunks[:5]:  # Только первые 5 чанков
-                        self.memory_system.add_memory(
-                            content=f"{topic}: {chunk}",
+                    for chunk in chunks:
+                        self.memory_system.ingest(
+                            content=chunk,
                             memory_type="knowledge",
                             metadata={
                                 'topic': topic,
@@ -351,12 +351,6 @@ class HybridLearningSystem:
                 except Exception as e:
                     logger.debug(f"Ошибка сохранения в память: {e}")
             
-            # Embeddings в batch
-            chunks = self._split_fast(full_content)
-            with self.lock:
-                for chunk in chunks:
-                    self.embeddings_batch.append(f"{topic}: {chunk}")
-            
             # Статистика
             with self.lock:
                 self.studied_topics.add(topic)
@@ -371,21 +365,6 @@ class HybridLearningSystem:
             logger.debug(f"Ошибка {topic}: {e}")
             return False
     
-    def process_embeddings_batch(self):
-        """Обработка накопленных embeddings"""
-        with self.lock:
-            if not self.embeddings_batch or not self.turbo_system:
-                return
-            
-            batch = self.embeddings_batch.copy()
-            self.embeddings_batch = []
-        
-        try:
-            self.turbo_system.learn_batch(batch, category="hybrid")
-            logger.info(f"✅ GPU: {len(batch)} embeddings")
-        except Exception as e:
-            logger.error(f"Ошибка GPU: {e}")
-    
     def start_hybrid_learning(self):
         """Запуск многопоточного обучения"""
         logger.info("="*80)
@@ -416,10 +395,6 @@ class HybridLearningSystem:
                     for future in as_completed(futures):
                         processed += 1
                         
-                        # Каждые 100 тем - embeddings
-                        if len(self.embeddings_batch) >= self.batch_size:
-                            self.process_embeddings_batch()
-                        
                         # Статистика каждые 100 тем
                         if processed % 100 == 0:
                             self._print_stats(processed, total_topics)
@@ -428,18 +403,17 @@ class HybridLearningSystem:
             logger.info("\n⚠ Остановка")
         
         finally:
-            # Оставшиеся embeddings
-            if self.embeddings_batch:
-                self.process_embeddings_batch()
+            # Дожидаемся записи всех поставленных в очередь чанков
+            if self.memory_system:
+                self.memory_system.flush(timeout=60)
             
             self._print_final_stats(total_topics)
     
-    def _split_fast(self, content, max_size=1500):
-        """Быстрая разбивка"""
-        chunks = []
-        for i in range(0, len(content), max_size):
-            chunks.append(content[i:i+max_size])
-        return chunks
+    def _chunker(self):
+        """Чанкер под окно модели эмбеддингов (общий с памятью)"""
+        if self.memory_system:
+            return self.memory_system.text_chunker()
+        return TextChunker()
     
     def _save_fast(self, topic, data):
         """Быстрое сохранение"""
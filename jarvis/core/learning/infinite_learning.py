@@ -22,6 +22,8 @@ from collections import defaultdict, deque
 from datetime import datetime
 import hashlib
 
+from jarvis.core.memory.chunker import TextChunker
+
 logger = logging.getLogger(__name__)
 
 
@@ -537,6 +539,7 @@ class InfiniteLearningSystem:
     
     def __init__(self, turbo_system=None, initial_topics=None):
         self.turbo_system = turbo_system
+        self._text_chunker = None
         
         # Компоненты
         self.wiki_collector = MultilingualWikipediaCollector()
@@ -651,18 +654,21 @@ class InfiniteLearningSystem:
                 'timestamp': datetime.now().isoformat()
             })
             
-            # 6. Создаем embeddings
-            if self.turbo_system:
+            # 6. Создаем embeddings - писателем системы памяти. Без неё векторы
+            # некуда сохранить: тема остаётся в JSON и загружается позже
+            # через memory.import_knowledge, кодирование пропускается
+            if getattr(self.turbo_system, 'memory_system', None) is not None:
                 try:
-                    chunks = self._split_content(full_content)
-                    chunks_ctx = [f"{topic}: {chunk}" for chunk in chunks]
+                    chunks = list(self._chunker().chunks(full_content, prefix=f"{topic}: "))
                     
-                    self.turbo_system.learn_batch(chunks_ctx, category="infinite")
+                    result = self.turbo_system.learn_batch(chunks, category="infinite")
                     
-                    logger.info(f"✅ Создано {len(chunks)} embeddings")
+                    logger.info(f"✅ Обработано {result['processed'] if result else 0} чанков")
                 
                 except Exception as e:
                     logger.error(f"Ошибка embeddings: {e}")
+            elif self.turbo_system:
+                logger.debug(f"Нет системы памяти - embeddings для '{topic}' не создаются")
             
             # Обновляем статистику
             self.studied_topics.add(topic)
@@ -728,24 +734,14 @@ class InfiniteLearningSystem:
         finally:
             self._print_final_stats()
     
-    def _split_content(self, content, max_size=2000):
-        """Разбивка на чанки"""
-        chunks = []
-        paragraphs = content.split('\n\n')
-        current = ""
-        
-        for para in paragraphs:
-            if len(current) + len(para) < max_size:
-                current += para + "\n\n"
-            else:
-                if current:
-                    chunks.append(current.strip())
-                current = para + "\n\n"
-        
-        if current:
-            chunks.append(current.strip())
-        
-        return chunks
+    def _chunker(self):
+        """Чанкер под окно модели эмбеддингов turbo-системы"""
+        memory_system = getattr(self.turbo_system, 'memory_system', None)
+        if memory_system is not None:
+            return memory_system.text_chunker()
+        if self._text_chunker is None:
+            self._text_chunker = TextChunker.for_model(getattr(self.turbo_system, 'embeddings', None))
+        return self._text_chunker
     
     def _save_topic_data(self, topic, data):
         """Сохранение данных темы"""
@@ -106,7 +106,11 @@ class LearningDashboard:
         # Прогресс бар
         progress_bar = self.get_progress_bar(studied, total_topics, width=85)
         print(f"│ Прогресс:     {progress_bar} │")
-        print(f"│ В памяти:     {self.fwl.stats['memory_records_added']:>15,} записей │ Страниц: {self.fwl.stats['pages_crawled']:>9,} │ Доменов: {self.fwl.stats['sources_collected']:>6} │")
+        # Всего записей в памяти - из счётчиков системы памяти (без скана базы)
+        memory_records = self.fwl.stats['memory_records_added']
+        if self.fwl.memory_system:
+            memory_records = self.fwl.memory_system.stats()['total']
+        print(f"│ В памяти:     {memory_records:>15,} записей │ Страниц: {self.fwl.stats['pages_crawled']:>9,} │ Доменов: {self.fwl.stats['sources_collected']:>6} │")
         print("└─────────────────────────────────────────────────────────────────────────────────────────┘")
         print()
         
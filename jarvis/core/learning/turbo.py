@@ -77,14 +77,32 @@ class GPUEmbeddings:
 class TurboLearningSystem:
     """Система турбо-обучения с GPU"""
     
-    def __init__(self, batch_size=512, num_workers=32):
+    def __init__(self, batch_size=512, num_workers=32, memory_system=None):
+        """
+        Args:
+            batch_size: Размер батча кодирования
+            num_workers: Число потоков обучения
+            memory_system: Система памяти. Если задана, батчи уходят в её очередь
+                           записи и кодируются её моделью эмбеддингов один раз -
+                           отдельная копия модели на GPU не загружается
+        """
         print("\n🚀 Инициализация Turbo Learning System...")
         
         self.batch_size = batch_size
         self.num_workers = num_workers
-        
-        # GPU Embeddings
-        self.embeddings = GPUEmbeddings()
+        self.memory_system = memory_system
+        
+        # GPU Embeddings (только без системы памяти)
+        self._gpu_embeddings = None
+        if memory_system is None:
+            self._gpu_embeddings = GPUEmbeddings()
+            
+            # Включаем все GPU оптимизации
+            torch.backends.cudnn.benchmark = True
+            torch.backends.cudnn.enabled = True
+            print("  ✓ cuDNN оптимизации включены")
+        else:
+            print("  ✓ Embeddings: общая модель системы памяти")
         
         print(f"  ✓ Batch size: {batch_size}")
         print(f"  ✓ Workers: {num_workers}")
@@ -93,24 +111,56 @@ class TurboLearningSystem:
         self.total_processed = 0
         self.start_time = None
         
-        # Включаем все GPU оптимизации
-        torch.backends.cudnn.benchmark = True
-        torch.backends.cudnn.enabled = True
-        
-        print("  ✓ cuDNN оптимизации включены")
         print("\n✅ Turbo система готова!\n")
     
+    @property
+    def embeddings(self):
+        """Модель эмбеддингов (общая с памятью, если она задана)"""
+        if self.memory_system is not None:
+            return self.memory_system.embedder
+        return self._gpu_embeddings
+    
     def learn_batch(self, topics, category="mixed"):
-        """Обучение батча НА GPU"""
+        """
+        Обучение батча
+        
+        С системой памяти тексты ставятся в её очередь пакетной записи:
+        писатель кодирует их вместе с остальными записями и сохраняет
+        векторы в векторное хранилище. Без неё батч кодируется на GPU,
+        эмбеддинги возвращаются вызывающему.
+        """
         
         if not topics:
             return
         
         batch_start = time.time()
         
+        if self.memory_system is not None:
+            accepted = 0
+            for text in topics:
+                if self.memory_system.ingest(
+                    content=text,
+                    memory_type="knowledge",
+                    metadata={
+                        'importance': 0.6,
+                        'source': f"turbo_{category}",
+                        'auto_learned': True
+                    }
+                ):
+                    accepted += 1
+            
+            batch_time = time.time() - batch_start
+            self.total_processed += accepted
+            
+            return {
+                'processed': accepted,
+                'time': batch_time,
+                'speed': accepted / batch_time if batch_time > 0 else 0,
+            }
+        
         # Генерируем embeddings НА GPU
         with torch.cuda.amp.autocast():  # Mixed precision для скорости
-            embeddings = self.embeddings.encode(
+            embeddings = self._gpu_embeddings.encode(
                 topics,
                 batch_size=self.batch_size,
                 show_progress=False
@@ -120,14 +170,6 @@ class TurboLearningSystem:
         if not embeddings.is_cuda:
             raise RuntimeError("❌ Embeddings не на CUDA!")
         
-        # Симулируем обработку (в реальности здесь сохранение в векторную БД)
-        # Держим данные на GPU для демонстрации нагрузки
-        _ = torch.nn.functional.cosine_similarity(
-            embeddings.unsqueeze(1),
-            embeddings.unsqueeze(0),
-            dim=2
-        )
-        
         batch_time = time.time() - batch_start
         
         self.total_processed += len(topics)
@@ -137,6 +179,7 @@ class TurboLearningSystem:
             'time': batch_time,
             'speed': len(topics) / batch_time if batch_time > 0 else 0,
             'gpu_memory_mb': torch.cuda.memory_allocated(0) / 1024**2,
+            'embeddings': embeddings,
         }
     
     def get_stats(self):
@@ -147,11 +190,13 @@ class TurboLearningSystem:
         else:
             speed = 0
         
-        return {
+        stats = {
             'total_processed': self.total_processed,
             'speed': speed,
-            'gpu_info': self.embeddings.get_device_info(),
         }
+        if self._gpu_embeddings is not None:
+            stats['gpu_info'] = self._gpu_embeddings.get_device_info()
+        return stats
 
 
 def test_gpu_load():
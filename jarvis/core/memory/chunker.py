@@ -0,0 +1,207 @@
+"""
+Разбиение текста на чанки для эмбеддингов
+Потоковое: принимает генератор фрагментов текста, режет по границам
+предложений под бюджет токенов модели (max_seq_length) с перекрытием
+"""
+
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# max_seq_length у paraphrase-multilingual-MiniLM-L12-v2
+DEFAULT_MAX_TOKENS = 128
+
+# Служебные токены модели ([CLS], [SEP])
+SPECIAL_TOKENS = 2
+
+_SENTENCE_END = re.compile(r'(?:(?<=[.!?…])|(?<=[.!?…]["»)\]]))\s+|\n\s*\n')
+_WORD = re.compile(r'\w+|[^\w\s]')
+
+
+def estimate_tokens(text):
+    """
+    Оценка числа токенов без токенизатора
+
+    Многоязычные wordpiece-словари режут русские слова на несколько частей,
+    поэтому слово считается как один токен на каждые 4 символа.
+    """
+    return sum(max(1, (len(word) + 3) // 4) if word[0].isalnum() else 1 for word in _WORD.findall(text))
+
+
+def join_documents(documents):
+    """Поток фрагментов из нескольких документов (между ними - граница абзаца)"""
+    for document in documents:
+        if document:
+            yield document
+            yield "\n\n"
+
+
+def _find_model_attr(model, name, depth=3):
+    """Атрибут модели с учётом обёрток (CachedEmbedder.model и т.п.)"""
+    for _ in range(depth):
+        if model is None:
+            return None
+        value = getattr(model, name, None)
+        if value is not None:
+            return value
+        model = getattr(model, 'model', None)
+    return None
+
+
+class TextChunker:
+    """Чанки по предложениям, заполняющие окно модели эмбеддингов"""
+
+    def __init__(self, max_tokens=DEFAULT_MAX_TOKENS, overlap_tokens=16, count_tokens=None,
+                 max_chunks=None):
+        """
+        Args:
+            max_tokens: Окно модели в токенах (вместе со служебными)
+            overlap_tokens: Сколько токенов конца чанка повторять в начале следующего
+                            (целыми предложениями)
+            count_tokens: Функция подсчёта токенов строки (None - estimate_tokens)
+            max_chunks: Максимум чанков на один текст (None - без ограничения)
+        """
+        self.max_tokens = max_tokens
+        self.budget = max(8, max_tokens - SPECIAL_TOKENS)
+        self.overlap_tokens = min(overlap_tokens, self.budget // 2)
+        self.count_tokens = count_tokens or estimate_tokens
+        self.max_chunks = max_chunks
+
+    @classmethod
+    def for_model(cls, model, overlap_tokens=16, max_tokens=None, max_chunks=None):
+        """
+        Чанкер под модель эмбеддингов: окно - max_seq_length модели,
+        подсчёт - её токенизатором (если он доступен)
+
+        Args:
+            model: Модель с encode (SentenceTransformer, OnnxEmbedder, CachedEmbedder)
+            overlap_tokens: Перекрытие в токенах
+            max_tokens: Явное окно (None - из модели)
+            max_chunks: Максимум чанков на текст
+        """
+        if max_tokens is None:
+            max_tokens = _find_model_attr(model, 'max_seq_length') or DEFAULT_MAX_TOKENS
+
+        count_tokens = None
+        tokenizer = _find_model_attr(model, 'tokenizer')
+        if tokenizer is not None and hasattr(tokenizer, 'tokenize'):
+            count_tokens = lambda text: len(tokenizer.tokenize(text))
+
+        return cls(max_tokens=int(max_tokens), overlap_tokens=overlap_tokens,
+                   count_tokens=count_tokens, max_chunks=max_chunks)
+
+    def split(self, text, prefix=""):
+        """Список чанков одного текста"""
+        return list(self.chunks([text], prefix=prefix))
+
+    def chunks(self, pieces, prefix=""):
+        """
+        Потоковая нарезка
+
+        Args:
+            pieces: Строка или итерируемое фрагментов текста (склеиваются как есть)
+            prefix: Префикс каждого чанка (например, "тема: "), входит в бюджет
+
+        Yields:
+            str: Чанки с префиксом
+        """
+        if isinstance(pieces, str):
+            pieces = [pieces]
+
+        # Префикс занимает не больше половины окна
+        budget = max(self.budget // 2, self.budget - (self.count_tokens(prefix) if prefix else 0))
+        produced = 0
+
+        for chunk in self._pack(self._sentences(pieces), budget):
+            yield prefix + chunk
+            produced += 1
+            if self.max_chunks is not None and produced >= self.max_chunks:
+                return
+
+    def _sentences(self, pieces):
+        """Предложения по мере поступления текста"""
+        pending = ""
+        for piece in pieces:
+            if not piece:
+                continue
+            pending += piece
+            parts = _SENTENCE_END.split(pending)
+            # Последняя часть может быть незаконченным предложением
+            pending = parts.pop()
+            for sentence in parts:
+                sentence = " ".join(sentence.split())
+                if sentence:
+                    yield sentence
+
+        sentence = " ".join(pending.split())
+        if sentence:
+            yield sentence
+
+    def _pack(self, sentences, budget):
+        """Сборка предложений в чанки не длиннее бюджета"""
+        current = []
+        current_tokens = 0
+
+        for sentence in sentences:
+            tokens = self.count_tokens(sentence)
+
+            if tokens > budget:
+                # Слишком длинное предложение режется по словам: первая часть
+                # дополняет текущий чанк, последняя открывает следующий
+                parts = list(self._split_long(sentence, budget, first_budget=budget - current_tokens))
+                for part, count in parts[:-1]:
+                    if part:
+                        current.append((part, count))
+                    if current:
+                        yield " ".join(text for text, _ in current)
+                    current = []
+                if current:
+                    yield " ".join(text for text, _ in current)
+                current = [parts[-1]]
+                current_tokens = parts[-1][1]
+                continue
+
+            if current and current_tokens + tokens > budget:
+                yield " ".join(text for text, _ in current)
+                current = self._overlap(current, budget - tokens)
+                current_tokens = sum(count for _, count in current)
+
+            current.append((sentence, tokens))
+            current_tokens += tokens
+
+        if current:
+            yield " ".join(text for text, _ in current)
+
+    def _overlap(self, sentences, room):
+        """Хвост предыдущего чанка целыми предложениями в пределах overlap_tokens"""
+        limit = min(self.overlap_tokens, room)
+        tail = []
+        total = 0
+        for sentence, tokens in reversed(sentences):
+            if total + tokens > limit:
+                break
+            tail.insert(0, (sentence, tokens))
+            total += tokens
+        return tail
+
+    def _split_long(self, sentence, budget, first_budget):
+        """
+        Нарезка предложения по словам
+
+        Yields:
+            tuple: (часть, токены); первая часть не длиннее first_budget
+                   и может быть пустой
+        """
+        limit = first_budget
+        current = []
+        current_tokens = 0
+        for word in sentence.split():
+            tokens = self.count_tokens(word)
+            if current_tokens + tokens > limit and (current or limit < budget):
+                yield " ".join(current), current_tokens
+                current, current_tokens = [], 0
+                limit = budget
+            current.append(word)
+            current_tokens += tokens
+        yield " ".join(current), current_tokens
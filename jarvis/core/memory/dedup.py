@@ -0,0 +1,314 @@
+"""
+Подавление дубликатов при записи в память
+Точные дубликаты - по детерминированному id и хэшу содержимого,
+почти-дубликаты - по косинусной близости
+"""
+
+import hashlib
+import logging
+from datetime import datetime
+
+import numpy as np
+
+from jarvis.core.memory.embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Типы, для которых проверяется смысловая близость (персональные записи - только точное совпадение)
+DEFAULT_NEAR_DUPLICATE_TYPES = [
+    'knowledge', 'learned_knowledge', 'deep_knowledge', 'continuous_learning', 'conversation'
+]
+
+
+def content_hash(text):
+    """Хэш нормализованного содержимого"""
+    return hashlib.sha1(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+def make_memory_id(meta):
+    """
+    Детерминированный id записи: тип + хэш содержимого + тема + источник
+
+    Одно и то же содержимое из того же источника всегда получает тот же id,
+    поэтому повторное обучение не создаёт новых строк.
+
+    Args:
+        meta: Метаданные записи (с content_hash)
+
+    Returns:
+        str: id вида "<type>_<хэш>"
+    """
+    key = "\x1f".join(str(meta.get(field) or '') for field in ('type', 'content_hash', 'topic', 'source', 'url'))
+    return f"{meta.get('type', 'general')}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]}"
+
+
+class Deduplicator:
+    """Фильтр дубликатов для пакетной записи"""
+
+    def __init__(self, collection, enabled=True, threshold=0.95, near_types=None,
+                 repeat_importance_step=0.05, repeat_importance_cap=0.6):
+        """
+        Args:
+            collection: Векторное хранилище (VectorStore)
+            enabled: Включена ли дедупликация
+            threshold: Порог косинусной близости для почти-дубликатов
+            near_types: Типы памяти с проверкой почти-дубликатов
+            repeat_importance_step: Прибавка importance за каждую повторную встречу
+            repeat_importance_cap: Предел, до которого повторы поднимают importance
+                                   (ниже порогов хранения при очистке и горячего уровня)
+        """
+        self.collection = collection
+        self.enabled = enabled
+        self.threshold = threshold
+        self.near_types = set(near_types if near_types is not None else DEFAULT_NEAR_DUPLICATE_TYPES)
+        self.repeat_importance_step = repeat_importance_step
+        self.repeat_importance_cap = repeat_importance_cap
+
+        self.stats = {
+            'exact_duplicates': 0,
+            'near_duplicates': 0,
+            'inserted': 0,
+        }
+
+    def prepare(self, documents, metadatas, encode):
+        """
+        Отбор новых записей из батча
+
+        Каждой записи назначается детерминированный id (make_memory_id).
+        Записи с уже сохранёнными id и дубликаты того же типа не добавляются
+        и не кодируются: у сохранённой записи увеличивается seen_count, а
+        importance растёт не выше repeat_importance_cap (при выключенной
+        дедупликации - обновляются метаданные).
+
+        Args:
+            documents: Тексты записей
+            metadatas: Метаданные записей (дополняются content_hash)
+            encode: Функция кодирования списка текстов
+
+        Returns:
+            tuple: (ids, documents, metadatas, embeddings) для добавления
+        """
+        for doc, meta in zip(documents, metadatas):
+            meta.setdefault('content_hash', content_hash(doc))
+            meta.setdefault('seen_count', 1)
+
+        # Накопленные повторы для уже сохранённых записей: id -> (meta, сколько раз)
+        bumps = {}
+
+        # 1. Повторы id внутри батча и уже сохранённые id - без кодирования
+        candidates = {}
+        for idx, meta in enumerate(metadatas):
+            memory_id = make_memory_id(meta)
+            if memory_id in candidates:
+                candidates[memory_id]['repeats'] += 1
+                self.stats['exact_duplicates'] += 1
+            else:
+                candidates[memory_id] = {'idx': idx, 'repeats': 0}
+
+        existing = self._find_by_ids(list(candidates.keys()))
+        new_ids = []
+        for memory_id, info in candidates.items():
+            if memory_id in existing:
+                if self.enabled:
+                    self._add_bump(bumps, memory_id, existing[memory_id], info['repeats'] + 1)
+                else:
+                    # Upsert без эмбеддинга: содержимое то же, меняются только метаданные
+                    self._add_replace(bumps, memory_id, metadatas[info['idx']])
+                self.stats['exact_duplicates'] += 1
+            else:
+                new_ids.append(memory_id)
+                metadatas[info['idx']]['seen_count'] += info['repeats']
+
+        if not self.enabled:
+            self._apply_bumps(bumps)
+            ids, documents, metadatas = self._select(new_ids, candidates, documents, metadatas)
+            embeddings = np.asarray(encode(documents), dtype=np.float32) if documents else np.zeros((0, 0))
+            self.stats['inserted'] += len(documents)
+            return ids, documents, metadatas, embeddings
+
+        # 2. То же содержимое того же типа под другим id (другая тема или источник) - по хэшу
+        by_hash = {}
+        for memory_id in new_ids:
+            meta = metadatas[candidates[memory_id]['idx']]
+            key = (meta.get('type'), meta['content_hash'])
+            if key in by_hash:
+                first = metadatas[candidates[by_hash[key]]['idx']]
+                first['seen_count'] += meta['seen_count']
+                self.stats['exact_duplicates'] += 1
+            else:
+                by_hash[key] = memory_id
+
+        existing = self._find_by_hash(list(by_hash.keys()))
+        unique_ids = []
+        for key, memory_id in by_hash.items():
+            if key in existing:
+                existing_id, meta = existing[key]
+                self._add_bump(bumps, existing_id, meta, metadatas[candidates[memory_id]['idx']]['seen_count'])
+                self.stats['exact_duplicates'] += 1
+            else:
+                unique_ids.append(memory_id)
+
+        ids, documents, metadatas = self._select(unique_ids, candidates, documents, metadatas)
+
+        if not documents:
+            self._apply_bumps(bumps)
+            return [], [], [], np.zeros((0, 0), dtype=np.float32)
+
+        embeddings = np.asarray(encode(documents), dtype=np.float32)
+
+        # 3. Почти-дубликаты внутри батча и среди ближайших соседей в базе
+        keep = self._filter_near(documents, metadatas, embeddings, bumps)
+
+        self._apply_bumps(bumps)
+
+        ids = [ids[i] for i in keep]
+        documents = [documents[i] for i in keep]
+        metadatas = [metadatas[i] for i in keep]
+        embeddings = embeddings[keep]
+        self.stats['inserted'] += len(documents)
+
+        return ids, documents, metadatas, embeddings
+
+    @staticmethod
+    def _select(ids, candidates, documents, metadatas):
+        """Записи с выбранными id в исходном порядке батча"""
+        ids = sorted(ids, key=lambda memory_id: candidates[memory_id]['idx'])
+        indices = [candidates[memory_id]['idx'] for memory_id in ids]
+        return ids, [documents[i] for i in indices], [metadatas[i] for i in indices]
+
+    def _find_by_ids(self, ids):
+        """Уже сохранённые записи с такими id: id -> метаданные"""
+        if not ids:
+            return {}
+
+        try:
+            found = self.collection.get(ids=ids, include=["metadatas"])
+        except Exception as e:
+            logger.debug(f"Поиск по id недоступен: {e}")
+            return {}
+
+        return dict(zip(found['ids'], found['metadatas']))
+
+    def _find_by_hash(self, keys):
+        """
+        Поиск уже сохранённых записей по хэшам содержимого
+
+        Args:
+            keys: Пары (тип, хэш); один запрос на тип
+
+        Returns:
+            dict: (тип, хэш) -> (id, метаданные)
+        """
+        by_type = {}
+        for memory_type, h in keys:
+            by_type.setdefault(memory_type, []).append(h)
+
+        existing = {}
+        for memory_type, hashes in by_type.items():
+            try:
+                found = self.collection.get(
+                    where={"$and": [{"type": memory_type}, {"content_hash": {"$in": hashes}}]},
+                    include=["metadatas"]
+                )
+            except Exception as e:
+                logger.debug(f"Поиск по хэшу недоступен: {e}")
+                continue
+
+            for memory_id, meta in zip(found['ids'], found['metadatas']):
+                existing[(memory_type, meta['content_hash'])] = (memory_id, meta)
+
+        return existing
+
+    def _filter_near(self, documents, metadatas, embeddings, bumps):
+        """Отсев почти-дубликатов, возвращает индексы оставляемых записей"""
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        unit = embeddings / np.maximum(norms, 1e-12)
+
+        checked = [i for i, meta in enumerate(metadatas) if meta.get('type') in self.near_types]
+        if not checked:
+            return list(range(len(documents)))
+
+        dropped = set()
+
+        # Внутри батча: сравниваем с уже оставленными записями того же типа
+        kept_by_type = {}
+        for i in checked:
+            memory_type = metadatas[i].get('type')
+            kept = kept_by_type.setdefault(memory_type, [])
+            if kept:
+                sims = unit[kept] @ unit[i]
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    metadatas[kept[best]]['seen_count'] += metadatas[i]['seen_count']
+                    dropped.add(i)
+                    self.stats['near_duplicates'] += 1
+                    continue
+            kept.append(i)
+
+        # С базой: ближайший сосед того же типа, один запрос на тип
+        for memory_type, indices in kept_by_type.items():
+            try:
+                results = self.collection.query(
+                    query_embeddings=embeddings[indices].tolist(),
+                    n_results=1,
+                    where={"type": memory_type},
+                    include=["metadatas", "distances"]
+                )
+            except Exception as e:
+                logger.debug(f"Проверка почти-дубликатов пропущена: {e}")
+                continue
+
+            for i, ids, metas, distances in zip(
+                indices, results['ids'], results['metadatas'], results['distances']
+            ):
+                if not ids:
+                    continue
+                # Коллекция в пространстве cosine: distance = 1 - similarity
+                if 1.0 - distances[0] >= self.threshold:
+                    self._add_bump(bumps, ids[0], metas[0], metadatas[i]['seen_count'])
+                    dropped.add(i)
+                    self.stats['near_duplicates'] += 1
+
+        return [i for i in range(len(documents)) if i not in dropped]
+
+    @staticmethod
+    def _add_bump(bumps, memory_id, meta, count):
+        """Учёт повторной встречи уже сохранённой записи"""
+        if memory_id in bumps:
+            bumps[memory_id] = (bumps[memory_id][0], bumps[memory_id][1] + count)
+        else:
+            bumps[memory_id] = (meta or {}, count)
+
+    @staticmethod
+    def _add_replace(bumps, memory_id, meta):
+        """Замена метаданных сохранённой записи (count=None - без учёта повтора)"""
+        bumps[memory_id] = (meta, None)
+
+    def _apply_bumps(self, bumps):
+        """Обновление seen_count и importance у найденных дубликатов"""
+        if not bumps:
+            return
+
+        ids = []
+        metadatas = []
+        now = datetime.now().isoformat()
+        for memory_id, (meta, count) in bumps.items():
+            updated = dict(meta)
+            if count is None:
+                ids.append(memory_id)
+                metadatas.append(updated)
+                continue
+
+            updated['seen_count'] = int(updated.get('seen_count', 1)) + count
+            importance = float(updated.get('importance', 0.5))
+            bumped = min(self.repeat_importance_cap, importance + self.repeat_importance_step * count)
+            # Повторы не понижают важность, заданную при записи
+            updated['importance'] = max(importance, bumped)
+            updated['last_seen'] = now
+            ids.append(memory_id)
+            metadatas.append(updated)
+
+        try:
+            self.collection.update(ids=ids, metadatas=metadatas)
+        except Exception as e:
+            logger.error(f"Ошибка обновления счётчиков дубликатов: {e}")
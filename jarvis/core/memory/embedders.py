@@ -0,0 +1,217 @@
+"""
+Бэкенды модели эмбеддингов
+sentence-transformers (по умолчанию), динамически квантованный int8 PyTorch
+и ONNX Runtime для машин без GPU. Выбор - config.memory.embedding_model
+"""
+
+import logging
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = 'paraphrase-multilingual-MiniLM-L12-v2'
+
+BACKENDS = ('sentence-transformers', 'torch-int8', 'onnx')
+
+
+def parse_embedding_spec(spec):
+    """
+    Разбор настройки memory.embedding_model
+
+    Строка - имя модели для sentence-transformers. Словарь:
+        {"name": "...", "backend": "onnx", "threads": 4, "quantize": true}
+
+    Returns:
+        dict: Полная спецификация с значениями по умолчанию
+    """
+    if isinstance(spec, str) or spec is None:
+        spec = {'name': spec or DEFAULT_MODEL}
+
+    parsed = {
+        'name': spec.get('name', DEFAULT_MODEL),
+        'backend': spec.get('backend', 'sentence-transformers'),
+        'threads': spec.get('threads') or os.cpu_count() or 1,
+        'device': spec.get('device'),
+        'quantize': spec.get('quantize', True),
+        'max_seq_length': spec.get('max_seq_length', 128),
+        'onnx_dir': spec.get('onnx_dir', 'data/models/onnx'),
+    }
+
+    if parsed['backend'] not in BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд эмбеддингов: {parsed['backend']} (доступны: {', '.join(BACKENDS)})")
+
+    return parsed
+
+
+def embedding_label(spec):
+    """Имя модели с бэкендом (для ключей кэша: векторы разных бэкендов немного различаются)"""
+    spec = parse_embedding_spec(spec)
+    if spec['backend'] == 'sentence-transformers':
+        return spec['name']
+    if spec['backend'] == 'onnx':
+        return f"{spec['name']}@onnx{'-int8' if spec['quantize'] else ''}"
+    return f"{spec['name']}@{spec['backend']}"
+
+
+def create_embedding_model(spec):
+    """
+    Создание модели эмбеддингов по спецификации
+
+    Все бэкенды совместимы по вызову с SentenceTransformer.encode.
+    Если зависимости выбранного бэкенда не установлены, используется
+    sentence-transformers.
+
+    Args:
+        spec: Строка или словарь из config.memory.embedding_model
+
+    Returns:
+        Модель с методом encode
+    """
+    spec = parse_embedding_spec(spec)
+    backend = spec['backend']
+
+    try:
+        if backend == 'onnx':
+            return OnnxEmbedder(spec)
+        if backend == 'torch-int8':
+            return _create_torch_int8(spec)
+    except ImportError as e:
+        logger.warning(f"Бэкенд {backend} недоступен ({e}), используется sentence-transformers")
+
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(spec['name'], device=spec['device'])
+
+
+def _create_torch_int8(spec):
+    """SentenceTransformer на CPU с динамическим int8-квантованием Linear-слоёв"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(spec['threads'])
+
+    model = SentenceTransformer(spec['name'], device='cpu')
+    model.eval()
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    logger.info(f"Модель эмбеддингов {spec['name']}: torch int8, потоков: {spec['threads']}")
+    return quantized
+
+
+class OnnxEmbedder:
+    """Эмбеддинги через ONNX Runtime (mean pooling, как в sentence-transformers)"""
+
+    def __init__(self, spec):
+        """
+        Args:
+            spec: Спецификация из parse_embedding_spec
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.spec = spec
+        self.max_seq_length = spec['max_seq_length']
+
+        model_dir = Path(spec['onnx_dir']) / re.sub(r'[^\w.-]+', '_', spec['name'])
+        model_path = self._ensure_onnx(model_dir)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = spec['threads']
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+        self.session = ort.InferenceSession(str(model_path), options, providers=['CPUExecutionProvider'])
+        self._input_names = {inp.name for inp in self.session.get_inputs()}
+
+        logger.info(f"Модель эмбеддингов {spec['name']}: ONNX ({model_path.name}), потоков: {spec['threads']}")
+
+    def _ensure_onnx(self, model_dir):
+        """Экспорт модели в ONNX (и int8-квантование) при первом запуске"""
+        fp32_path = model_dir / "model.onnx"
+        int8_path = model_dir / "model.int8.onnx"
+        target = int8_path if self.spec['quantize'] else fp32_path
+
+        if target.exists():
+            return target
+
+        model_dir.mkdir(parents=True, exist_ok=True)
+
+        if not fp32_path.exists():
+            import torch
+            from sentence_transformers import SentenceTransformer
+
+            logger.info(f"Экспорт {self.spec['name']} в ONNX...")
+            st_model = SentenceTransformer(self.spec['name'], device='cpu')
+            transformer = st_model[0].auto_model
+            tokenizer = st_model.tokenizer
+            tokenizer.save_pretrained(str(model_dir))
+
+            sample = tokenizer(["пример"], return_tensors='pt')
+            names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+            dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in names}
+            dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+            with torch.no_grad():
+                torch.onnx.export(
+                    transformer,
+                    tuple(sample[name] for name in names),
+                    str(fp32_path),
+                    input_names=names,
+                    output_names=['last_hidden_state'],
+                    dynamic_axes=dynamic_axes,
+                    opset_version=14
+                )
+
+        if self.spec['quantize']:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            logger.info("Квантование ONNX-модели в int8...")
+            quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+
+        return target
+
+    def encode(self, sentences, batch_size=32, normalize_embeddings=False, **kwargs):
+        """
+        Создание эмбеддингов (аргументы как у SentenceTransformer.encode)
+
+        Returns:
+            np.ndarray: Вектор (для строки) или матрица эмбеддингов
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        # Сортировка по длине уменьшает паддинг внутри батча
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        result = [None] * len(texts)
+
+        for start in range(0, len(order), batch_size):
+            batch_idx = order[start:start + batch_size]
+            encoded = self.tokenizer(
+                [texts[i] for i in batch_idx],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors='np'
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self._input_names if name in encoded}
+            hidden = self.session.run(None, feeds)[0]
+
+            mask = encoded['attention_mask'][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+            for i, vector in zip(batch_idx, pooled):
+                result[i] = vector
+
+        embeddings = np.asarray(result, dtype=np.float32) if texts else np.zeros((0, 0), dtype=np.float32)
+        if normalize_embeddings and len(embeddings):
+            embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+        return embeddings[0] if single else embeddings
+
+    def get_sentence_embedding_dimension(self):
+        """Размерность эмбеддинга"""
+        return int(self.session.get_outputs()[0].shape[-1])
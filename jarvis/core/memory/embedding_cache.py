@@ -0,0 +1,339 @@
+"""
+Кэш эмбеддингов с адресацией по содержимому
+Два уровня: LRU в оперативной памяти и memory-mapped файл на диске
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """
+    Нормализация текста перед хэшированием
+
+    Args:
+        text: Исходный текст
+
+    Returns:
+        str: Текст в форме NFC без лишних пробелов
+    """
+    text = unicodedata.normalize('NFC', text or '')
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def make_cache_key(text, model_name):
+    """Ключ кэша: хэш имени модели и нормализованного текста"""
+    payload = f"{model_name}\x00{normalize_text(text)}".encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()
+
+
+class EmbeddingCache:
+    """Двухуровневый кэш эмбеддингов (RAM LRU + диск)"""
+
+    def __init__(self, model_name, cache_dir="data/cache/embeddings",
+                 max_ram_entries=50000, disk_enabled=True):
+        self.model_name = model_name
+        self.max_ram_entries = max_ram_entries
+        self.disk_enabled = disk_enabled
+
+        # Горячий уровень: ключ -> вектор
+        self._ram = OrderedDict()
+
+        # Дисковый уровень: ключ -> номер строки в memmap
+        self._disk_index = {}
+        # Занятые строки memmap (= строк в index.txt)
+        self._rows = 0
+        self._vectors = None
+        self._capacity = 0
+        self._dim = None
+
+        self._lock = threading.Lock()
+
+        self.counters = {
+            'ram_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+        }
+
+        slug = re.sub(r'[^A-Za-z0-9_.-]', '_', model_name)
+        self.cache_dir = Path(cache_dir) / slug
+        self._index_path = self.cache_dir / "index.txt"
+        self._vectors_path = self.cache_dir / "vectors.f32"
+        self._dim_path = self.cache_dir / "dim.txt"
+
+        if self.disk_enabled:
+            self._open_disk_tier()
+
+    def _open_disk_tier(self):
+        """Открытие дискового уровня кэша"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+            if not (self._dim_path.exists() and self._vectors_path.exists()):
+                return
+
+            self._dim = int(self._dim_path.read_text().strip())
+
+            row_bytes = self._dim * 4
+            self._capacity = self._vectors_path.stat().st_size // row_bytes
+
+            keys = []
+            complete = True
+            if self._index_path.exists():
+                text = self._index_path.read_text(encoding='ascii')
+                keys = text.split("\n")
+                # Последняя строка без перевода - недописанный ключ
+                complete = keys[-1] == ""
+                keys = keys[:-1]
+
+            # Индекс мог пережить вектора при аварийном завершении: номер строки
+            # индекса - номер строки memmap, поэтому файл обрезается, а не только
+            # словарь (иначе дозапись сдвинула бы ключи относительно векторов)
+            if len(keys) > self._capacity or not complete:
+                keys = keys[:self._capacity]
+                self._rewrite_index(keys)
+
+            self._rows = len(keys)
+            for row, key in enumerate(keys):
+                if key:
+                    self._disk_index[key] = row
+
+            if self._capacity:
+                self._vectors = np.memmap(
+                    self._vectors_path, dtype=np.float32, mode='r+',
+                    shape=(self._capacity, self._dim)
+                )
+
+            logger.info(f"Дисковый кэш эмбеддингов: {len(self._disk_index)} векторов")
+
+        except Exception as e:
+            logger.error(f"Ошибка открытия дискового кэша эмбеддингов: {e}")
+            self.disk_enabled = False
+            self._disk_index = {}
+            self._vectors = None
+
+    def _rewrite_index(self, keys):
+        """Атомарная перезапись index.txt"""
+        tmp_path = self._index_path.with_name(f"{self._index_path.name}.tmp")
+        with open(tmp_path, 'w', encoding='ascii') as f:
+            f.write("".join(f"{key}\n" for key in keys))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._index_path)
+
+    def _ensure_capacity(self, needed):
+        """Увеличение memmap-файла при нехватке места"""
+        if needed <= self._capacity:
+            return
+
+        new_capacity = max(self._capacity * 2, needed, 1024)
+
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+
+        with open(self._vectors_path, 'ab') as f:
+            f.truncate(new_capacity * self._dim * 4)
+
+        self._vectors = np.memmap(
+            self._vectors_path, dtype=np.float32, mode='r+',
+            shape=(new_capacity, self._dim)
+        )
+        self._capacity = new_capacity
+
+    def _remember_ram(self, key, vector):
+        """Добавление в LRU с вытеснением старых записей"""
+        self._ram[key] = vector
+        self._ram.move_to_end(key)
+
+        while len(self._ram) > self.max_ram_entries:
+            self._ram.popitem(last=False)
+
+    def get_many(self, keys):
+        """
+        Поиск векторов в кэше
+
+        Args:
+            keys: Список ключей
+
+        Returns:
+            dict: Найденные векторы по ключам
+        """
+        found = {}
+
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    continue
+
+                vector = self._ram.get(key)
+                if vector is not None:
+                    self._ram.move_to_end(key)
+                    self.counters['ram_hits'] += 1
+                    found[key] = vector
+                    continue
+
+                row = self._disk_index.get(key)
+                if row is not None and self._vectors is not None:
+                    vector = np.array(self._vectors[row])
+                    self._remember_ram(key, vector)
+                    self.counters['disk_hits'] += 1
+                    found[key] = vector
+                    continue
+
+                self.counters['misses'] += 1
+
+        return found
+
+    def put_many(self, keys, vectors, disk=True):
+        """
+        Сохранение векторов в оба уровня кэша
+
+        Args:
+            keys: Список ключей
+            vectors: Матрица эмбеддингов (по строке на ключ)
+            disk: Писать ли на диск (False - только RAM LRU)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+
+        with self._lock:
+            new_rows = []
+            for key, vector in zip(keys, vectors):
+                # Копия строки: иначе кэш держит весь батч вызывающего
+                # и меняется вместе с ним
+                self._remember_ram(key, vector.copy())
+                if disk and self.disk_enabled and key not in self._disk_index:
+                    new_rows.append((key, vector))
+
+            if not new_rows:
+                return
+
+            try:
+                self._append_disk(new_rows)
+            except Exception as e:
+                logger.error(f"Ошибка записи дискового кэша эмбеддингов: {e}")
+                self.disk_enabled = False
+
+    def _append_disk(self, rows):
+        """Дозапись новых векторов в memmap и индекс"""
+        if self._dim is None:
+            self._dim = int(rows[0][1].shape[0])
+            self._dim_path.write_text(str(self._dim))
+
+        start = self._rows
+        self._ensure_capacity(start + len(rows))
+
+        for offset, (_, vector) in enumerate(rows):
+            self._vectors[start + offset] = vector
+
+        # Сначала вектора, затем ключи: индекс не ссылается на незаписанные строки
+        self._vectors.flush()
+
+        with open(self._index_path, 'a', encoding='ascii') as f:
+            for offset, (key, _) in enumerate(rows):
+                f.write(key + "\n")
+                self._disk_index[key] = start + offset
+        self._rows = start + len(rows)
+
+    def stats(self):
+        """Счётчики попаданий и промахов"""
+        with self._lock:
+            hits = self.counters['ram_hits'] + self.counters['disk_hits']
+            total = hits + self.counters['misses']
+            return {
+                **self.counters,
+                'hit_rate': hits / total if total else 0.0,
+                'ram_entries': len(self._ram),
+                'disk_entries': len(self._disk_index),
+            }
+
+    def close(self):
+        """Сброс дискового уровня"""
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+
+
+class CachedEmbedder:
+    """
+    Обёртка над моделью эмбеддингов с общим кэшем
+
+    Совместима по вызову с SentenceTransformer.encode, поэтому
+    подставляется вместо модели для всех потребителей.
+    """
+
+    def __init__(self, model, model_name, cache):
+        self.model = model
+        self.model_name = model_name
+        self.cache = cache
+
+    def encode(self, sentences, batch_size=32, normalize_embeddings=False, **kwargs):
+        """
+        Создание эмбеддингов с использованием кэша
+
+        Args:
+            sentences: Строка или список строк
+            batch_size: Размер батча для модели
+            normalize_embeddings: Нормализовать ли вектора
+            convert_to_tensor: Вернуть torch.Tensor вместо np.ndarray
+            cache_disk: Сохранять ли новые вектора в дисковый уровень (False -
+                        только RAM, для записей, которые хранилище держит сжатыми)
+
+        Returns:
+            np.ndarray: Вектор (для строки) или матрица эмбеддингов
+        """
+        convert_to_tensor = kwargs.pop('convert_to_tensor', False)
+        cache_disk = kwargs.pop('cache_disk', True)
+        kwargs.pop('convert_to_numpy', None)
+
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        cache_model = f"{self.model_name}|norm" if normalize_embeddings else self.model_name
+        keys = [make_cache_key(text, cache_model) for text in texts]
+        found = self.cache.get_many(keys)
+
+        # Кодируем только уникальные промахи одним батчем
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            encoded = self.model.encode(
+                list(missing.values()),
+                batch_size=batch_size,
+                normalize_embeddings=normalize_embeddings,
+                convert_to_numpy=True,
+                **kwargs
+            )
+            self.cache.put_many(list(missing.keys()), encoded, disk=cache_disk)
+            found.update(zip(missing.keys(), np.asarray(encoded, dtype=np.float32)))
+
+        if not texts:
+            result = np.zeros((0, 0), dtype=np.float32)
+        else:
+            result = np.stack([found[key] for key in keys])
+            if single:
+                result = result[0]
+
+        if convert_to_tensor:
+            import torch
+            return torch.from_numpy(result)
+        return result
+
+    def __getattr__(self, name):
+        # Остальные атрибуты (размерность, токенизатор) берём у модели
+        return getattr(self.model, name)
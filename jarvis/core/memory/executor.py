@@ -0,0 +1,53 @@
+"""
+Пул потоков для эмбеддингов и векторного поиска
+Выносит тяжёлые вызовы SentenceTransformer и ChromaDB из цикла событий
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryExecutor:
+    """Сервис эмбеддингов и поиска с ограничением параллелизма"""
+
+    def __init__(self, max_workers=2):
+        """
+        Args:
+            max_workers: Максимум одновременных эмбеддингов/запросов к базе
+        """
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="memory-worker"
+        )
+
+    def run(self, func, *args, **kwargs):
+        """
+        Запуск синхронной функции в пуле
+
+        Returns:
+            asyncio.Future: Ожидаемый результат функции
+        """
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def encode(self, embedder, texts, **kwargs):
+        """
+        Асинхронное создание эмбеддингов
+
+        Args:
+            embedder: Модель эмбеддингов
+            texts: Строка или список строк
+
+        Returns:
+            asyncio.Future: Эмбеддинги (np.ndarray)
+        """
+        return self.run(embedder.encode, texts, **kwargs)
+
+    def shutdown(self, wait=True):
+        """Остановка пула"""
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,367 @@
+"""
+Горячий уровень памяти: небольшая матрица эмбеддингов в процессе
+Рабочий набор (предпочтения, задачи, события, частые записи) ищется одним
+умножением матрицы на вектор, ChromaDB - только если здесь нет хорошего ответа
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Типы, которые всегда держатся в горячем уровне
+DEFAULT_HOT_TYPES = ['preference', 'task', 'event', 'fact', 'conversation', 'general']
+
+
+class HotTier:
+    """Матрица нормированных эмбеддингов с вытеснением по числу обращений"""
+
+    def __init__(self, capacity=20000, dtype='float32', threshold=0.6, promote_after=2,
+                 hot_types=None, min_importance=0.8, demote_batch=None):
+        """
+        Args:
+            capacity: Максимум записей в горячем уровне
+            dtype: Тип хранения матрицы (float32 или float16)
+            threshold: Минимальная близость лучшего результата, при которой
+                       холодное хранилище не опрашивается
+            promote_after: Сколько обращений к холодной записи нужно для переноса
+            hot_types: Типы памяти, которые добавляются сразу при записи
+            min_importance: Записи с importance не ниже порога тоже добавляются сразу
+            demote_batch: Сколько записей вытесняется за раз при заполнении
+                          (None - 1% ёмкости)
+        """
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        self.threshold = threshold
+        self.promote_after = promote_after
+        self.hot_types = set(hot_types if hot_types is not None else DEFAULT_HOT_TYPES)
+        self.min_importance = min_importance
+        self.demote_batch = max(1, demote_batch or capacity // 100)
+
+        self._matrix = None
+        self._size = 0
+        self._ids = []
+        self._records = []
+        self._type_codes = np.zeros(0, dtype=np.int32)
+        self._types = {}
+        self._rows = {}
+
+        # Счётчики обращений: горячие строки и холодные кандидаты на перенос
+        self._access = np.zeros(0, dtype=np.int64)
+        self._last_access = np.zeros(0, dtype=np.float64)
+        self._cold_access = {}
+        self._demoted_since_aging = 0
+
+        self.ready = False
+        self._lock = threading.RLock()
+        self._bootstrap_thread = None
+
+        self.stats = {
+            'hot_hits': 0,
+            'cold_fallbacks': 0,
+            'promoted': 0,
+            'demoted': 0,
+        }
+
+    def __len__(self):
+        return self._size
+
+    def admits(self, metadata):
+        """Попадает ли запись в горячий уровень сразу при записи"""
+        metadata = metadata or {}
+        if metadata.get('type') in self.hot_types:
+            return True
+        return float(metadata.get('importance', 0.0)) >= self.min_importance
+
+    def add(self, ids, documents, metadatas, embeddings, only_admitted=True):
+        """
+        Добавление записей
+
+        Args:
+            ids: id записей
+            documents: Тексты
+            metadatas: Метаданные
+            embeddings: Эмбеддинги (n, dim)
+            only_admitted: Пропускать записи, не проходящие admits()
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or not len(embeddings):
+            return
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        unit = embeddings / np.maximum(norms, 1e-12)
+
+        with self._lock:
+            for memory_id, doc, meta, vector in zip(ids, documents, metadatas, unit):
+                if only_admitted and not self.admits(meta):
+                    continue
+
+                row = self._rows.get(memory_id)
+                if row is None:
+                    row = self._allocate_row(len(vector))
+
+                self._matrix[row] = vector.astype(self.dtype)
+                self._type_codes[row] = self._type_code((meta or {}).get('type'))
+                self._records[row] = {'content': doc, 'metadata': meta}
+                self._ids[row] = memory_id
+                self._rows[memory_id] = row
+                self._last_access[row] = time.monotonic()
+                self._cold_access.pop(memory_id, None)
+
+    def remove(self, ids):
+        """Удаление записей (последняя строка переносится на место удалённой)"""
+        with self._lock:
+            for memory_id in ids:
+                row = self._rows.pop(memory_id, None)
+                if row is not None:
+                    self._drop_row(row)
+                self._cold_access.pop(memory_id, None)
+
+    def search(self, query_embedding, n_results=5, memory_type=None):
+        """
+        Поиск по горячему уровню
+
+        Args:
+            query_embedding: Эмбеддинг запроса
+            n_results: Количество результатов
+            memory_type: Фильтр по типу памяти
+
+        Returns:
+            list: Кортежи (id, similarity, record) по убыванию близости
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        with self._lock:
+            if not self._size:
+                return []
+
+            scores = self._scores(query)
+
+            if memory_type:
+                code = self._types.get(memory_type)
+                if code is None:
+                    return []
+                scores = np.where(self._type_codes[:self._size] == code, scores, -np.inf)
+
+            count = min(n_results, self._size)
+            top = np.argpartition(-scores, count - 1)[:count]
+            top = top[np.argsort(-scores[top])]
+            top = [row for row in top if np.isfinite(scores[row])]
+
+            now = time.monotonic()
+            self._access[top] += 1
+            self._last_access[top] = now
+
+            return [(self._ids[row], float(scores[row]), self._records[row]) for row in top]
+
+    def is_confident(self, hits, n_results, memory_type=None, stored=None):
+        """
+        Достаточно ли горячих результатов, чтобы не опрашивать холодное хранилище
+
+        Лучший результат должен пройти порог. Неполный список считается
+        ответом, только если в уровне лежат все записи этого типа.
+
+        Args:
+            hits: Результаты search()
+            n_results: Запрошенное количество результатов
+            memory_type: Фильтр по типу памяти
+            stored: Количество записей этого типа в хранилище (None - неизвестно)
+        """
+        confident = bool(hits) and hits[0][1] >= self.threshold and (
+            len(hits) >= n_results
+            or (memory_type is not None and stored is not None and self.resident(memory_type) >= stored)
+        )
+        self.stats['hot_hits' if confident else 'cold_fallbacks'] += 1
+        return confident
+
+    def resident(self, memory_type):
+        """Количество записей типа в горячем уровне"""
+        with self._lock:
+            code = self._types.get(memory_type)
+            if code is None or not self._size:
+                return 0
+            return int(np.count_nonzero(self._type_codes[:self._size] == code))
+
+    def record_cold_access(self, ids, documents, metadatas, embeddings):
+        """
+        Учёт обращений к записям из холодного хранилища
+
+        Записи, к которым обращались promote_after раз, переносятся в горячий уровень.
+        """
+        promote = []
+        with self._lock:
+            for idx, memory_id in enumerate(ids):
+                if memory_id in self._rows:
+                    row = self._rows[memory_id]
+                    self._access[row] += 1
+                    self._last_access[row] = time.monotonic()
+                    continue
+
+                count = self._cold_access.get(memory_id, 0) + 1
+                if count >= self.promote_after and embeddings is not None:
+                    promote.append(idx)
+                else:
+                    self._cold_access[memory_id] = count
+
+            # Ограничение словаря кандидатов
+            if len(self._cold_access) > self.capacity * 4:
+                for memory_id in list(self._cold_access)[:self.capacity]:
+                    del self._cold_access[memory_id]
+
+            if promote:
+                self.add(
+                    [ids[i] for i in promote],
+                    [documents[i] for i in promote],
+                    [metadatas[i] for i in promote],
+                    [embeddings[i] for i in promote],
+                    only_admitted=False
+                )
+                for i in promote:
+                    row = self._rows.get(ids[i])
+                    if row is not None:
+                        self._access[row] = self.promote_after
+                self.stats['promoted'] += len(promote)
+
+    def bootstrap(self, collection, page_size=1000):
+        """
+        Фоновое заполнение из коллекции: горячие типы и важные записи
+
+        Пока заполнение идёт, ready == False и поиск идёт через ChromaDB.
+        """
+        where = {"$or": [
+            {"type": {"$in": sorted(self.hot_types)}},
+            {"importance": {"$gte": self.min_importance}},
+        ]}
+
+        def run():
+            offset = 0
+            try:
+                while self._size < self.capacity:
+                    page = collection.get(
+                        where=where,
+                        limit=min(page_size, self.capacity - self._size),
+                        offset=offset,
+                        include=["documents", "metadatas", "embeddings"]
+                    )
+                    if not page['ids']:
+                        break
+                    self.add(page['ids'], page['documents'], page['metadatas'],
+                             page['embeddings'], only_admitted=False)
+                    offset += len(page['ids'])
+            except Exception as e:
+                logger.error(f"Ошибка заполнения горячего уровня памяти: {e}")
+                return
+
+            self.ready = True
+            logger.info(f"Горячий уровень памяти: {self._size} записей")
+
+        self._bootstrap_thread = threading.Thread(target=run, name="memory-hot-tier", daemon=True)
+        self._bootstrap_thread.start()
+
+    def snapshot(self):
+        """Счётчики для статистики"""
+        with self._lock:
+            snapshot = dict(self.stats)
+            snapshot['size'] = self._size
+            snapshot['capacity'] = self.capacity
+            snapshot['ready'] = self.ready
+        return snapshot
+
+    def _scores(self, query):
+        """Косинусная близость запроса ко всем строкам"""
+        matrix = self._matrix[:self._size]
+        if self.dtype == np.float32:
+            return matrix @ query
+
+        # float16 без BLAS медленный - считаем блоками в float32
+        scores = np.empty(self._size, dtype=np.float32)
+        block = 8192
+        for start in range(0, self._size, block):
+            scores[start:start + block] = matrix[start:start + block].astype(np.float32) @ query
+        return scores
+
+    def _type_code(self, memory_type):
+        code = self._types.get(memory_type)
+        if code is None:
+            code = len(self._types)
+            self._types[memory_type] = code
+        return code
+
+    def _allocate_row(self, dim):
+        """Новая строка; при заполнении вытесняется запись с наименьшим числом обращений"""
+        if self._matrix is None:
+            initial = min(self.capacity, 1024)
+            self._matrix = np.zeros((initial, dim), dtype=self.dtype)
+            self._type_codes = np.zeros(initial, dtype=np.int32)
+            self._access = np.zeros(initial, dtype=np.int64)
+            self._last_access = np.zeros(initial, dtype=np.float64)
+
+        if self._size >= self.capacity:
+            self._demote()
+
+        if self._size >= len(self._matrix):
+            new_rows = min(self.capacity, len(self._matrix) * 2)
+            self._matrix = self._grow(self._matrix, new_rows)
+            self._type_codes = self._grow(self._type_codes, new_rows)
+            self._access = self._grow(self._access, new_rows)
+            self._last_access = self._grow(self._last_access, new_rows)
+
+        row = self._size
+        self._size += 1
+        self._ids.append(None)
+        self._records.append(None)
+        self._access[row] = 0
+        return row
+
+    @staticmethod
+    def _grow(array, rows):
+        grown = np.zeros((rows,) + array.shape[1:], dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def _demote(self):
+        """
+        Вытеснение пачки наименее используемых записей (при равенстве - самых давних)
+
+        Сортируются только кандидаты, и не чаще раза на demote_batch добавлений.
+        """
+        size = self._size
+        count = min(size, self.demote_batch)
+        access = self._access[:size]
+
+        # Кандидаты - строки с числом обращений не больше count-го наименьшего
+        limit = np.partition(access, count - 1)[count - 1]
+        candidates = np.flatnonzero(access <= limit)
+        order = np.lexsort((self._last_access[candidates], access[candidates]))
+        rows = candidates[order[:count]]
+
+        # С конца: перенос последней строки не затрагивает ещё не удалённые
+        for row in sorted(rows.tolist(), reverse=True):
+            del self._rows[self._ids[row]]
+            self._drop_row(row)
+        self.stats['demoted'] += count
+
+        # Старение счётчиков, чтобы давние популярные записи со временем уступали место
+        self._demoted_since_aging += count
+        if self._demoted_since_aging >= max(1, self.capacity // 10):
+            self._access[:self._size] //= 2
+            self._demoted_since_aging = 0
+
+    def _drop_row(self, row):
+        last = self._size - 1
+        if row != last:
+            self._matrix[row] = self._matrix[last]
+            self._type_codes[row] = self._type_codes[last]
+            self._access[row] = self._access[last]
+            self._last_access[row] = self._last_access[last]
+            self._ids[row] = self._ids[last]
+            self._records[row] = self._records[last]
+            self._rows[self._ids[row]] = row
+
+        self._ids.pop()
+        self._records.pop()
+        self._size = last
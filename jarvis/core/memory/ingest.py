@@ -0,0 +1,209 @@
+"""
+Очередь пакетной записи в память (write-behind)
+Один поток-писатель собирает записи от всех источников в крупные батчи
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class IngestQueue:
+    """Ограниченная очередь с единственным потоком-писателем"""
+
+    def __init__(self, writer, max_pending=10000, batch_size=256, flush_interval=1.0,
+                 max_retries=3, retry_delay=0.5):
+        """
+        Args:
+            writer: Функция, записывающая список элементов одним батчем
+            max_pending: Максимум элементов в очереди (дальше - backpressure)
+            batch_size: Размер батча, при котором запись идёт сразу
+            flush_interval: Максимальное время ожидания неполного батча (сек)
+            max_retries: Повторы записи упавшего батча
+            retry_delay: Пауза перед первым повтором (дальше удваивается, сек)
+        """
+        self._writer = writer
+        self._queue = queue.Queue(maxsize=max_pending)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        self._cond = threading.Condition()
+        self._enqueued = 0
+        self._processed = 0
+        self._flush_requested = threading.Event()
+
+        # Элементы, не записанные после всех повторов (для requeue_failed)
+        self._failed_items = deque(maxlen=max_pending)
+
+        # Изменяется под self._cond
+        self.stats = {
+            'written': 0,
+            'batches': 0,
+            'errors': 0,
+            'retries': 0,
+            'failed': 0,
+            'rejected': 0,
+        }
+
+        self._thread = threading.Thread(target=self._run, name="memory-ingest", daemon=True)
+        self._thread.start()
+
+    def put(self, item, timeout=None):
+        """
+        Постановка элемента в очередь
+
+        Блокирует вызывающий поток, пока в очереди нет места.
+
+        Args:
+            item: Элемент для записи
+            timeout: Сколько ждать места (None - бесконечно)
+
+        Returns:
+            bool: True, если элемент принят
+        """
+        with self._cond:
+            self._enqueued += 1
+
+        try:
+            self._queue.put(item, timeout=timeout)
+        except queue.Full:
+            with self._cond:
+                self._enqueued -= 1
+                self.stats['rejected'] += 1
+                self._cond.notify_all()
+            logger.warning("Очередь записи в память переполнена, элемент отброшен")
+            return False
+
+        return True
+
+    def flush(self, timeout=None):
+        """
+        Синхронная запись всего, что было поставлено до вызова
+
+        Args:
+            timeout: Максимальное время ожидания (None - бесконечно)
+
+        Returns:
+            bool: True, если всё обработано и ни один батч не потерян
+                  после повторов (потерянные - в stats['failed'])
+        """
+        with self._cond:
+            target = self._enqueued
+            failed_before = self.stats['failed']
+            if self._processed < target:
+                self._flush_requested.set()
+                if not self._cond.wait_for(lambda: self._processed >= target, timeout=timeout):
+                    return False
+
+            return self.stats['failed'] == failed_before
+
+    def get_stats(self):
+        """Копия счётчиков"""
+        with self._cond:
+            return dict(self.stats)
+
+    def requeue_failed(self, timeout=None):
+        """
+        Повторная постановка элементов, не записанных после всех повторов
+
+        Returns:
+            int: Количество поставленных элементов
+        """
+        with self._cond:
+            items = list(self._failed_items)
+            self._failed_items.clear()
+
+        return sum(1 for item in items if self.put(item, timeout=timeout))
+
+    def full(self):
+        """Заполнена ли очередь (следующий put заблокируется)"""
+        return self._queue.full()
+
+    def pending(self):
+        """Количество элементов, ожидающих записи"""
+        with self._cond:
+            return self._enqueued - self._processed
+
+    def close(self, timeout=10):
+        """Запись остатка и остановка потока-писателя"""
+        self.flush(timeout=timeout)
+        self._queue.put(_STOP)
+        self._thread.join(timeout=timeout)
+
+    def _collect_batch(self):
+        """Сбор батча: до batch_size элементов или до истечения flush_interval"""
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if self._flush_requested.is_set():
+                remaining = 0
+
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is _STOP:
+                # Вернём стоп-сигнал после записи текущего батча
+                self._queue.put(_STOP)
+                break
+
+            batch.append(item)
+
+        return batch
+
+    def _run(self):
+        """Цикл потока-писателя"""
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                break
+
+            written = self._write_with_retries(batch)
+
+            with self._cond:
+                if written:
+                    self.stats['written'] += len(batch)
+                    self.stats['batches'] += 1
+                else:
+                    self.stats['failed'] += len(batch)
+                    self._failed_items.extend(batch)
+                self._processed += len(batch)
+                if self._queue.empty():
+                    self._flush_requested.clear()
+                self._cond.notify_all()
+
+    def _write_with_retries(self, batch):
+        """Запись батча с повторами и экспоненциальной паузой"""
+        delay = self.retry_delay
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._writer(batch)
+                return True
+            except Exception as e:
+                with self._cond:
+                    self.stats['errors'] += 1
+                if attempt == self.max_retries:
+                    logger.error(f"Батч памяти не записан ({len(batch)} элементов) после "
+                                 f"{self.max_retries} повторов: {e}")
+                    return False
+                logger.warning(f"Ошибка пакетной записи в память, повтор через {delay:.1f} с: {e}")
+                with self._cond:
+                    self.stats['retries'] += 1
+                time.sleep(delay)
+                delay *= 2
+        return False
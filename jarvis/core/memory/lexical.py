@@ -0,0 +1,343 @@
+"""
+Лексический (BM25) индекс по записям памяти
+Дополняет векторный поиск на точных именах, URL и названиях задач
+"""
+
+import heapq
+import logging
+import math
+import pickle
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Поля метаданных, которые индексируются вместе с текстом записи
+INDEXED_METADATA_FIELDS = ('url', 'title', 'topic')
+
+_TOKEN_RE = re.compile(r"https?://\S+|\w+", re.UNICODE)
+
+
+def normalize_for_match(text):
+    """Нормализация для сравнения фраз: регистр, ё/е, пробелы"""
+    text = unicodedata.normalize('NFKC', text or "")
+    return " ".join(text.split()).lower().replace('ё', 'е')
+
+
+def tokenize(text):
+    """Разбиение текста на токены (URL сохраняются целиком)"""
+    return _TOKEN_RE.findall(normalize_for_match(text))
+
+
+def searchable_text(document, metadata):
+    """Текст записи вместе с индексируемыми полями метаданных"""
+    parts = [document or ""]
+    for field in INDEXED_METADATA_FIELDS:
+        value = (metadata or {}).get(field)
+        if value:
+            parts.append(str(value))
+    return "\n".join(parts)
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Объединение ранжирований методом reciprocal rank fusion
+
+    Args:
+        rankings: Списки id, каждый упорядочен по убыванию релевантности
+        k: Сглаживающая константа RRF
+
+    Returns:
+        list: id, упорядоченные по сумме 1 / (k + ранг)
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] += 1.0 / (k + rank)
+
+    return sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+
+
+def _partitions():
+    return defaultdict(lambda: defaultdict(dict))
+
+
+class LexicalIndex:
+    """
+    Инвертированный индекс с ранжированием BM25
+
+    Списки вхождений разделены по типу памяти: поиск с фильтром типа
+    (личные задачи, события) не обходит записи базы знаний
+    """
+
+    VERSION = 2
+
+    def __init__(self, path="data/cache/lexical_index.pkl", k1=1.5, b=0.75, max_df_ratio=0.5):
+        """
+        Args:
+            path: Файл снимка индекса между запусками
+            k1: Параметр насыщения частоты термина
+            b: Параметр нормализации по длине документа
+            max_df_ratio: Доля документов, при которой термин пропускается в запросе
+                          с другими терминами (частые слова вроде "на" почти не
+                          влияют на BM25, но их списки вхождений - самые длинные)
+        """
+        self.path = Path(path)
+        self.k1 = k1
+        self.b = b
+        self.max_df_ratio = max_df_ratio
+
+        # тип памяти -> term -> {id: частота}
+        self.postings = _partitions()
+        # id -> (длина в токенах, тип памяти, термины)
+        self.docs = {}
+        # тип памяти -> число записей
+        self.type_counts = defaultdict(int)
+        self.total_length = 0
+
+        self.ready = False
+        self._lock = threading.RLock()
+        self._rebuild_thread = None
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, ids, documents, metadatas):
+        """Индексация записей (повторный id заменяет старую версию)"""
+        with self._lock:
+            for doc_id, doc, meta in zip(ids, documents, metadatas):
+                if doc_id in self.docs:
+                    self._remove_one(doc_id)
+
+                tokens = tokenize(searchable_text(doc, meta))
+                freqs = defaultdict(int)
+                for token in tokens:
+                    freqs[token] += 1
+
+                doc_type = (meta or {}).get('type')
+                partition = self.postings[doc_type]
+                for term, tf in freqs.items():
+                    partition[term][doc_id] = tf
+
+                self.docs[doc_id] = (len(tokens), doc_type, tuple(freqs))
+                self.type_counts[doc_type] += 1
+                self.total_length += len(tokens)
+
+    def remove(self, ids):
+        """Удаление записей из индекса"""
+        with self._lock:
+            for doc_id in ids:
+                if doc_id in self.docs:
+                    self._remove_one(doc_id)
+
+    def _remove_one(self, doc_id):
+        length, doc_type, terms = self.docs.pop(doc_id)
+        self.total_length -= length
+        self.type_counts[doc_type] -= 1
+        if not self.type_counts[doc_type]:
+            del self.type_counts[doc_type]
+        partition = self.postings.get(doc_type)
+        if partition is None:
+            return
+        for term in terms:
+            posting = partition.get(term)
+            if posting is None:
+                continue
+            posting.pop(doc_id, None)
+            if not posting:
+                del partition[term]
+        if not partition:
+            del self.postings[doc_type]
+
+    def _document_frequency(self, term):
+        """Число документов с термином (по всем типам, без обхода списков)"""
+        return sum(len(partition.get(term, ())) for partition in self.postings.values())
+
+    def _term_postings(self, term, memory_type=None):
+        """Списки вхождений термина: только раздел типа или все разделы"""
+        if memory_type:
+            posting = self.postings.get(memory_type, {}).get(term)
+            return [posting] if posting else []
+        return [partition[term] for partition in self.postings.values() if term in partition]
+
+    def search(self, query, n_results=5, memory_type=None):
+        """
+        Поиск BM25
+
+        Args:
+            query: Поисковый запрос
+            n_results: Количество результатов
+            memory_type: Фильтр по типу памяти
+
+        Returns:
+            list: Пары (id, score) по убыванию score
+        """
+        terms = set(tokenize(query))
+
+        with self._lock:
+            doc_count = len(self.docs)
+            if not doc_count or not terms:
+                return []
+
+            avg_length = self.total_length / doc_count
+            scores = defaultdict(float)
+
+            # Частота термина в просматриваемых разделах: решает, какие термины
+            # пропустить, и не зависит от размера других разделов
+            postings = {term: self._term_postings(term, memory_type) for term in terms}
+            postings = {term: parts for term, parts in postings.items() if parts}
+            searched = self.type_counts.get(memory_type, 0) if memory_type else doc_count
+            rare = {
+                term: parts for term, parts in postings.items()
+                if sum(map(len, parts)) <= self.max_df_ratio * searched
+            }
+            if rare:
+                postings = rare
+
+            for term, parts in postings.items():
+                # IDF - по всему индексу, как и без фильтра
+                df = self._document_frequency(term)
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                for posting in parts:
+                    for doc_id, tf in posting.items():
+                        length = self.docs[doc_id][0]
+                        norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                        scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(n_results, scores.items(), key=lambda item: item[1])
+
+    def candidates_with_all_terms(self, phrase, memory_type=None, limit=200):
+        """
+        id записей, содержащих все токены фразы
+
+        Порядок слов не проверяется - это делает вызывающий код по тексту записи.
+
+        Returns:
+            list: id, отсортированные по BM25
+        """
+        terms = set(tokenize(phrase))
+        if not terms:
+            return []
+
+        with self._lock:
+            postings = []
+            for term in terms:
+                parts = self._term_postings(term, memory_type)
+                if not parts:
+                    return []
+                postings.append(parts)
+
+            postings.sort(key=lambda parts: sum(map(len, parts)))
+            matched = set().union(*postings[0])
+            for parts in postings[1:]:
+                matched = {doc_id for doc_id in matched if any(doc_id in posting for posting in parts)}
+                if not matched:
+                    return []
+
+        if len(matched) <= limit:
+            ranked = dict(self.search(phrase, n_results=len(self.docs), memory_type=memory_type))
+            return sorted(matched, key=lambda doc_id: ranked.get(doc_id, 0.0), reverse=True)
+
+        return [doc_id for doc_id, _ in self.search(phrase, n_results=limit, memory_type=memory_type)
+                if doc_id in matched]
+
+    def bootstrap(self, collection, page_size=1000):
+        """
+        Загрузка снимка или фоновое построение индекса по коллекции
+
+        Пока индекс строится, ready == False и поиск должен
+        обходиться векторной частью.
+        """
+        if self._load() and len(self.docs) == collection.count():
+            self.ready = True
+            return
+
+        self.rebuild(collection, page_size=page_size)
+
+    def rebuild(self, collection, page_size=1000):
+        """Фоновое постраничное построение индекса"""
+        if self._rebuild_thread and self._rebuild_thread.is_alive():
+            return
+
+        self.ready = False
+
+        def run():
+            offset = 0
+            try:
+                with self._lock:
+                    self.postings = _partitions()
+                    self.docs = {}
+                    self.type_counts = defaultdict(int)
+                    self.total_length = 0
+
+                while True:
+                    page = collection.get(limit=page_size, offset=offset,
+                                          include=["documents", "metadatas"])
+                    if not page['ids']:
+                        break
+                    # add() идемпотентен, поэтому параллельные записи не теряются
+                    self.add(page['ids'], page['documents'], page['metadatas'])
+                    offset += len(page['ids'])
+            except Exception as e:
+                logger.error(f"Ошибка построения лексического индекса: {e}")
+                return
+
+            self.ready = True
+            self.save()
+            logger.info(f"Лексический индекс построен: {len(self.docs)} записей")
+
+        self._rebuild_thread = threading.Thread(target=run, name="lexical-index", daemon=True)
+        self._rebuild_thread.start()
+
+    def verify(self, collection):
+        """Перестроение, если индекс разошёлся с коллекцией"""
+        if collection.count() != len(self.docs):
+            self.rebuild(collection)
+
+    def _load(self):
+        """Загрузка снимка индекса"""
+        if not self.path.exists():
+            return False
+
+        try:
+            with open(self.path, 'rb') as f:
+                state = pickle.load(f)
+            if state.get('version') != self.VERSION:
+                return False
+            with self._lock:
+                self.postings = _partitions()
+                for doc_type, partition in state['postings'].items():
+                    self.postings[doc_type].update(partition)
+                self.docs = state['docs']
+                self.type_counts = defaultdict(int)
+                for _, doc_type, _ in self.docs.values():
+                    self.type_counts[doc_type] += 1
+                self.total_length = state['total_length']
+            return True
+        except Exception as e:
+            logger.warning(f"Не удалось загрузить лексический индекс: {e}")
+            return False
+
+    def save(self):
+        """Сохранение снимка индекса"""
+        if not self.ready:
+            return
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._lock:
+                state = {
+                    'version': self.VERSION,
+                    'postings': {doc_type: dict(partition) for doc_type, partition in self.postings.items()},
+                    'docs': self.docs,
+                    'total_length': self.total_length,
+                }
+                tmp_path = self.path.with_suffix('.tmp')
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            tmp_path.replace(self.path)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить лексический индекс: {e}")
@@ -0,0 +1,76 @@
+"""
+Квантованное хранилище эмбеддингов для базы знаний
+Векторы хранятся в float16 или int8 с масштабом на вектор
+(NumpyVectorStore), тексты и метаданные - в SQLite
+"""
+
+import numpy as np
+
+from jarvis.core.memory.vector_store import NumpyVectorStore, quantize, dequantize, _unit
+
+QUANTIZATION_MODES = ('float16', 'int8')
+
+
+def evaluate_recall(vectors, queries, mode, k=10):
+    """
+    Оценка потери качества поиска при квантовании
+
+    Сравнивает top-k по квантованной матрице с точным top-k по float32.
+
+    Args:
+        vectors: База векторов (n, dim)
+        queries: Запросы (m, dim)
+        mode: float16 или int8
+        k: Глубина сравнения
+
+    Returns:
+        dict: recall@k, размеры в байтах и коэффициент сжатия
+    """
+    vectors = _unit(vectors)
+    queries = _unit(queries)
+    k = min(k, len(vectors))
+
+    codes, scales = quantize(vectors, mode)
+    approx = dequantize(codes, scales)
+
+    exact_scores = queries @ vectors.T
+    approx_scores = queries @ approx.T
+
+    exact_top = np.argpartition(-exact_scores, k - 1, axis=1)[:, :k]
+    approx_top = np.argpartition(-approx_scores, k - 1, axis=1)[:, :k]
+
+    overlap = [
+        len(set(exact_row.tolist()) & set(approx_row.tolist()))
+        for exact_row, approx_row in zip(exact_top, approx_top)
+    ]
+
+    float32_bytes = vectors.nbytes
+    quantized_bytes = codes.nbytes + (scales.nbytes if scales is not None else 0)
+
+    return {
+        'mode': mode,
+        'k': k,
+        'recall_at_k': float(np.mean(overlap)) / k,
+        'float32_bytes': int(float32_bytes),
+        'quantized_bytes': int(quantized_bytes),
+        'compression': float32_bytes / quantized_bytes,
+    }
+
+
+class QuantizedStore(NumpyVectorStore):
+    """Хранилище с квантованными векторами (float16 или int8) для базы знаний"""
+
+    def __init__(self, path="data/knowledge_store", mode='int8', rescore_fn=None, rescore_factor=4):
+        """
+        Args:
+            path: Папка хранилища
+            mode: float16 или int8
+            rescore_fn: Функция rescore_fn(documents) -> эмбеддинги float32 для
+                        пересчёта близости лучших кандидатов (None - без пересчёта)
+            rescore_factor: Во сколько раз больше кандидатов отбирать для пересчёта
+        """
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Неизвестный режим квантования: {mode}")
+
+        super().__init__(path, dtype=mode, rescore_fn=rescore_fn, rescore_factor=rescore_factor)
+        self.mode = self.dtype
@@ -0,0 +1,147 @@
+"""
+Кэш результатов поиска в памяти
+Записи устаревают по TTL и по счётчикам поколений, которые растут при записи/удалении
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from jarvis.core.memory.lexical import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query):
+    """Нормализация запроса для ключа: регистр, ё/е, пунктуация и пробелы"""
+    return " ".join(tokenize(query))
+
+
+class QueryCache:
+    """Ограниченный LRU-кэш результатов recall с TTL и инвалидацией по типам"""
+
+    def __init__(self, max_entries=1024, ttl=300, background_types=None):
+        """
+        Args:
+            max_entries: Максимум закэшированных запросов
+            ttl: Время жизни результата в секундах
+            background_types: Типы фоновой записи (знания краулеров и т.п.):
+                              добавление таких записей не сбрасывает запросы
+                              без фильтра, они обновляются по TTL
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.background_types = set(background_types or ())
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Поколения: общее (для запросов без фильтра) и по типам памяти
+        self._global_generation = 0
+        self._type_generations = defaultdict(int)
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'stale': 0,
+        }
+
+    @staticmethod
+    def make_key(query, memory_type, n_results, exact=False):
+        """Ключ кэша"""
+        return (normalize_query(query), memory_type, n_results, exact)
+
+    def generation(self, memory_type):
+        """Текущее поколение для фильтра (None - любой тип)"""
+        with self._lock:
+            if memory_type is None:
+                return self._global_generation
+            return self._type_generations[memory_type]
+
+    def get(self, key):
+        """
+        Результат из кэша
+
+        Returns:
+            list или None, если записи нет, она устарела или инвалидирована
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            value, created_at, generation = entry
+            memory_type = key[1]
+            current = self._global_generation if memory_type is None else self._type_generations[memory_type]
+
+            if generation != current:
+                del self._entries[key]
+                self.stats['stale'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            if time.monotonic() - created_at > self.ttl:
+                del self._entries[key]
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return list(value)
+
+    def put(self, key, value, generation):
+        """
+        Сохранение результата
+
+        Args:
+            key: Ключ из make_key
+            value: Список воспоминаний
+            generation: Поколение, снятое до начала поиска (запись,
+                        случившаяся во время поиска, сделает результат устаревшим)
+        """
+        with self._lock:
+            self._entries[key] = (list(value), time.monotonic(), generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, memory_types=None, added=False):
+        """
+        Инвалидация после записи или удаления
+
+        Args:
+            memory_types: Затронутые типы памяти (None - все)
+            added: Записи только добавлены (не удалены и не заменены): батч
+                   из одних фоновых типов не сбрасывает запросы без фильтра
+        """
+        with self._lock:
+            if memory_types is None:
+                self._global_generation += 1
+                for memory_type in list(self._type_generations):
+                    self._type_generations[memory_type] += 1
+                self._entries.clear()
+                return
+
+            memory_types = set(memory_types)
+            if not (added and memory_types <= self.background_types):
+                self._global_generation += 1
+
+            for memory_type in memory_types:
+                self._type_generations[memory_type] += 1
+
+    def hit_rate(self):
+        """Доля попаданий"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def snapshot(self):
+        """Счётчики для статистики"""
+        with self._lock:
+            snapshot = dict(self.stats)
+            snapshot['entries'] = len(self._entries)
+        snapshot['hit_rate'] = self.hit_rate()
+        return snapshot
@@ -0,0 +1,172 @@
+"""
+Очистка старых воспоминаний постраничным проходом
+Фильтрация по числовым epoch/importance выполняется в базе, а не в Python
+"""
+
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+
+from jarvis.utils.persistence import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionSweeper:
+    """Постраничная, возобновляемая очистка коллекции"""
+
+    def __init__(self, collection, state_path="data/cache/retention_state.json", page_size=500,
+                 on_delete=None):
+        """
+        Args:
+            collection: Векторное хранилище (VectorStore)
+            state_path: Файл с прогрессом (для возобновления после остановки)
+            page_size: Размер страницы при чтении и удалении
+            on_delete: Функция on_delete(ids, metadatas), вызываемая для каждой удалённой страницы
+        """
+        self.collection = collection
+        self.state_path = Path(state_path)
+        self.page_size = page_size
+        self.on_delete = on_delete
+        self.state = self._load_state()
+
+    def _load_state(self):
+        """Загрузка прогресса предыдущих проходов"""
+        if self.state_path.exists():
+            try:
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"Не удалось прочитать состояние очистки: {e}")
+
+        return {'backfill_offset': 0, 'backfill_done': False}
+
+    def _save_state(self):
+        """Сохранение прогресса"""
+        try:
+            write_json_atomic(self.state_path, self.state)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить состояние очистки: {e}")
+
+    def backfill(self, progress=None):
+        """
+        Однократное заполнение epoch/importance у старых записей
+
+        Записи, созданные до появления числового epoch, хранят только
+        ISO-строку timestamp. Проход идёт страницами и запоминает
+        смещение, поэтому прерванная миграция продолжается с того же места.
+
+        Args:
+            progress: Функция progress(stage, done) для отчёта о ходе
+
+        Returns:
+            int: Количество обновлённых записей
+        """
+        if self.state.get('backfill_done'):
+            return 0
+
+        offset = self.state.get('backfill_offset', 0)
+        updated_total = 0
+
+        while True:
+            page = self.collection.get(limit=self.page_size, offset=offset, include=["metadatas"])
+            if not page['ids']:
+                break
+
+            ids = []
+            metadatas = []
+            for memory_id, meta in zip(page['ids'], page['metadatas']):
+                meta = meta or {}
+                if 'epoch' in meta and 'importance' in meta:
+                    continue
+
+                updated = dict(meta)
+                updated['epoch'] = _parse_epoch(meta.get('timestamp'))
+                updated['importance'] = float(meta.get('importance', 0.5))
+                ids.append(memory_id)
+                metadatas.append(updated)
+
+            if ids:
+                self.collection.update(ids=ids, metadatas=metadatas)
+                updated_total += len(ids)
+
+            offset += len(page['ids'])
+            self.state['backfill_offset'] = offset
+            self._save_state()
+
+            if progress:
+                progress('backfill', offset)
+
+        self.state['backfill_done'] = True
+        self._save_state()
+
+        if updated_total:
+            logger.info(f"Миграция метаданных: epoch добавлен {updated_total} записям")
+
+        return updated_total
+
+    def sweep(self, cutoff_epoch, max_importance=0.7, progress=None):
+        """
+        Удаление записей старше cutoff_epoch с importance ниже порога
+
+        Каждая страница выбирается фильтром where и сразу удаляется,
+        так что память не зависит от размера коллекции, а повторный
+        запуск после остановки просто продолжает удаление.
+
+        Args:
+            cutoff_epoch: Граница по времени (секунды Unix)
+            max_importance: Записи с importance не ниже порога сохраняются
+            progress: Функция progress(stage, done) для отчёта о ходе
+
+        Returns:
+            int: Количество удалённых записей
+        """
+        where = {"$and": [
+            {"epoch": {"$lt": cutoff_epoch}},
+            {"importance": {"$lt": max_importance}},
+        ]}
+
+        deleted = 0
+        while True:
+            include = ["metadatas"] if self.on_delete else []
+            page = self.collection.get(where=where, limit=self.page_size, include=include)
+            if not page['ids']:
+                break
+
+            self.collection.delete(ids=page['ids'])
+            deleted += len(page['ids'])
+
+            if self.on_delete:
+                self.on_delete(page['ids'], page['metadatas'])
+
+            if progress:
+                progress('sweep', deleted)
+
+        self.state['last_sweep'] = {
+            'finished_at': datetime.now().isoformat(),
+            'cutoff_epoch': cutoff_epoch,
+            'deleted': deleted,
+        }
+        self._save_state()
+
+        return deleted
+
+    def run(self, cutoff_epoch, max_importance=0.7, progress=None):
+        """
+        Полный проход: миграция (если нужна) и очистка
+
+        Returns:
+            dict: Сколько записей обновлено и удалено
+        """
+        backfilled = self.backfill(progress=progress)
+        deleted = self.sweep(cutoff_epoch, max_importance=max_importance, progress=progress)
+        return {'backfilled': backfilled, 'deleted': deleted}
+
+
+def _parse_epoch(timestamp):
+    """ISO-строка времени -> секунды Unix (0 для нераспознанных значений)"""
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
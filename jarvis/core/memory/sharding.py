@@ -0,0 +1,170 @@
+"""
+Разделение памяти на шарды: персональные записи и выученные знания
+Запись и поиск с фильтром по типу идут только в нужный шард, поиск без
+фильтра опрашивает оба и объединяет top-k по расстоянию
+"""
+
+import logging
+import threading
+
+import numpy as np
+
+from jarvis.core.memory.vector_store import ChainedCollection
+
+logger = logging.getLogger(__name__)
+
+# Типы, которые хранятся в шарде выученных знаний
+DEFAULT_LEARNED_TYPES = ['knowledge', 'learned_knowledge', 'deep_knowledge', 'continuous_learning']
+
+
+def types_in_filter(where):
+    """
+    Типы памяти, которыми ограничен фильтр
+
+    Returns:
+        set: Множество типов или None, если фильтр не ограничивает тип
+    """
+    if not where:
+        return None
+
+    if '$and' in where and len(where) == 1:
+        for part in where['$and']:
+            types = types_in_filter(part)
+            if types is not None:
+                return types
+        return None
+
+    condition = where.get('type')
+    if condition is None:
+        return None
+    if not isinstance(condition, dict):
+        return {condition}
+    if set(condition) == {'$eq'}:
+        return {condition['$eq']}
+    if set(condition) == {'$in'}:
+        return set(condition['$in'])
+    return None
+
+
+class ShardedStore(ChainedCollection):
+    """Персональный и выученный шарды под интерфейсом одного хранилища"""
+
+    def __init__(self, personal, learned, learned_types=None):
+        """
+        Args:
+            personal: Хранилище персональных записей (задачи, события, предпочтения, диалоги)
+            learned: Хранилище выученных знаний
+            learned_types: Типы памяти, которые пишутся в learned
+        """
+        super().__init__(personal, learned)
+        self.personal = personal
+        self.learned = learned
+        self.learned_types = set(learned_types if learned_types is not None else DEFAULT_LEARNED_TYPES)
+
+        # Пока старые выученные записи не перенесены из персонального шарда,
+        # запросы по выученным типам опрашивают оба шарда
+        self.migrated = False
+        self._migration_thread = None
+
+        self.stats = {'routed': 0, 'fanned_out': 0, 'migrated': 0}
+
+    def shards_for(self, where):
+        """Шарды, в которых могут быть записи под фильтр"""
+        types = types_in_filter(where)
+        if types is None:
+            return [self.personal, self.learned]
+
+        shards = []
+        if types - self.learned_types:
+            shards.append(self.personal)
+        if types & self.learned_types:
+            if not self.migrated and self.personal not in shards:
+                shards.append(self.personal)
+            shards.append(self.learned)
+        return shards
+
+    def add(self, ids, documents, metadatas, embeddings):
+        """Добавление записей в шарды по типу"""
+        self._write('add', ids, documents, metadatas, embeddings)
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        """Добавление или замена записей в шардах по типу"""
+        self._write('upsert', ids, documents, metadatas, embeddings)
+
+    def _write(self, method, ids, documents, metadatas, embeddings):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+
+        learned = []
+        personal = []
+        for idx, meta in enumerate(metadatas):
+            (learned if (meta or {}).get('type') in self.learned_types else personal).append(idx)
+
+        for shard, indices in ((self.personal, personal), (self.learned, learned)):
+            if indices:
+                getattr(shard, method)(
+                    ids=[ids[i] for i in indices],
+                    documents=[documents[i] for i in indices],
+                    metadatas=[metadatas[i] for i in indices],
+                    embeddings=embeddings[indices]
+                )
+
+    def query(self, query_embeddings, n_results=5, where=None, include=None):
+        """Поиск: с фильтром по типу - в своём шарде, иначе по обоим со слиянием top-k"""
+        shards = self.shards_for(where)
+        if len(shards) == 1:
+            self.stats['routed'] += 1
+            return shards[0].query(query_embeddings=query_embeddings, n_results=n_results,
+                                   where=where, include=include)
+
+        self.stats['fanned_out'] += 1
+        return ChainedCollection(*shards).query(query_embeddings, n_results=n_results,
+                                                where=where, include=include)
+
+    def get(self, ids=None, where=None, limit=None, offset=0, include=None, where_document=None):
+        """Выборка: с фильтром по типу - только из подходящих шардов"""
+        shards = self.shards_for(where) if ids is None else [self.personal, self.learned]
+        return ChainedCollection(*shards).get(ids=ids, where=where, limit=limit, offset=offset,
+                                              include=include, where_document=where_document)
+
+    def migrate(self, page_size=1000):
+        """
+        Фоновый перенос выученных записей из персонального шарда
+
+        Нужен для базы, созданной до разделения: записи копируются в
+        learned вместе с эмбеддингами (без повторного кодирования).
+
+        Returns:
+            threading.Thread: Поток переноса (для ожидания завершения)
+        """
+        where = {"type": {"$in": sorted(self.learned_types)}}
+
+        def run():
+            try:
+                while True:
+                    page = self.personal.get(
+                        where=where,
+                        limit=page_size,
+                        include=["documents", "metadatas", "embeddings"]
+                    )
+                    if not len(page['ids']):
+                        break
+                    self.learned.upsert(page['ids'], page['documents'], page['metadatas'], page['embeddings'])
+                    self.personal.delete(ids=list(page['ids']))
+                    self.stats['migrated'] += len(page['ids'])
+            except Exception as e:
+                logger.error(f"Ошибка переноса выученных записей в отдельный шард: {e}")
+                return
+
+            self.migrated = True
+            if self.stats['migrated']:
+                logger.info(f"В шард выученных знаний перенесено записей: {self.stats['migrated']}")
+
+        self._migration_thread = threading.Thread(target=run, name="memory-shard-migration", daemon=True)
+        self._migration_thread.start()
+        return self._migration_thread
+
+    def snapshot(self):
+        """Счётчики для статистики"""
+        snapshot = dict(self.stats)
+        snapshot['migrated_all'] = self.migrated
+        return snapshot
@@ -0,0 +1,190 @@
+"""
+Инкрементально поддерживаемая статистика памяти
+Счётчики обновляются при записи/удалении, чтобы GUI не сканировал базу
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+
+from jarvis.utils.persistence import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryStats:
+    """Счётчики записей по типам и источникам + последние записи"""
+
+    def __init__(self, db_path, snapshot_path="data/cache/memory_stats.json",
+                 recent_size=10, disk_refresh_seconds=60):
+        """
+        Args:
+            db_path: Папка базы данных (для подсчёта размера на диске)
+            snapshot_path: Файл снимка счётчиков между запусками
+            recent_size: Размер кольцевого буфера последних записей
+            disk_refresh_seconds: Как часто пересчитывать размер на диске
+        """
+        self.db_path = Path(db_path)
+        self.snapshot_path = Path(snapshot_path)
+        self.disk_refresh_seconds = disk_refresh_seconds
+
+        self.total = 0
+        self.by_type = Counter()
+        self.by_source = Counter()
+        self.recent = deque(maxlen=recent_size)
+
+        self.ready = False
+        self._disk_bytes = 0
+        self._disk_checked_at = 0.0
+        self._lock = threading.Lock()
+        self._rebuild_thread = None
+
+    def bootstrap(self, collection, page_size=1000):
+        """
+        Начальная загрузка счётчиков
+
+        Если снимок совпадает с количеством записей в коллекции, он
+        используется сразу. Иначе счётчики пересчитываются постранично
+        в фоновом потоке.
+        """
+        count = collection.count()
+
+        if self._load_snapshot() and self.total == count:
+            self.ready = True
+            return
+
+        self.rebuild(collection, page_size=page_size)
+
+    def rebuild(self, collection, page_size=1000):
+        """Фоновый постраничный пересчёт счётчиков"""
+        if self._rebuild_thread and self._rebuild_thread.is_alive():
+            return
+
+        def run():
+            by_type = Counter()
+            by_source = Counter()
+            total = 0
+            offset = 0
+
+            try:
+                while True:
+                    page = collection.get(limit=page_size, offset=offset, include=["metadatas"])
+                    if not page['ids']:
+                        break
+                    for meta in page['metadatas']:
+                        meta = meta or {}
+                        by_type[meta.get('type', 'unknown')] += 1
+                        by_source[meta.get('source', 'unknown')] += 1
+                    total += len(page['ids'])
+                    offset += len(page['ids'])
+            except Exception as e:
+                logger.error(f"Ошибка пересчёта статистики памяти: {e}")
+                return
+
+            with self._lock:
+                self.total = total
+                self.by_type = by_type
+                self.by_source = by_source
+                self.ready = True
+
+            self.save_snapshot()
+            logger.info(f"Статистика памяти пересчитана: {total} записей")
+
+        self._rebuild_thread = threading.Thread(target=run, name="memory-stats", daemon=True)
+        self._rebuild_thread.start()
+
+    def verify(self, collection):
+        """Пересчёт, если счётчик разошёлся с коллекцией (после импорта и т.п.)"""
+        if collection.count() != self.total:
+            self.rebuild(collection)
+
+    def record_added(self, ids, documents, metadatas):
+        """Учёт добавленных записей"""
+        with self._lock:
+            for memory_id, doc, meta in zip(ids, documents, metadatas):
+                meta = meta or {}
+                self.total += 1
+                self.by_type[meta.get('type', 'unknown')] += 1
+                self.by_source[meta.get('source', 'unknown')] += 1
+                self.recent.append({'id': memory_id, 'content': doc, 'metadata': meta})
+
+    def record_removed(self, metadatas):
+        """Учёт удалённых записей"""
+        with self._lock:
+            for meta in metadatas:
+                meta = meta or {}
+                self.total = max(0, self.total - 1)
+                self._decrement(self.by_type, meta.get('type', 'unknown'))
+                self._decrement(self.by_source, meta.get('source', 'unknown'))
+
+    @staticmethod
+    def _decrement(counter, key):
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
+
+    def disk_bytes(self):
+        """Размер базы на диске (кэшируется на disk_refresh_seconds)"""
+        now = time.monotonic()
+        if self._disk_checked_at and now - self._disk_checked_at < self.disk_refresh_seconds:
+            return self._disk_bytes
+
+        total_size = 0
+        if self.db_path.exists():
+            for root, _, files in os.walk(self.db_path):
+                for name in files:
+                    try:
+                        total_size += os.path.getsize(os.path.join(root, name))
+                    except OSError:
+                        pass
+
+        self._disk_bytes = total_size
+        self._disk_checked_at = now
+        return total_size
+
+    def snapshot(self):
+        """Копия текущих счётчиков (O(числа типов и источников))"""
+        with self._lock:
+            snapshot = {
+                'total': self.total,
+                'by_type': dict(self.by_type),
+                'by_source': dict(self.by_source),
+                'recent': list(self.recent),
+                'ready': self.ready,
+            }
+        snapshot['disk_bytes'] = self.disk_bytes()
+        snapshot['db_path'] = str(self.db_path)
+        return snapshot
+
+    def _load_snapshot(self):
+        """Загрузка снимка с прошлого запуска"""
+        if not self.snapshot_path.exists():
+            return False
+
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.total = data.get('total', 0)
+            self.by_type = Counter(data.get('by_type', {}))
+            self.by_source = Counter(data.get('by_source', {}))
+            return True
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать снимок статистики памяти: {e}")
+            return False
+
+    def save_snapshot(self):
+        """Сохранение счётчиков для быстрого старта"""
+        try:
+            with self._lock:
+                data = {
+                    'total': self.total,
+                    'by_type': dict(self.by_type),
+                    'by_source': dict(self.by_source),
+                }
+            write_json_atomic(self.snapshot_path, data)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить снимок статистики памяти: {e}")
@@ -6,14 +6,31 @@
 import asyncio
 import logging
 import json
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
 import pickle
 import numpy as np
 from collections import defaultdict
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
+
+from jarvis.core.memory.embedding_cache import EmbeddingCache, CachedEmbedder
+from jarvis.core.memory.embedders import create_embedding_model, embedding_label
+from jarvis.core.memory.ingest import IngestQueue
+from jarvis.core.memory.executor import MemoryExecutor
+from jarvis.core.memory.dedup import Deduplicator
+from jarvis.core.memory.retention import RetentionSweeper
+from jarvis.core.memory.stats import MemoryStats
+from jarvis.core.memory.lexical import (
+    LexicalIndex, normalize_for_match, reciprocal_rank_fusion, searchable_text
+)
+from jarvis.core.memory.query_cache import QueryCache
+from jarvis.core.memory.hot_tier import HotTier
+from jarvis.core.memory.chunker import TextChunker
+from jarvis.core.memory.quantized import QuantizedStore
+from jarvis.core.memory.sharding import ShardedStore, DEFAULT_LEARNED_TYPES
+from jarvis.core.memory.vector_store import create_vector_store, vector_store_path
+from jarvis.core.memory import transfer
+from jarvis.utils.persistence import save_json_later
 
 logger = logging.getLogger(__name__)
 
@@ -21,17 +38,29 @@ logger = logging.getLogger(__name__)
 class MemorySystem:
     """Система долговременной и кратковременной памяти"""
     
-    def __init__(self, config):
+    def __init__(self, config, lazy=False):
+        """
+        Args:
+            config: Конфигурация
+            lazy: Не загружать модель и базу в конструкторе (загрузка - через load();
+                  до её завершения поиск возвращает пустой результат, а запись ждёт)
+        """
         self.config = config
-        self.db_path = Path("data/memory_db")
+        self.db_path = vector_store_path(config.get('memory', {}))
         self.db_path.mkdir(parents=True, exist_ok=True)
         
-        # Векторная база данных для семантического поиска
-        self.chroma_client = None
+        # Векторное хранилище для семантического поиска (ChromaDB или NumPy + SQLite)
         self.collection = None
         
-        # Модель для создания эмбеддингов
+        # Шард выученных знаний (опционально квантованный) и общий вид на оба шарда
+        self.learned_store = None
+        self.memory_store = None
+        self.learned_types = set(DEFAULT_LEARNED_TYPES)
+        
+        # Модель для создания эмбеддингов и чанкер под её окно
         self.embedder = None
+        self.cache_disk_learned = False
+        self._chunker = None
         
         # Кратковременная память (текущая сессия)
         self.short_term_memory = []
@@ -39,37 +68,238 @@ class MemorySystem:
         # Метаданные пользователя
         self.user_profile = {}
         
+        # Очередь пакетной записи (общая для краулеров, RSS и задач)
+        self.ingest_queue = None
+        
+        # Фильтр дубликатов при записи
+        self.deduplicator = None
+        
+        # Счётчики записей (обновляются при записи и удалении)
+        self.memory_stats = MemoryStats(self.db_path)
+        
+        # Лексический индекс для гибридного поиска
+        self.retrieval_config = config.get('memory', {}).get('retrieval', {})
+        self.lexical_index = LexicalIndex(max_df_ratio=self.retrieval_config.get('lexical_max_df_ratio', 0.5))
+        
+        # Горячий уровень: рабочий набор в матрице NumPy поверх основного хранилища
+        hot_config = config.get('memory', {}).get('hot_tier', {})
+        self.hot_tier = None
+        if hot_config.get('enabled', True):
+            self.hot_tier = HotTier(
+                capacity=hot_config.get('capacity', 20000),
+                dtype=hot_config.get('dtype', 'float32'),
+                threshold=hot_config.get('threshold', 0.6),
+                promote_after=hot_config.get('promote_after', 2),
+                demote_batch=hot_config.get('demote_batch'),
+                hot_types=hot_config.get('types'),
+                min_importance=hot_config.get('min_importance', 0.8)
+            )
+        
+        # Кэш результатов поиска (сбрасывается при записи и удалении)
+        cache_config = config.get('memory', {}).get('query_cache', {})
+        self.query_cache = None
+        if cache_config.get('enabled', True):
+            self.query_cache = QueryCache(
+                max_entries=cache_config.get('max_entries', 1024),
+                ttl=cache_config.get('ttl_seconds', 300),
+                background_types=cache_config.get('background_types', DEFAULT_LEARNED_TYPES)
+            )
+        
+        # Пул для эмбеддингов и поиска вне цикла событий
+        self.executor = MemoryExecutor(
+            max_workers=config.get('memory', {}).get('max_concurrency', 2)
+        )
+        
+        # Завершение загрузки (успешной или нет)
+        self._loaded = threading.Event()
+        self._bootstrap_thread = None
+        
+        if not lazy:
+            self._initialize_memory()
+    
+    def load(self):
+        """Загрузка модели эмбеддингов и базы (для фонового потока)"""
         self._initialize_memory()
     
+    def is_ready(self):
+        """Загружена ли система памяти"""
+        return self.ingest_queue is not None
+    
+    def _wait_ready(self, timeout=None):
+        """Ожидание завершения загрузки (в потоке)"""
+        self._loaded.wait(timeout)
+        return self.is_ready()
+    
     def _initialize_memory(self):
         """Инициализация систем памяти"""
         try:
             logger.info("Инициализация системы памяти...")
             
-            # Инициализация ChromaDB
-            self.chroma_client = chromadb.PersistentClient(
-                path=str(self.db_path),
-                settings=Settings(anonymized_telemetry=False)
-            )
+            memory_config = self.config.get('memory', {})
             
-            # Создание или получение коллекции
-            self.collection = self.chroma_client.get_or_create_collection(
-                name="jarvis_memory",
-                metadata={"hnsw:space": "cosine"}
-            )
+            # Векторное хранилище (бэкенд из config.memory.vector_store)
+            self.collection = create_vector_store(memory_config)
+            logger.info(f"Векторное хранилище: {type(self.collection).__name__} ({self.db_path})")
             
-            # Загрузка модели для эмбеддингов
+            # Загрузка модели для эмбеддингов (общая для всех потребителей, с кэшем)
             logger.info("Загрузка модели эмбеддингов...")
-            self.embedder = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+            self.embedder = self._create_embedder()
+            
+            # Выученные знания - в отдельном шарде (квантованном, если он включён),
+            # чтобы поиск персональных записей не зависел от объёма базы знаний
+            self.memory_store = self.collection
+            sharding_config = memory_config.get('sharding', {})
+            quantized_config = memory_config.get('quantized_store', {})
+            learned_types = sharding_config.get('learned_types', quantized_config.get('types', DEFAULT_LEARNED_TYPES))
+            self.learned_types = set(learned_types)
+            if quantized_config.get('enabled', False):
+                rescore_fn = None
+                if quantized_config.get('rescore', False):
+                    rescore_fn = lambda texts: self._encode_for_store(texts, learned=True)
+                self.learned_store = QuantizedStore(
+                    quantized_config.get('path', 'data/knowledge_store'),
+                    mode=quantized_config.get('mode', 'int8'),
+                    rescore_fn=rescore_fn,
+                    rescore_factor=quantized_config.get('rescore_factor', 4)
+                )
+            elif sharding_config.get('enabled', True):
+                self.learned_store = create_vector_store(memory_config, shard='learned')
+            
+            migration = None
+            if self.learned_store is not None:
+                self.memory_store = ShardedStore(self.collection, self.learned_store, learned_types)
+                migration = self.memory_store.migrate(page_size=sharding_config.get('migration_page_size', 1000))
             
             # Загрузка профиля пользователя
             self._load_user_profile()
             
-            logger.info(f"Система памяти инициализирована. Записей: {self.collection.count()}")
+            # Счётчики, BM25 и горячий уровень - после переноса между шардами
+            self._bootstrap_indexes(migration)
+            
+            dedup_config = self.config.get('memory', {}).get('dedup', {})
+            self.deduplicator = Deduplicator(
+                self.memory_store,
+                enabled=dedup_config.get('enabled', True),
+                threshold=dedup_config.get('near_duplicate_threshold', 0.95),
+                near_types=dedup_config.get('near_duplicate_types'),
+                repeat_importance_step=dedup_config.get('repeat_importance_step', 0.05),
+                repeat_importance_cap=dedup_config.get('repeat_importance_cap', 0.6)
+            )
+            
+            # Запуск потока пакетной записи
+            ingest_config = self.config.get('memory', {}).get('ingest', {})
+            self.ingest_queue = IngestQueue(
+                self._write_batch,
+                max_pending=ingest_config.get('max_pending', 10000),
+                batch_size=ingest_config.get('batch_size', 256),
+                flush_interval=ingest_config.get('flush_interval', 1.0),
+                max_retries=ingest_config.get('max_retries', 3),
+                retry_delay=ingest_config.get('retry_delay', 0.5)
+            )
+            
+            logger.info(f"Система памяти инициализирована. Записей: {self.memory_store.count()}")
             
         except Exception as e:
             logger.error(f"Ошибка инициализации памяти: {e}")
             raise
+        finally:
+            self._loaded.set()
+    
+    def _create_embedder(self):
+        """Создание модели эмбеддингов (бэкенд из конфига), обёрнутой кэшем"""
+        memory_config = self.config.get('memory', {})
+        spec = memory_config.get('embedding_model', 'paraphrase-multilingual-MiniLM-L12-v2')
+        model = create_embedding_model(spec)
+        model_name = embedding_label(spec)
+        
+        cache_config = memory_config.get('embedding_cache', {})
+        self.cache_disk_learned = cache_config.get('disk_learned', False)
+        if not cache_config.get('enabled', True):
+            return model
+        
+        cache = EmbeddingCache(
+            model_name,
+            cache_dir=cache_config.get('path', 'data/cache/embeddings'),
+            max_ram_entries=cache_config.get('max_ram_entries', 50000),
+            disk_enabled=cache_config.get('disk', True)
+        )
+        return CachedEmbedder(model, model_name, cache)
+    
+    def _bootstrap_indexes(self, migration=None):
+        """
+        Загрузка производных индексов: счётчиков, BM25 и горячего уровня
+        
+        Их пересчёт читает хранилище страницами по offset. Перенос записей
+        между шардами сдвигает строки, и страницы пропускали бы или
+        повторяли записи, поэтому при идущем переносе загрузка ждёт его
+        завершения в отдельном потоке (до этого поиск идёт без них).
+        
+        Args:
+            migration: Поток переноса между шардами (None - переноса нет)
+        """
+        def run():
+            if migration is not None:
+                migration.join()
+            
+            # Счётчики из снимка или фоновым пересчётом
+            self.memory_stats.bootstrap(self.memory_store)
+            
+            if self.retrieval_config.get('lexical', True):
+                self.lexical_index.bootstrap(self.memory_store)
+            
+            if self.hot_tier is not None:
+                self.hot_tier.bootstrap(self.memory_store)
+        
+        if migration is None or not migration.is_alive():
+            run()
+            return
+        
+        self._bootstrap_thread = threading.Thread(target=run, name="memory-bootstrap", daemon=True)
+        self._bootstrap_thread.start()
+    
+    def text_chunker(self):
+        """
+        Общий чанкер под окно модели эмбеддингов (config.memory.chunking)
+        
+        До загрузки модели возвращается чанкер с окном по умолчанию.
+        """
+        if self._chunker is not None:
+            return self._chunker
+        
+        chunk_config = self.config.get('memory', {}).get('chunking', {})
+        chunker = TextChunker.for_model(
+            self.embedder,
+            overlap_tokens=chunk_config.get('overlap_tokens', 16),
+            max_tokens=chunk_config.get('max_tokens'),
+            max_chunks=chunk_config.get('max_chunks')
+        )
+        if self.embedder is not None:
+            self._chunker = chunker
+        return chunker
+    
+    def embedding_cache_stats(self):
+        """Счётчики кэша эмбеддингов (пусто, если кэш выключен)"""
+        cache = getattr(self.embedder, 'cache', None)
+        return cache.stats() if cache else {}
+    
+    def stats(self):
+        """
+        Статистика памяти без обращения к базе
+        
+        Returns:
+            dict: total, by_type, by_source, recent, db_size_mb, db_path,
+                  ready (False, пока идёт начальный пересчёт) и счётчики
+                  очереди записи и дедупликации
+        """
+        snapshot = self.memory_stats.snapshot()
+        snapshot['db_size_mb'] = snapshot.pop('disk_bytes') / (1024 * 1024)
+        snapshot['ingest'] = self.ingest_queue.get_stats() if self.ingest_queue else {}
+        snapshot['pending'] = self.ingest_queue.pending() if self.ingest_queue else 0
+        snapshot['dedup'] = dict(self.deduplicator.stats) if self.deduplicator else {}
+        snapshot['query_cache'] = self.query_cache.snapshot() if self.query_cache else {}
+        snapshot['hot_tier'] = self.hot_tier.snapshot() if self.hot_tier is not None else {}
+        snapshot['shards'] = self.memory_store.snapshot() if isinstance(self.memory_store, ShardedStore) else {}
+        return snapshot
     
     def _load_user_profile(self):
         """Загрузка профиля пользователя"""
@@ -90,15 +320,32 @@ class MemorySystem:
             self._save_user_profile()
     
     def _save_user_profile(self):
-        """Сохранение профиля пользователя"""
-        profile_path = Path("data/user_profile.json")
-        with open(profile_path, 'w', encoding='utf-8') as f:
-            json.dump(self.user_profile, f, ensure_ascii=False, indent=2)
+        """Сохранение профиля пользователя (отложенная атомарная запись)"""
+        save_json_later(Path("data/user_profile.json"), lambda: self.user_profile)
+    
+    def _build_metadata(self, memory_type, metadata=None):
+        """Подготовка метаданных записи"""
+        now = datetime.now()
+        meta = {
+            'type': memory_type,
+            'timestamp': now.isoformat(),
+            # Числовое время для фильтров where при очистке
+            'epoch': now.timestamp(),
+            'importance': metadata.get('importance', 0.5) if metadata else 0.5
+        }
+        
+        if metadata:
+            meta.update(metadata)
+        
+        return meta
     
     async def store_memory(self, content, memory_type="general", metadata=None):
         """
         Сохранение информации в долговременную память
         
+        Эмбеддинг и запись в базу выполняются в пуле потоков,
+        цикл событий в это время свободен.
+        
         Args:
             content: Текстовое содержание для сохранения
             memory_type: Тип памяти (general, task, preference, fact)
@@ -108,68 +355,262 @@ class MemorySystem:
             if not content:
                 return
             
-            # Создание эмбеддинга
-            embedding = self.embedder.encode(content).tolist()
-            
-            # Подготовка метаданных
-            meta = {
-                'type': memory_type,
-                'timestamp': datetime.now().isoformat(),
-                'importance': metadata.get('importance', 0.5) if metadata else 0.5
-            }
-            
-            if metadata:
-                meta.update(metadata)
-            
-            # Генерация уникального ID
-            memory_id = f"{memory_type}_{datetime.now().timestamp()}"
-            
-            # Сохранение в векторную БД
-            self.collection.add(
-                embeddings=[embedding],
-                documents=[content],
-                metadatas=[meta],
-                ids=[memory_id]
-            )
+            await self.executor.run(self._store_sync, content, memory_type, metadata)
             
             logger.info(f"Память сохранена: {memory_type} - {content[:50]}...")
             
         except Exception as e:
             logger.error(f"Ошибка сохранения памяти: {e}")
     
-    async def recall_memory(self, query, n_results=5, memory_type=None):
+    def _store_sync(self, content, memory_type, metadata):
+        """Синхронное сохранение одной записи"""
+        if not self._wait_ready():
+            raise RuntimeError("система памяти не загружена")
+        
+        self._write_batch([{
+            'content': content,
+            'memory_type': memory_type,
+            'meta': self._build_metadata(memory_type, metadata)
+        }])
+    
+    def ingest(self, content, memory_type="general", metadata=None, timeout=None):
+        """
+        Постановка записи в очередь пакетной записи
+        
+        Потокобезопасно и не ждёт кодирования: запись попадёт в базу
+        вместе с другими элементами одним батчем. Если очередь
+        заполнена, вызывающий поток блокируется (backpressure).
+        
+        Args:
+            content: Текстовое содержание для сохранения
+            memory_type: Тип памяти
+            metadata: Дополнительные метаданные
+            timeout: Сколько ждать места в очереди (None - бесконечно)
+            
+        Returns:
+            bool: True, если запись принята
+        """
+        if not content:
+            return False
+        
+        # Во время фоновой загрузки запись ждёт готовности очереди
+        if self.ingest_queue is None and not self._wait_ready(timeout):
+            logger.warning("Система памяти не готова, запись отклонена")
+            return False
+        
+        return self.ingest_queue.put({
+            'content': content,
+            'memory_type': memory_type,
+            'meta': self._build_metadata(memory_type, metadata)
+        }, timeout=timeout)
+    
+    async def ingest_async(self, content, memory_type="general", metadata=None):
+        """
+        Постановка записи в очередь из корутины
+        
+        При заполненной очереди ожидание места уходит в пул потоков,
+        чтобы не блокировать цикл событий.
+        """
+        if self.is_ready() and not self.ingest_queue.full():
+            return self.ingest(content, memory_type, metadata)
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, lambda: self.ingest(content, memory_type, metadata)
+        )
+    
+    def flush(self, timeout=None):
+        """
+        Синхронная запись всех записей из очереди
+        
+        Args:
+            timeout: Максимальное время ожидания (None - бесконечно)
+            
+        Returns:
+            bool: True, если очередь записана и ни один батч не потерян
+        """
+        if self.ingest_queue is None:
+            return True
+        return self.ingest_queue.flush(timeout=timeout)
+    
+    def ingest_batch(self, records):
+        """
+        Синхронная пакетная запись (импорт, перенос данных)
+        
+        Запись идёт в вызывающем потоке, минуя очередь. Вместе с
+        хранилищем обновляются все производные индексы: статистика,
+        BM25, горячий уровень и кэш поиска.
+        
+        Args:
+            records: Словари {'content', 'memory_type', 'metadata'}. Записи
+                     с готовыми 'id' и 'embedding' добавляются как есть (upsert
+                     по id, без кодирования и дедупликации), остальные -
+                     через дедупликацию и кодирование батчем
+        
+        Returns:
+            int: Количество обработанных записей
+        """
+        if not records:
+            return 0
+        
+        if not self._wait_ready():
+            raise RuntimeError("система памяти не загружена")
+        
+        encoded = [record for record in records if record.get('embedding') is not None]
+        plain = [record for record in records if record.get('embedding') is None]
+        
+        if encoded:
+            self._upsert_encoded(
+                [record['id'] for record in encoded],
+                [record['content'] for record in encoded],
+                [record.get('metadata') or {} for record in encoded],
+                [record['embedding'] for record in encoded]
+            )
+        
+        if plain:
+            self._write_batch([
+                {
+                    'content': record['content'],
+                    'memory_type': record.get('memory_type', 'general'),
+                    'meta': self._build_metadata(record.get('memory_type', 'general'), record.get('metadata'))
+                }
+                for record in plain
+            ])
+        
+        return len(records)
+    
+    def _upsert_encoded(self, ids, documents, metadatas, embeddings):
+        """Upsert записей с готовыми эмбеддингами и обновление производных индексов"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        
+        # Заменяемые записи сначала вычитаются из счётчиков
+        replaced = self._get_by_ids(ids)
+        if replaced:
+            self.memory_stats.record_removed([record['metadata'] for record in replaced.values()])
+        
+        self._add_records(ids, documents, metadatas, embeddings, upsert=True)
+        self.memory_stats.record_added(ids, documents, metadatas)
+        self.lexical_index.add(ids, documents, metadatas)
+        if self.hot_tier is not None:
+            self.hot_tier.add(ids, documents, metadatas, embeddings)
+        self._invalidate_query_cache(list({meta.get('type') for meta in metadatas}))
+    
+    def _write_batch(self, items):
+        """
+        Запись батча: одно кодирование и один upsert
+        
+        id записи выводится из содержимого, темы и источника. Уже
+        сохранённые записи, точные и почти-дубликаты не кодируются и не
+        добавляются, вместо этого у существующей записи растут
+        seen_count и importance.
+        """
+        learned_texts = {item['content'] for item in items if item['memory_type'] in self.learned_types}
+        ids, documents, metadatas, embeddings = self.deduplicator.prepare(
+            [item['content'] for item in items],
+            [item['meta'] for item in items],
+            lambda texts: self._encode_batch(texts, learned_texts)
+        )
+        
+        # Новые записи и обновлённые счётчики дубликатов меняют результаты поиска
+        # (сброс после записи, чтобы параллельный поиск не закэшировал старое состояние)
+        touched_types = [item['memory_type'] for item in items]
+        
+        if not documents:
+            self._invalidate_query_cache(touched_types, added=True)
+            logger.debug(f"Батч из {len(items)} записей целиком состоит из дубликатов")
+            return
+        
+        # id детерминированы, upsert не падает на записи, добавленной параллельно
+        self._add_records(ids, documents, metadatas, embeddings, upsert=True)
+        self.memory_stats.record_added(ids, documents, metadatas)
+        self.lexical_index.add(ids, documents, metadatas)
+        if self.hot_tier is not None:
+            self.hot_tier.add(ids, documents, metadatas, embeddings)
+        self._invalidate_query_cache(touched_types, added=True)
+        
+        logger.info(f"Пакетная запись в память: {len(documents)} из {len(items)} записей")
+    
+    def _encode_batch(self, texts, learned_texts):
+        """Кодирование батча записи: выученные знания и личные записи - раздельно"""
+        learned = [i for i, text in enumerate(texts) if text in learned_texts]
+        if not learned or len(learned) == len(texts):
+            return self._encode_for_store(texts, learned=bool(learned))
+        
+        personal = [i for i, text in enumerate(texts) if text not in learned_texts]
+        embeddings = [None] * len(texts)
+        for indices, is_learned in ((learned, True), (personal, False)):
+            vectors = self._encode_for_store([texts[i] for i in indices], learned=is_learned)
+            for i, vector in zip(indices, vectors):
+                embeddings[i] = vector
+        return np.stack(embeddings)
+    
+    def _encode_for_store(self, texts, learned=False):
+        """
+        Кодирование записей для хранилища
+        
+        Выученные знания не пишутся в дисковый кэш эмбеддингов
+        (config.memory.embedding_cache.disk_learned): шард хранит их
+        сжатыми, а кэш держал бы рядом полную float32-копию
+        """
+        kwargs = {}
+        if learned and isinstance(self.embedder, CachedEmbedder) and not self.cache_disk_learned:
+            kwargs['cache_disk'] = False
+        return self.embedder.encode(texts, batch_size=64, **kwargs)
+    
+    def _add_records(self, ids, documents, metadatas, embeddings, upsert=False):
+        """
+        Запись в хранилище (в шарды по типу, если память разделена)
+        
+        Args:
+            ids: id записей
+            documents: Тексты
+            metadatas: Метаданные
+            embeddings: Эмбеддинги (n, dim)
+            upsert: Заменять существующие записи с теми же id
+        """
+        write = self.memory_store.upsert if upsert else self.memory_store.add
+        write(
+            ids=ids,
+            documents=documents,
+            metadatas=metadatas,
+            embeddings=np.asarray(embeddings, dtype=np.float32)
+        )
+    
+    async def recall_memory(self, query, n_results=5, memory_type=None, exact=False):
         """
         Поиск релевантной информации в памяти
         
+        Векторный и лексический (BM25) поиск объединяются через
+        reciprocal rank fusion. Каждый из них включается в
+        config.memory.retrieval.
+        
         Args:
             query: Поисковый запрос
             n_results: Количество результатов
             memory_type: Фильтр по типу памяти
+            exact: Искать точное вхождение фразы (без эмбеддинга)
             
         Returns:
             list: Список релевантных воспоминаний
         """
         try:
-            # Создание эмбеддинга запроса
-            query_embedding = self.embedder.encode(query).tolist()
+            if not self.is_ready():
+                logger.debug("Система памяти ещё загружается, поиск пропущен")
+                return []
             
-            # Подготовка фильтра
-            where_filter = {"type": memory_type} if memory_type else None
+            cache_key = None
+            if self.query_cache:
+                cache_key = QueryCache.make_key(query, memory_type, n_results, exact)
+                cached = self.query_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+                generation = self.query_cache.generation(memory_type)
             
-            # Поиск
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                where=where_filter
-            )
+            recall = self._recall_exact if exact else self._recall_sync
+            memories = await self.executor.run(recall, query, n_results, memory_type)
             
-            memories = []
-            if results['documents'] and results['documents'][0]:
-                for doc, meta in zip(results['documents'][0], results['metadatas'][0]):
-                    memories.append({
-                        'content': doc,
-                        'metadata': meta
-                    })
+            if cache_key is not None:
+                self.query_cache.put(cache_key, memories, generation)
             
             logger.info(f"Найдено воспоминаний: {len(memories)}")
             return memories
@@ -178,6 +619,258 @@ class MemorySystem:
             logger.error(f"Ошибка поиска в памяти: {e}")
             return []
     
+    async def recall_many(self, queries, filters=None, n_results=5):
+        """
+        Поиск по нескольким запросам за один проход
+        
+        Все запросы кодируются одним батчем, векторный поиск выполняется
+        одним запросом к хранилищу на каждый фильтр.
+        
+        Args:
+            queries: Список поисковых запросов
+            filters: Список фильтров по типу памяти (по одному на запрос, None - без фильтра)
+            n_results: Количество результатов на запрос
+            
+        Returns:
+            list: Списки воспоминаний в порядке запросов
+        """
+        queries = list(queries)
+        memory_types = list(filters) if filters is not None else [None] * len(queries)
+        if len(memory_types) != len(queries):
+            raise ValueError("Количество фильтров не совпадает с количеством запросов")
+        
+        results = [[] for _ in queries]
+        try:
+            if not self.is_ready():
+                logger.debug("Система памяти ещё загружается, поиск пропущен")
+                return results
+            
+            # Запросы, которых нет в кэше
+            pending = []
+            for idx, (query, memory_type) in enumerate(zip(queries, memory_types)):
+                if self.query_cache:
+                    cache_key = QueryCache.make_key(query, memory_type, n_results)
+                    cached = self.query_cache.get(cache_key)
+                    if cached is not None:
+                        results[idx] = cached
+                        continue
+                    pending.append((idx, cache_key, self.query_cache.generation(memory_type)))
+                else:
+                    pending.append((idx, None, None))
+            
+            if pending:
+                found = await self.executor.run(
+                    self._recall_many_sync,
+                    [queries[idx] for idx, _, _ in pending],
+                    n_results,
+                    [memory_types[idx] for idx, _, _ in pending]
+                )
+                for (idx, cache_key, generation), memories in zip(pending, found):
+                    results[idx] = memories
+                    if cache_key is not None:
+                        self.query_cache.put(cache_key, memories, generation)
+            
+            logger.info(f"Найдено воспоминаний: {sum(len(r) for r in results)} по {len(queries)} запросам")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Ошибка пакетного поиска в памяти: {e}")
+            return [[] for _ in queries]
+    
+    def _recall_sync(self, query, n_results, memory_type):
+        """Синхронный гибридный поиск: векторный + BM25, слияние RRF"""
+        return self._recall_many_sync([query], n_results, [memory_type])[0]
+    
+    def _recall_many_sync(self, queries, n_results, memory_types):
+        """Гибридный поиск по нескольким запросам: одно кодирование, один запрос к хранилищу на фильтр"""
+        use_lexical = self.retrieval_config.get('lexical', True) and self.lexical_index.ready
+        use_vector = self.retrieval_config.get('vector', True) or not use_lexical
+        
+        # Каждый ретривер отдаёт больше кандидатов, чем нужно, чтобы слиянию было из чего выбирать
+        candidates = n_results
+        if use_lexical and use_vector:
+            candidates = n_results * self.retrieval_config.get('candidates_factor', 4)
+        
+        found = {}
+        vector_rankings = [None] * len(queries)
+        
+        if use_vector:
+            # Создание эмбеддингов всех запросов одним батчем
+            query_embeddings = np.atleast_2d(self.embedder.encode(list(queries)))
+            
+            groups = defaultdict(list)
+            for idx, memory_type in enumerate(memory_types):
+                groups[memory_type].append(idx)
+            
+            for memory_type, indices in groups.items():
+                ranked = self._vector_search(query_embeddings[indices], candidates, memory_type, found)
+                for idx, ids in zip(indices, ranked):
+                    vector_rankings[idx] = ids
+        
+        ordered_per_query = []
+        for idx, (query, memory_type) in enumerate(zip(queries, memory_types)):
+            rankings = []
+            if use_vector:
+                rankings.append(vector_rankings[idx])
+            
+            if use_lexical:
+                hits = self.lexical_index.search(query, n_results=candidates, memory_type=memory_type)
+                rankings.append([memory_id for memory_id, _ in hits])
+            
+            if len(rankings) > 1:
+                ordered = reciprocal_rank_fusion(rankings, k=self.retrieval_config.get('rrf_k', 60))
+            else:
+                ordered = rankings[0]
+            ordered_per_query.append(ordered[:n_results])
+        
+        # Записи, найденные только лексическим поиском, - одним запросом
+        missing = {memory_id for ordered in ordered_per_query for memory_id in ordered if memory_id not in found}
+        found.update(self._get_by_ids(list(missing)))
+        
+        return [
+            [found[memory_id] for memory_id in ordered if memory_id in found]
+            for ordered in ordered_per_query
+        ]
+    
+    def _vector_search(self, query_embeddings, n_results, memory_type, found):
+        """
+        Векторный поиск: сначала горячий уровень, основное хранилище - если там нет уверенного ответа
+        
+        Args:
+            query_embeddings: Эмбеддинги запросов с одним фильтром (m, dim)
+            found: Словарь id -> воспоминание, дополняется найденными записями
+            
+        Returns:
+            list: Для каждого запроса - id по убыванию близости
+        """
+        rankings = [None] * len(query_embeddings)
+        cold = list(range(len(query_embeddings)))
+        
+        hot = self.hot_tier if self.hot_tier is not None and self.hot_tier.ready else None
+        if hot is not None:
+            cold = []
+            # Сколько записей типа в хранилище (None - счётчики ещё пересчитываются)
+            stored = None
+            if memory_type and self.memory_stats.ready:
+                stored = self.memory_stats.by_type.get(memory_type, 0)
+            for idx, query_embedding in enumerate(query_embeddings):
+                hits = hot.search(query_embedding, n_results=n_results, memory_type=memory_type)
+                if hot.is_confident(hits, n_results, memory_type, stored=stored):
+                    for memory_id, _, record in hits:
+                        found[memory_id] = record
+                    rankings[idx] = [memory_id for memory_id, _, _ in hits]
+                else:
+                    cold.append(idx)
+        
+        if not cold:
+            return rankings
+        
+        # Подготовка фильтра
+        where_filter = {"type": memory_type} if memory_type else None
+        
+        include = ["documents", "metadatas"]
+        if hot is not None:
+            # Эмбеддинги нужны для переноса часто запрашиваемых записей в горячий уровень
+            include.append("embeddings")
+        
+        # Один запрос к хранилищу для всех запросов без уверенного горячего ответа
+        results = self.memory_store.query(
+            query_embeddings=np.asarray(query_embeddings, dtype=np.float32)[cold],
+            n_results=n_results,
+            where=where_filter,
+            include=include
+        )
+        
+        for pos, idx in enumerate(cold):
+            ids = results['ids'][pos] if results['ids'] else []
+            documents = results['documents'][pos] if ids else []
+            metadatas = results['metadatas'][pos] if ids else []
+            for memory_id, doc, meta in zip(ids, documents, metadatas):
+                found[memory_id] = {'content': doc, 'metadata': meta}
+            
+            if hot is not None and ids:
+                embeddings = results.get('embeddings')
+                hot.record_cold_access(ids, documents, metadatas,
+                                       embeddings[pos] if embeddings is not None else None)
+            
+            rankings[idx] = list(ids)
+        
+        return rankings
+    
+    def _recall_exact(self, query, n_results, memory_type):
+        """
+        Поиск записей с точным вхождением фразы
+        
+        Кандидаты берутся из лексического индекса, вхождение проверяется
+        по тексту записи. Эмбеддинг не вычисляется.
+        """
+        if not self.lexical_index.ready:
+            # Индекс ещё строится - поиск подстроки средствами хранилища
+            results = self.memory_store.get(
+                where={"type": memory_type} if memory_type else None,
+                where_document={"$contains": query},
+                limit=n_results,
+                include=["documents", "metadatas"]
+            )
+            return [
+                {'content': doc, 'metadata': meta}
+                for doc, meta in zip(results['documents'], results['metadatas'])
+            ]
+        
+        phrase = normalize_for_match(query)
+        candidates = self.lexical_index.candidates_with_all_terms(query, memory_type=memory_type)
+        
+        memories = []
+        page_size = max(n_results * 4, 50)
+        for start in range(0, len(candidates), page_size):
+            found = self._get_by_ids(candidates[start:start + page_size])
+            for memory_id in candidates[start:start + page_size]:
+                memory = found.get(memory_id)
+                if memory and phrase in normalize_for_match(
+                    searchable_text(memory['content'], memory['metadata'])
+                ):
+                    memories.append(memory)
+                    if len(memories) >= n_results:
+                        return memories
+        
+        return memories
+    
+    def _get_by_ids(self, ids):
+        """Загрузка записей по id (без эмбеддингов)"""
+        if not ids:
+            return {}
+        
+        results = self.memory_store.get(ids=ids, include=["documents", "metadatas"])
+        return {
+            memory_id: {'content': doc, 'metadata': meta}
+            for memory_id, doc, meta in zip(results['ids'], results['documents'], results['metadatas'])
+        }
+    
+    def _on_memories_deleted(self, ids, metadatas):
+        """Обновление счётчиков и индекса после удаления записей"""
+        self.memory_stats.record_removed(metadatas)
+        self.lexical_index.remove(ids)
+        if self.hot_tier is not None:
+            self.hot_tier.remove(ids)
+        self._invalidate_query_cache([(meta or {}).get('type') for meta in metadatas])
+    
+    def _invalidate_query_cache(self, memory_types=None, added=False):
+        """Сброс закэшированных результатов поиска для затронутых типов"""
+        if self.query_cache:
+            self.query_cache.invalidate(memory_types, added=added)
+    
+    async def encode_async(self, texts):
+        """
+        Асинхронное создание эмбеддингов в общем пуле
+        
+        Args:
+            texts: Строка или список строк
+            
+        Returns:
+            np.ndarray: Эмбеддинги
+        """
+        return await self.executor.encode(self.embedder, texts)
+    
     async def get_context(self, user_input, max_memories=5):
         """
         Получение контекста для текущего запроса
@@ -217,12 +910,11 @@ class MemorySystem:
         try:
             today = datetime.now().date().isoformat()
             
-            # Поиск задач и событий на сегодня
-            tasks_query = f"задачи на {today}"
-            tasks = await self.recall_memory(tasks_query, memory_type="task")
-            
-            events_query = f"события на {today}"
-            events = await self.recall_memory(events_query, memory_type="event")
+            # Поиск задач и событий на сегодня (одно кодирование на оба запроса)
+            tasks, events = await self.recall_many(
+                [f"задачи на {today}", f"события на {today}"],
+                filters=["task", "event"]
+            )
             
             return {
                 'pending_tasks': [t['content'] for t in tasks],
@@ -270,76 +962,161 @@ class MemorySystem:
             metadata={'key': key, 'value': value}
         )
     
-    async def clean_old_memories(self, days=90):
+    async def clean_old_memories(self, days=90, progress=None):
         """
         Очистка старых воспоминаний
         
+        Проход идёт страницами с фильтром по epoch/importance и удаляет
+        батчами, поэтому расход памяти не зависит от размера коллекции.
+        Прерванная очистка продолжается при следующем вызове.
+        
         Args:
             days: Сколько дней хранить
+            progress: Функция progress(stage, done) для отчёта о ходе
+            
+        Returns:
+            dict: Сколько записей мигрировано и удалено
         """
         try:
-            cutoff_date = datetime.now() - timedelta(days=days)
+            cutoff_epoch = (datetime.now() - timedelta(days=days)).timestamp()
+            
+            def report(stage, done):
+                logger.info(f"Очистка памяти ({stage}): обработано {done}")
+                if progress:
+                    progress(stage, done)
             
-            # Получение всех записей
-            all_memories = self.collection.get()
+            sweeper = RetentionSweeper(
+                self.memory_store,
+                page_size=self.config.get('memory', {}).get('retention_page_size', 500),
+                on_delete=self._on_memories_deleted
+            )
+            result = await self.executor.run(sweeper.run, cutoff_epoch, 0.7, report)
             
-            ids_to_delete = []
-            for memory_id, metadata in zip(all_memories['ids'], all_memories['metadatas']):
-                memory_time = datetime.fromisoformat(metadata['timestamp'])
-                
-                # Удаление старых неважных воспоминаний
-                if memory_time < cutoff_date and metadata.get('importance', 0) < 0.7:
-                    ids_to_delete.append(memory_id)
+            if result['deleted']:
+                logger.info(f"Удалено старых воспоминаний: {result['deleted']}")
             
-            if ids_to_delete:
-                self.collection.delete(ids=ids_to_delete)
-                logger.info(f"Удалено старых воспоминаний: {len(ids_to_delete)}")
+            return result
             
         except Exception as e:
             logger.error(f"Ошибка очистки памяти: {e}")
+            return {'backfilled': 0, 'deleted': 0}
     
-    async def export_memories(self, output_file="data/memory_export.json"):
-        """Экспорт всех воспоминаний в файл"""
+    async def export_memories(self, output_file="data/memory_export.ndjson.gz",
+                              include_embeddings=False):
+        """
+        Потоковый экспорт всех воспоминаний в NDJSON (gzip для .gz)
+        
+        Args:
+            output_file: Путь к файлу экспорта
+            include_embeddings: Сохранять эмбеддинги, чтобы импорт не перекодировал тексты
+            
+        Returns:
+            int: Количество экспортированных записей
+        """
         try:
-            all_memories = self.collection.get()
+            exported = await self.executor.run(
+                transfer.export_ndjson,
+                self.memory_store,
+                output_file,
+                include_embeddings=include_embeddings,
+                user_profile=self.user_profile,
+                progress=lambda done: logger.info(f"Экспорт памяти: {done} записей")
+            )
             
-            export_data = {
-                'user_profile': self.user_profile,
-                'memories': []
-            }
+            logger.info(f"Память экспортирована в {output_file} ({exported} записей)")
+            return exported
             
-            for doc, meta, memory_id in zip(
-                all_memories['documents'],
-                all_memories['metadatas'],
-                all_memories['ids']
-            ):
-                export_data['memories'].append({
-                    'id': memory_id,
-                    'content': doc,
-                    'metadata': meta
-                })
+        except Exception as e:
+            logger.error(f"Ошибка экспорта памяти: {e}")
+            return 0
+    
+    async def import_memories(self, input_file, resume=True):
+        """
+        Пакетный импорт файла, созданного export_memories
+        
+        Args:
+            input_file: Путь к файлу NDJSON
+            resume: Продолжить прерванный импорт с сохранённой позиции
             
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, ensure_ascii=False, indent=2)
+        Returns:
+            int: Количество импортированных записей
+        """
+        try:
+            imported = await self.executor.run(
+                transfer.import_ndjson,
+                self,
+                input_file,
+                resume=resume,
+                progress=lambda done: logger.info(f"Импорт памяти: {done} записей")
+            )
             
-            logger.info(f"Память экспортирована в {output_file}")
+            logger.info(f"Импортировано записей из {input_file}: {imported}")
+            return imported
             
         except Exception as e:
-            logger.error(f"Ошибка экспорта памяти: {e}")
+            logger.error(f"Ошибка импорта памяти: {e}")
+            return 0
+    
+    async def import_knowledge(self, directory="data/web_knowledge", resume=True):
+        """
+        Пакетный импорт сохранённых тем (data/web_knowledge, data/infinite_knowledge)
+        
+        Args:
+            directory: Папка с JSON-файлами тем
+            resume: Продолжить прерванный импорт с сохранённой позиции
+            
+        Returns:
+            int: Количество импортированных чанков
+        """
+        try:
+            imported = await self.executor.run(
+                transfer.import_knowledge_dir,
+                self,
+                directory,
+                resume=resume,
+                progress=lambda done: logger.info(f"Импорт знаний: {done} чанков")
+            )
+            
+            logger.info(f"Импортировано чанков из {directory}: {imported}")
+            return imported
+            
+        except Exception as e:
+            logger.error(f"Ошибка импорта знаний: {e}")
+            return 0
     
     async def close(self):
         """Закрытие соединений и сохранение данных"""
         try:
+            if not self.is_ready():
+                # Загрузка не завершилась - сохранять нечего
+                self.executor.shutdown(wait=False)
+                logger.info("Система памяти закрыта до завершения загрузки")
+                return
+            
             # Сохранение профиля
             self._save_user_profile()
             
-            # Сохранение кратковременной памяти в долговременную
+            # Сохранение кратковременной памяти в долговременную (одним батчем)
             for entry in self.short_term_memory[-10:]:
                 if entry['role'] == 'user':
-                    await self.store_memory(
-                        entry['content'],
-                        memory_type="conversation"
-                    )
+                    self.ingest(entry['content'], memory_type="conversation")
+            
+            # Запись остатка очереди
+            if self.ingest_queue:
+                self.ingest_queue.close()
+            
+            self.executor.shutdown(wait=True)
+            
+            self.memory_store.close()
+            
+            self.memory_stats.save_snapshot()
+            self.lexical_index.save()
+            
+            # Сброс кэша эмбеддингов на диск
+            cache = getattr(self.embedder, 'cache', None)
+            if cache:
+                cache.close()
+                logger.info(f"Кэш эмбеддингов: {cache.stats()}")
             
             logger.info("Система памяти закрыта")
             
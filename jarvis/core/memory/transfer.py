@@ -0,0 +1,307 @@
+"""
+Потоковый экспорт и импорт памяти в формате NDJSON (опционально gzip)
+Коллекция читается и пишется страницами, целиком в память не загружается
+"""
+
+import base64
+import gzip
+import json
+import logging
+import sys
+from array import array
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+FORMAT_NAME = "jarvis-memory"
+FORMAT_VERSION = 1
+
+
+def _open_text(path, mode):
+    """Открытие файла как текста, .gz - через gzip"""
+    path = Path(path)
+    if path.suffix == '.gz':
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def encode_vector(vector):
+    """Вектор -> base64 от float32 little-endian"""
+    packed = array('f', (float(x) for x in vector))
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode('ascii')
+
+
+def decode_vector(data):
+    """base64 от float32 little-endian -> список float"""
+    packed = array('f')
+    packed.frombytes(base64.b64decode(data))
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return packed.tolist()
+
+
+class _Progress:
+    """Файл прогресса рядом с импортируемым файлом (для возобновления)"""
+
+    def __init__(self, source_path, enabled):
+        self.path = Path(str(source_path) + '.progress')
+        self.enabled = enabled
+        self.position = 0
+
+        if enabled and self.path.exists():
+            try:
+                self.position = int(self.path.read_text().strip() or 0)
+            except ValueError:
+                self.position = 0
+
+    def save(self, position):
+        self.position = position
+        if self.enabled:
+            self.path.write_text(str(position))
+
+    def finish(self):
+        if self.enabled and self.path.exists():
+            self.path.unlink()
+
+
+class _FinishedFiles:
+    """
+    Имена обработанных файлов папки (для возобновления)
+
+    Позиция в отсортированном списке не годится: краулеры добавляют темы,
+    и новый файл сдвинул бы все следующие за ним
+    """
+
+    def __init__(self, directory, enabled):
+        self.path = Path(directory) / '_import.progress'
+        self.enabled = enabled
+        self.names = set()
+        self._unsaved = []
+
+        if enabled and self.path.exists():
+            self.names = set(self.path.read_text(encoding='utf-8').splitlines())
+
+    def add(self, name):
+        self.names.add(name)
+        self._unsaved.append(name)
+
+    def save(self):
+        if self.enabled and self._unsaved:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(''.join(f"{name}\n" for name in self._unsaved))
+        self._unsaved.clear()
+
+    def finish(self):
+        if self.enabled and self.path.exists():
+            self.path.unlink()
+
+
+def export_ndjson(collection, output_file, include_embeddings=False, page_size=1000,
+                  user_profile=None, progress=None):
+    """
+    Потоковый экспорт коллекции
+
+    Первая строка - заголовок с форматом и профилем пользователя,
+    далее по одной записи на строку.
+
+    Args:
+        collection: Векторное хранилище (VectorStore)
+        output_file: Путь к файлу (.ndjson или .ndjson.gz)
+        include_embeddings: Сохранять ли эмбеддинги (импорт без перекодирования)
+        page_size: Размер страницы при чтении коллекции
+        user_profile: Профиль пользователя для заголовка
+        progress: Функция progress(done) для отчёта о ходе
+
+    Returns:
+        int: Количество экспортированных записей
+    """
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    include = ["documents", "metadatas"]
+    if include_embeddings:
+        include.append("embeddings")
+
+    exported = 0
+    with _open_text(output_file, 'w') as f:
+        header = {
+            'format': FORMAT_NAME,
+            'version': FORMAT_VERSION,
+            'exported_at': datetime.now().isoformat(),
+            'include_embeddings': include_embeddings,
+            'user_profile': user_profile or {},
+        }
+        f.write(json.dumps({'header': header}, ensure_ascii=False) + '\n')
+
+        offset = 0
+        while True:
+            page = collection.get(limit=page_size, offset=offset, include=include)
+            ids = page['ids']
+            if not ids:
+                break
+
+            embeddings = page.get('embeddings') if include_embeddings else None
+            for idx, memory_id in enumerate(ids):
+                record = {
+                    'id': memory_id,
+                    'content': page['documents'][idx],
+                    'metadata': page['metadatas'][idx],
+                }
+                if embeddings is not None:
+                    record['embedding'] = encode_vector(embeddings[idx])
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+            offset += len(ids)
+            exported += len(ids)
+
+            if progress:
+                progress(exported)
+
+    return exported
+
+
+def import_ndjson(memory, input_file, batch_size=500, resume=True, progress=None):
+    """
+    Пакетный импорт файла, созданного export_ndjson
+
+    Записи пишутся через memory.ingest_batch: с эмбеддингами - напрямую
+    (upsert по id), без эмбеддингов - с кодированием батчем и
+    дедупликацией. Номер обработанной строки сохраняется в .progress,
+    поэтому прерванный импорт продолжается с того же места.
+
+    Args:
+        memory: Экземпляр MemorySystem
+        input_file: Путь к файлу
+        batch_size: Размер батча записи
+        resume: Продолжать ли с сохранённой позиции
+        progress: Функция progress(done) для отчёта о ходе
+
+    Returns:
+        int: Количество импортированных записей
+    """
+    state = _Progress(input_file, resume)
+    start = state.position
+    imported = 0
+
+    batch = []
+    line_no = 0
+
+    def flush(position):
+        nonlocal imported
+        if batch:
+            imported += memory.ingest_batch(batch)
+            batch.clear()
+
+        state.save(position)
+        if progress:
+            progress(imported)
+
+    with _open_text(input_file, 'r') as f:
+        for line_no, line in enumerate(f, 1):
+            if line_no <= start or not line.strip():
+                continue
+
+            record = json.loads(line)
+            if 'header' in record:
+                continue
+
+            metadata = record.get('metadata') or {}
+            item = {
+                'content': record['content'],
+                'memory_type': metadata.get('type', 'general'),
+                'metadata': metadata,
+            }
+            if record.get('embedding'):
+                item['id'] = record['id']
+                item['embedding'] = decode_vector(record['embedding'])
+            batch.append(item)
+
+            if len(batch) >= batch_size:
+                flush(line_no)
+
+    flush(line_no)
+    state.finish()
+
+    return imported
+
+
+def import_knowledge_dir(memory, directory, batch_size=500, resume=True, progress=None):
+    """
+    Пакетный импорт тем из data/web_knowledge, data/infinite_knowledge и т.п.
+
+    Каждый JSON-файл темы ({'content': ..., 'sources': ...}) режется общим
+    чанкером памяти (memory.text_chunker(), как у движков обучения) и
+    записывается как knowledge. Файлы обрабатываются в отсортированном
+    порядке, имена обработанных сохраняются в _import.progress.
+
+    Args:
+        memory: Экземпляр MemorySystem
+        directory: Папка с JSON-файлами тем
+        batch_size: Размер батча записи
+        resume: Продолжать ли с сохранённой позиции
+        progress: Функция progress(done) для отчёта о ходе
+
+    Returns:
+        int: Количество импортированных чанков
+    """
+    directory = Path(directory)
+    files = sorted(
+        p for p in directory.glob('*.json')
+        if p.name != 'knowledge_graph.json'
+    )
+
+    state = _FinishedFiles(directory, resume)
+    chunker = memory.text_chunker()
+    imported = 0
+    batch = []
+
+    def flush():
+        nonlocal imported
+        if batch:
+            imported += memory.ingest_batch(batch)
+            batch.clear()
+        state.save()
+        if progress:
+            progress(imported)
+
+    for path in files:
+        if path.name in state.names:
+            continue
+        # Файл записан в прогресс только после записи его батча (state.save в flush)
+        state.add(path.name)
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Пропущен файл {path.name}: {e}")
+            continue
+
+        content = data.get('content') if isinstance(data, dict) else None
+        if not content:
+            continue
+
+        topic = path.stem
+        for chunk in chunker.chunks(content, prefix=f"{topic}: "):
+            metadata = {
+                'topic': topic,
+                'source': f"import:{directory.name}",
+                'auto_learned': True,
+                'importance': 0.6,
+            }
+            batch.append({
+                'content': chunk,
+                'memory_type': 'knowledge',
+                'metadata': metadata,
+            })
+
+        if len(batch) >= batch_size:
+            flush()
+
+    flush()
+    state.finish()
+
+    return imported
@@ -0,0 +1,820 @@
+"""
+Векторные хранилища памяти
+Общий интерфейс (add/upsert/get/query/update/delete с фильтрами в стиле
+ChromaDB) и две реализации: ChromaDB и встроенное хранилище на NumPy + SQLite
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('chroma', 'numpy')
+
+STORAGE_DTYPES = ('float32', 'float16', 'int8')
+
+# Поля метаданных, вынесенные в индексируемые столбцы SQLite (фильтры where
+# по ним не разбирают JSON каждой строки): столбец type и генерируемые столбцы
+GENERATED_COLUMNS = {
+    'content_hash': 'TEXT',
+    'epoch': 'REAL',
+    'timestamp': 'TEXT',
+    'importance': 'REAL',
+}
+INDEXED_FIELDS = {'type'} | set(GENERATED_COLUMNS)
+
+
+def quantize(vectors, mode):
+    """
+    Квантование векторов
+
+    Args:
+        vectors: Массив (n, dim) float32
+        mode: float32, float16 или int8
+
+    Returns:
+        tuple: (коды, масштабы) - масштабы только для int8, иначе None
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if mode == 'float32':
+        return vectors, None
+
+    if mode == 'float16':
+        return vectors.astype(np.float16), None
+
+    if mode == 'int8':
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    raise ValueError(f"Неизвестный режим квантования: {mode}")
+
+
+def dequantize(codes, scales=None):
+    """Восстановление float32 из кодов"""
+    vectors = np.asarray(codes, dtype=np.float32)
+    if scales is not None:
+        vectors = vectors * np.asarray(scales, dtype=np.float32)[:, None]
+    return vectors
+
+
+def _unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+def _where_to_sql(where):
+    """
+    Перевод фильтра в стиле ChromaDB в условие SQL
+
+    Поддерживаются равенство, $eq, $ne, $in, $nin, $lt, $lte, $gt, $gte, $and, $or.
+    """
+    operators = {'$eq': '=', '$ne': '!=', '$lt': '<', '$lte': '<=', '$gt': '>', '$gte': '>='}
+
+    if not where:
+        return "1", []
+
+    clauses = []
+    params = []
+    for key, value in where.items():
+        if key in ('$and', '$or'):
+            parts = [_where_to_sql(item) for item in value]
+            joiner = ' AND ' if key == '$and' else ' OR '
+            clauses.append('(' + joiner.join(sql for sql, _ in parts) + ')')
+            for _, part_params in parts:
+                params.extend(part_params)
+            continue
+
+        if key in INDEXED_FIELDS:
+            field, field_params = key, []
+        else:
+            field, field_params = "json_extract(metadata, ?)", [f"$.{key}"]
+
+        if not isinstance(value, dict):
+            value = {'$eq': value}
+
+        for op, operand in value.items():
+            if op in ('$in', '$nin'):
+                if not operand:
+                    clauses.append("0" if op == '$in' else "1")
+                    continue
+                placeholders = ", ".join("?" * len(operand))
+                negate = "NOT " if op == '$nin' else ""
+                clauses.append(f"{field} {negate}IN ({placeholders})")
+                params.extend(field_params)
+                params.extend(operand)
+            elif op in operators:
+                clauses.append(f"{field} {operators[op]} ?")
+                params.extend(field_params + [operand])
+            else:
+                raise ValueError(f"Неподдерживаемый оператор фильтра: {op}")
+
+    return " AND ".join(clauses) or "1", params
+
+
+def _where_document_to_sql(where_document):
+    """Фильтр по тексту записи ($contains / $not_contains, с учётом регистра)"""
+    if not where_document:
+        return "1", []
+
+    clauses = []
+    params = []
+    for op, operand in where_document.items():
+        if op == '$contains':
+            clauses.append("instr(document, ?) > 0")
+        elif op == '$not_contains':
+            clauses.append("instr(document, ?) = 0")
+        else:
+            raise ValueError(f"Неподдерживаемый оператор фильтра документа: {op}")
+        params.append(operand)
+
+    return " AND ".join(clauses), params
+
+
+def vector_store_path(memory_config):
+    """Папка векторного хранилища по config.memory"""
+    store_config = memory_config.get('vector_store', {})
+    if store_config.get('path'):
+        return Path(store_config['path'])
+    if store_config.get('backend', 'chroma') == 'numpy':
+        return Path("data/vector_store")
+    return Path(memory_config.get('vector_db_path', 'data/memory_db'))
+
+
+def create_vector_store(memory_config, shard=None):
+    """
+    Создание векторного хранилища по config.memory.vector_store
+
+    Args:
+        memory_config: Раздел memory конфигурации
+        shard: Имя дополнительного шарда (None - основное хранилище); для
+               ChromaDB - суффикс коллекции, для NumPy - подпапка
+
+    Returns:
+        VectorStore: ChromaVectorStore или NumpyVectorStore
+    """
+    store_config = memory_config.get('vector_store', {})
+    backend = store_config.get('backend', 'chroma')
+    path = vector_store_path(memory_config)
+
+    if backend == 'chroma':
+        name = store_config.get('collection', 'jarvis_memory')
+        return ChromaVectorStore(path, name=f"{name}_{shard}" if shard else name)
+
+    if backend == 'numpy':
+        return NumpyVectorStore(
+            path / shard if shard else path,
+            dtype=store_config.get('dtype', 'float32'),
+            shard_rows=store_config.get('shard_rows', 32768)
+        )
+
+    raise ValueError(f"Неизвестное векторное хранилище: {backend} (доступны: {', '.join(BACKENDS)})")
+
+
+class VectorStore:
+    """
+    Интерфейс векторного хранилища (подмножество коллекции ChromaDB)
+
+    Расстояние - косинусное (1 - cosine). Фильтр where - словарь в стиле
+    ChromaDB по метаданным; результаты get/query - словари ids/documents/
+    metadatas/embeddings/distances, у query - со списком на каждый запрос.
+    """
+
+    def count(self):
+        """Количество записей"""
+        raise NotImplementedError
+
+    def count_matching(self, ids=None, where=None, where_document=None):
+        """Количество записей под фильтр (по умолчанию - через выборку id)"""
+        return len(self.get(ids=ids, where=where, include=[], where_document=where_document)['ids'])
+
+    def add(self, ids, documents, metadatas, embeddings):
+        """Добавление записей"""
+        raise NotImplementedError
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        """Добавление или замена записей по id"""
+        raise NotImplementedError
+
+    def get(self, ids=None, where=None, limit=None, offset=0, include=None, where_document=None):
+        """Выборка записей по id и/или фильтру"""
+        raise NotImplementedError
+
+    def query(self, query_embeddings, n_results=5, where=None, include=None):
+        """Поиск ближайших для каждого из запросов"""
+        raise NotImplementedError
+
+    def update(self, ids, metadatas):
+        """Обновление метаданных"""
+        raise NotImplementedError
+
+    def delete(self, ids):
+        """Удаление записей"""
+        raise NotImplementedError
+
+    def close(self):
+        """Сброс данных на диск"""
+
+
+class ChromaVectorStore(VectorStore):
+    """Коллекция ChromaDB (HNSW)"""
+
+    def __init__(self, path="data/memory_db", name="jarvis_memory"):
+        """
+        Args:
+            path: Папка базы ChromaDB
+            name: Имя коллекции
+        """
+        import chromadb
+        from chromadb.config import Settings
+
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.client = chromadb.PersistentClient(
+            path=str(self.path),
+            settings=Settings(anonymized_telemetry=False)
+        )
+        self.collection = self.client.get_or_create_collection(
+            name=name,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+    @staticmethod
+    def _kwargs(**kwargs):
+        return {key: value for key, value in kwargs.items() if value is not None}
+
+    def count(self):
+        return self.collection.count()
+
+    def add(self, ids, documents, metadatas, embeddings):
+        self.collection.add(ids=ids, documents=documents, metadatas=metadatas,
+                            embeddings=np.asarray(embeddings, dtype=np.float32).tolist())
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas,
+                               embeddings=np.asarray(embeddings, dtype=np.float32).tolist())
+
+    def get(self, ids=None, where=None, limit=None, offset=0, include=None, where_document=None):
+        return self.collection.get(**self._kwargs(
+            ids=ids, where=where or None, limit=limit, offset=offset or None,
+            include=include, where_document=where_document
+        ))
+
+    def query(self, query_embeddings, n_results=5, where=None, include=None):
+        return self.collection.query(**self._kwargs(
+            query_embeddings=np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32)).tolist(),
+            n_results=n_results, where=where or None, include=include
+        ))
+
+    def update(self, ids, metadatas):
+        self.collection.update(ids=ids, metadatas=metadatas)
+
+    def delete(self, ids):
+        if ids:
+            self.collection.delete(ids=ids)
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Встроенное хранилище: векторы в memmap-шардах .npy, записи в SQLite
+
+    Поиск точный - блочное умножение матрицы на запросы. Векторы хранятся
+    нормированными в float32, float16 или int8 (с масштабом на вектор).
+    """
+
+    def __init__(self, path="data/vector_store", dtype='float32', shard_rows=32768,
+                 rescore_fn=None, rescore_factor=4):
+        """
+        Args:
+            path: Папка хранилища
+            dtype: Тип хранения векторов (float32, float16 или int8)
+            shard_rows: Строк в одном шарде (у существующего хранилища берётся из meta.json)
+            rescore_fn: Функция rescore_fn(documents) -> эмбеддинги float32 для
+                        пересчёта близости лучших кандидатов (None - без пересчёта)
+            rescore_factor: Во сколько раз больше кандидатов отбирать для пересчёта
+        """
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Неизвестный тип хранения векторов: {dtype}")
+
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.rescore_fn = rescore_fn
+        self.rescore_factor = rescore_factor
+
+        self._lock = threading.RLock()
+        self._meta_path = self.path / "meta.json"
+        self._meta = self._load_meta(dtype, shard_rows)
+        self.dtype = self._meta['dtype']
+        self.shard_rows = self._meta['shard_rows']
+
+        self._db = sqlite3.connect(str(self.path / "records.sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            "row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, document TEXT, "
+            "metadata TEXT, type TEXT, deleted INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS records_type ON records(type, deleted)")
+
+        # Генерируемые столбцы добавляются и в хранилища, созданные без них
+        columns = {row[1] for row in self._db.execute("PRAGMA table_xinfo(records)")}
+        for field, sql_type in GENERATED_COLUMNS.items():
+            if field not in columns:
+                self._db.execute(
+                    f"ALTER TABLE records ADD COLUMN {field} {sql_type} "
+                    f"GENERATED ALWAYS AS (json_extract(metadata, '$.{field}')) VIRTUAL"
+                )
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS records_{field} ON records({field})")
+        self._db.commit()
+
+        self._shards = []
+        self._scale_shards = []
+        for index in range(self._meta['shards']):
+            self._open_shard(index)
+
+        # В памяти только коды типов и маска удалённых строк
+        self._type_names = {}
+        self._type_codes = np.zeros(self._capacity(), dtype=np.int16)
+        self._alive = np.zeros(self._capacity(), dtype=bool)
+        for row, memory_type, deleted in self._db.execute("SELECT row, type, deleted FROM records"):
+            self._type_codes[row] = self._type_code(memory_type)
+            self._alive[row] = not deleted
+
+    def _load_meta(self, dtype, shard_rows):
+        if self._meta_path.exists():
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('dtype') != dtype:
+                logger.warning(
+                    f"Хранилище {self.path} создано с типом {meta.get('dtype')}, "
+                    f"запрошен {dtype} - используется {meta.get('dtype')}"
+                )
+            return meta
+        return {'dtype': dtype, 'dim': None, 'rows': 0, 'shard_rows': int(shard_rows), 'shards': 0}
+
+    def _save_meta(self):
+        tmp_path = self._meta_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._meta, f)
+        tmp_path.replace(self._meta_path)
+
+    def _capacity(self):
+        return self._meta['shards'] * self.shard_rows
+
+    def _shard_path(self, prefix, index):
+        return self.path / f"{prefix}_{index:05d}.npy"
+
+    def _open_shard(self, index, create=False):
+        if create:
+            shard = np.lib.format.open_memmap(
+                self._shard_path("vectors", index), mode='w+',
+                dtype=np.dtype(self.dtype), shape=(self.shard_rows, self._meta['dim'])
+            )
+        else:
+            shard = np.load(self._shard_path("vectors", index), mmap_mode='r+')
+        self._shards.append(shard)
+
+        if self.dtype == 'int8':
+            if create:
+                scales = np.lib.format.open_memmap(
+                    self._shard_path("scales", index), mode='w+',
+                    dtype=np.float32, shape=(self.shard_rows,)
+                )
+            else:
+                scales = np.load(self._shard_path("scales", index), mmap_mode='r+')
+            self._scale_shards.append(scales)
+
+    def _ensure_capacity(self, rows, dim):
+        """Добавление шардов, пока все строки не поместятся"""
+        if self._meta['dim'] is None:
+            self._meta['dim'] = int(dim)
+        elif self._meta['dim'] != dim:
+            raise ValueError(f"Размерность {dim} не совпадает с хранилищем ({self._meta['dim']})")
+
+        if rows <= self._capacity():
+            return
+
+        while self._capacity() < rows:
+            self._open_shard(self._meta['shards'], create=True)
+            self._meta['shards'] += 1
+
+        new_capacity = self._capacity()
+        for name in ('_type_codes', '_alive'):
+            old = getattr(self, name)
+            grown = np.zeros(new_capacity, dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+    def _type_code(self, memory_type):
+        code = self._type_names.get(memory_type)
+        if code is None:
+            code = len(self._type_names)
+            self._type_names[memory_type] = code
+        return code
+
+    def _by_shard(self, rows):
+        """Группировка строк по шардам: (номер шарда, позиции в rows, строки в шарде)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        shard_index = rows // self.shard_rows
+        local = rows % self.shard_rows
+        for index in np.unique(shard_index):
+            positions = np.nonzero(shard_index == index)[0]
+            yield int(index), positions, local[positions]
+
+    def _write_rows(self, rows, codes, scales):
+        for index, positions, local in self._by_shard(rows):
+            self._shards[index][local] = codes[positions]
+            if scales is not None:
+                self._scale_shards[index][local] = scales[positions]
+
+    def _read_rows(self, rows):
+        """Векторы строк в float32"""
+        result = np.zeros((len(rows), self._meta['dim'] or 0), dtype=np.float32)
+        for index, positions, local in self._by_shard(rows):
+            scales = self._scale_shards[index][local] if self._scale_shards else None
+            result[positions] = dequantize(self._shards[index][local], scales)
+        return result
+
+    def _flush(self):
+        for shard in self._shards + self._scale_shards:
+            shard.flush()
+
+    def count(self):
+        """Количество записей"""
+        with self._lock:
+            return int(self._db.execute("SELECT COUNT(*) FROM records WHERE deleted = 0").fetchone()[0])
+
+    def count_matching(self, ids=None, where=None, where_document=None):
+        """Количество записей под фильтр (одним запросом COUNT)"""
+        sql, params = _where_to_sql(where)
+        document_sql, document_params = _where_document_to_sql(where_document)
+        query = f"SELECT COUNT(*) FROM records WHERE deleted = 0 AND {sql} AND {document_sql}"
+        params = params + document_params
+
+        if ids is not None:
+            if not ids:
+                return 0
+            query += f" AND id IN ({', '.join('?' * len(ids))})"
+            params = params + list(ids)
+
+        with self._lock:
+            return int(self._db.execute(query, params).fetchone()[0])
+
+    def add(self, ids, documents, metadatas, embeddings):
+        """Добавление записей (как collection.add)"""
+        self.upsert(ids, documents, metadatas, embeddings)
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        """Добавление или замена записей по id"""
+        if not ids:
+            return
+
+        # Поиск по косинусу - храним нормированные векторы
+        embeddings = _unit(embeddings)
+        codes, scales = quantize(embeddings, self.dtype)
+
+        with self._lock:
+            existing = dict(self._db.execute(
+                f"SELECT id, row FROM records WHERE id IN ({', '.join('?' * len(ids))})", list(ids)
+            ).fetchall())
+
+            next_row = self._meta['rows']
+            rows = []
+            for memory_id in ids:
+                if memory_id in existing:
+                    rows.append(existing[memory_id])
+                else:
+                    rows.append(next_row)
+                    existing[memory_id] = next_row
+                    next_row += 1
+
+            self._ensure_capacity(next_row, embeddings.shape[1])
+            self._write_rows(rows, codes, scales)
+
+            self._db.executemany(
+                "INSERT INTO records(row, id, document, metadata, type, deleted) VALUES (?, ?, ?, ?, ?, 0) "
+                "ON CONFLICT(id) DO UPDATE SET document=excluded.document, "
+                "metadata=excluded.metadata, type=excluded.type, deleted=0",
+                [
+                    (row, memory_id, doc, json.dumps(meta or {}, ensure_ascii=False), (meta or {}).get('type'))
+                    for row, memory_id, doc, meta in zip(rows, ids, documents, metadatas)
+                ]
+            )
+            self._db.commit()
+
+            for row, meta in zip(rows, metadatas):
+                self._type_codes[row] = self._type_code((meta or {}).get('type'))
+                self._alive[row] = True
+
+            self._flush()
+            self._meta['rows'] = next_row
+            self._save_meta()
+
+    def update(self, ids, metadatas):
+        """Обновление метаданных"""
+        with self._lock:
+            self._db.executemany(
+                "UPDATE records SET metadata = ?, type = ? WHERE id = ?",
+                [
+                    (json.dumps(meta or {}, ensure_ascii=False), (meta or {}).get('type'), memory_id)
+                    for memory_id, meta in zip(ids, metadatas)
+                ]
+            )
+            self._db.commit()
+
+            for memory_id, meta in zip(ids, metadatas):
+                row = self._db.execute("SELECT row FROM records WHERE id = ?", (memory_id,)).fetchone()
+                if row:
+                    self._type_codes[row[0]] = self._type_code((meta or {}).get('type'))
+
+    def delete(self, ids):
+        """Удаление записей (строка помечается удалённой)"""
+        if not ids:
+            return
+
+        with self._lock:
+            placeholders = ', '.join('?' * len(ids))
+            rows = [row for (row,) in self._db.execute(
+                f"SELECT row FROM records WHERE id IN ({placeholders})", list(ids)
+            )]
+            self._db.execute(f"UPDATE records SET deleted = 1 WHERE id IN ({placeholders})", list(ids))
+            self._db.commit()
+            self._alive[rows] = False
+
+    def get(self, ids=None, where=None, limit=None, offset=0, include=None, where_document=None):
+        """Выборка записей (как collection.get)"""
+        include = include if include is not None else ["documents", "metadatas"]
+        sql, params = _where_to_sql(where)
+        document_sql, document_params = _where_document_to_sql(where_document)
+        query = f"SELECT row, id, document, metadata FROM records WHERE deleted = 0 AND {sql} AND {document_sql}"
+        params = params + document_params
+
+        if ids is not None:
+            if not ids:
+                return self._empty_get(include)
+            query += f" AND id IN ({', '.join('?' * len(ids))})"
+            params = params + list(ids)
+
+        query += " ORDER BY row"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params = params + [limit, offset or 0]
+
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+
+            result = {'ids': [r[1] for r in rows]}
+            if "documents" in include:
+                result['documents'] = [r[2] for r in rows]
+            if "metadatas" in include:
+                result['metadatas'] = [json.loads(r[3]) for r in rows]
+            if "embeddings" in include:
+                result['embeddings'] = self._read_rows([r[0] for r in rows]).tolist()
+        return result
+
+    @staticmethod
+    def _empty_get(include):
+        result = {'ids': []}
+        for key in ("documents", "metadatas", "embeddings"):
+            if key in include:
+                result[key] = []
+        return result
+
+    def query(self, query_embeddings, n_results=5, where=None, include=None):
+        """
+        Поиск ближайших (как collection.query, distance = 1 - cosine)
+
+        Близость считается точно, блоками по шардам; при заданном
+        rescore_fn лучшие кандидаты пересчитываются в полной точности.
+        """
+        include = include if include is not None else ["documents", "metadatas", "distances"]
+        queries = _unit(np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32)))
+
+        result = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        if "embeddings" in include:
+            result['embeddings'] = []
+
+        with self._lock:
+            rows_total = self._meta['rows']
+            if not rows_total:
+                for _ in queries:
+                    for key in result:
+                        result[key].append([])
+                return result
+
+            mask = self._filter_mask(where, rows_total)
+            scores = self._scores(queries, rows_total)
+            scores[:, ~mask] = -np.inf
+
+        candidates = n_results * self.rescore_factor if self.rescore_fn else n_results
+        candidates = min(candidates, int(mask.sum()))
+
+        for query, row_scores in zip(queries, scores):
+            if candidates <= 0:
+                top = np.zeros(0, dtype=np.int64)
+            else:
+                top = np.argpartition(-row_scores, candidates - 1)[:candidates]
+                top = top[np.argsort(-row_scores[top])]
+
+            records = self._records_for_rows(top.tolist())
+            top_scores = row_scores[top]
+
+            if self.rescore_fn and len(top):
+                exact = _unit(self.rescore_fn([records[row][1] for row in top.tolist()]))
+                top_scores = exact @ query
+                order = np.argsort(-top_scores)
+                top = top[order]
+                top_scores = top_scores[order]
+
+            top = top[:n_results]
+            top_scores = top_scores[:n_results]
+
+            result['ids'].append([records[row][0] for row in top.tolist()])
+            result['documents'].append([records[row][1] for row in top.tolist()])
+            result['metadatas'].append([records[row][2] for row in top.tolist()])
+            result['distances'].append([1.0 - float(s) for s in top_scores])
+            if "embeddings" in include:
+                with self._lock:
+                    result['embeddings'].append(self._read_rows(top.tolist()).tolist())
+
+        return result
+
+    def close(self):
+        """Сброс файлов на диск"""
+        with self._lock:
+            self._flush()
+            self._db.close()
+
+    def _filter_mask(self, where, rows_total):
+        """Маска допустимых строк: живые и подходящие под фильтр"""
+        mask = self._alive[:rows_total].copy()
+        if not where:
+            return mask
+
+        # Быстрый путь для фильтра по типу
+        if set(where) == {'type'}:
+            condition = where['type']
+            if not isinstance(condition, dict):
+                condition = {'$eq': condition}
+            if set(condition) <= {'$eq', '$in'}:
+                allowed = condition.get('$in', [condition.get('$eq')])
+                codes = [self._type_names[t] for t in allowed if t in self._type_names]
+                return mask & np.isin(self._type_codes[:rows_total], codes)
+
+        sql, params = _where_to_sql(where)
+        allowed_rows = [row for (row,) in self._db.execute(
+            f"SELECT row FROM records WHERE deleted = 0 AND {sql}", params
+        )]
+        filtered = np.zeros(rows_total, dtype=bool)
+        filtered[allowed_rows] = True
+        return mask & filtered
+
+    def _scores(self, queries, rows_total, block=16384):
+        """Скалярные произведения запросов со всеми строками (блоками в float32)"""
+        scores = np.empty((len(queries), rows_total), dtype=np.float32)
+        for index, shard in enumerate(self._shards):
+            shard_start = index * self.shard_rows
+            shard_end = min(shard_start + self.shard_rows, rows_total)
+            if shard_start >= shard_end:
+                break
+
+            for start in range(0, shard_end - shard_start, block):
+                end = min(start + block, shard_end - shard_start)
+                chunk = np.asarray(shard[start:end], dtype=np.float32)
+                chunk_scores = queries @ chunk.T
+                if self._scale_shards:
+                    chunk_scores *= self._scale_shards[index][start:end]
+                scores[:, shard_start + start:shard_start + end] = chunk_scores
+        return scores
+
+    def _records_for_rows(self, rows):
+        if not rows:
+            return {}
+        with self._lock:
+            fetched = self._db.execute(
+                f"SELECT row, id, document, metadata FROM records WHERE row IN ({', '.join('?' * len(rows))})",
+                rows
+            ).fetchall()
+        return {row: (memory_id, doc, json.loads(meta)) for row, memory_id, doc, meta in fetched}
+
+
+class ChainedCollection(VectorStore):
+    """
+    Несколько хранилищ под одним интерфейсом (основное + квантованная база знаний)
+
+    Используется обслуживающим кодом (статистика, индексы, очистка, экспорт,
+    дедупликация), которому не важно, где физически лежит запись.
+    """
+
+    def __init__(self, *collections):
+        self.collections = collections
+
+    def count(self):
+        return sum(collection.count() for collection in self.collections)
+
+    def count_matching(self, ids=None, where=None, where_document=None):
+        return sum(
+            collection.count_matching(ids=ids, where=where, where_document=where_document)
+            for collection in self.collections
+        )
+
+    def get(self, ids=None, where=None, limit=None, offset=0, include=None, where_document=None):
+        """Выборка по всем хранилищам; limit/offset сквозные"""
+        include = include if include is not None else ["documents", "metadatas"]
+        merged = {'ids': []}
+        for key in ("documents", "metadatas", "embeddings"):
+            if key in include:
+                merged[key] = []
+
+        filters = {}
+        if ids is not None:
+            filters['ids'] = ids
+        if where:
+            filters['where'] = where
+        if where_document:
+            filters['where_document'] = where_document
+
+        for collection in self.collections:
+            if limit is None:
+                self._extend(merged, collection.get(include=include, **filters))
+                continue
+
+            need = limit - len(merged['ids'])
+            if need <= 0:
+                break
+
+            page = collection.get(limit=need, offset=offset, include=include, **filters)
+            self._extend(merged, page)
+            if len(page['ids']) >= need:
+                break
+
+            # Хранилище исчерпано - смещение переносится на следующее
+            if offset:
+                size = collection.count_matching(**filters) if filters else collection.count()
+                offset = max(0, offset - size)
+
+        return merged
+
+    @staticmethod
+    def _extend(merged, page):
+        for key in merged:
+            values = page.get(key)
+            merged[key].extend(list(values) if values is not None else [])
+
+    def query(self, query_embeddings, n_results=5, where=None, include=None):
+        """Поиск по всем хранилищам со слиянием по расстоянию"""
+        include = list(include) if include is not None else ["documents", "metadatas", "distances"]
+        if "distances" not in include:
+            include.append("distances")
+
+        results = [
+            collection.query(query_embeddings=query_embeddings, n_results=n_results,
+                             where=where, include=include)
+            for collection in self.collections
+        ]
+
+        keys = ['ids'] + [key for key in ("documents", "metadatas", "distances", "embeddings")
+                          if key in include]
+        merged = {key: [] for key in keys}
+
+        for query_idx in range(len(query_embeddings)):
+            rows = []
+            for result in results:
+                if not result['ids']:
+                    continue
+                for pos in range(len(result['ids'][query_idx])):
+                    rows.append({
+                        key: (result[key][query_idx][pos] if result.get(key) is not None else None)
+                        for key in keys
+                    })
+            rows.sort(key=lambda row: row['distances'])
+            rows = rows[:n_results]
+            for key in keys:
+                merged[key].append([row[key] for row in rows])
+
+        return merged
+
+    def update(self, ids, metadatas):
+        """Обновление метаданных в том хранилище, где лежит запись"""
+        remaining = dict(zip(ids, metadatas))
+        for collection in self.collections:
+            if not remaining:
+                break
+            found = collection.get(ids=list(remaining), include=[])['ids']
+            if found:
+                collection.update(ids=found, metadatas=[remaining.pop(memory_id) for memory_id in found])
+
+    def delete(self, ids):
+        """Удаление записей из всех хранилищ"""
+        for collection in self.collections:
+            collection.delete(ids=ids)
+
+    def close(self):
+        for collection in self.collections:
+            collection.close()
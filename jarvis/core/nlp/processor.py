@@ -4,30 +4,166 @@
 """
 
 import asyncio
+import copy
+import gc
 import logging
 import json
+import os
+import threading
+import time
 from pathlib import Path
 import re
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+from transformers import (AutoTokenizer, AutoModelForCausalLM, StoppingCriteria,
+                          StoppingCriteriaList, TextIteratorStreamer, pipeline)
 import torch
 
+from jarvis.core.nlp.router import ResponseRouter
+from jarvis.utils.sentences import split_at_stop
+
 logger = logging.getLogger(__name__)
 
+PERSONALITY_FILE = Path("config/personality.json")
+
+# Реплики, с которых модель начинает выдумывать следующий ход диалога
+ROLE_MARKERS = ("Пользователь:", "Джарвис:")
+
+# Бюджеты ответа по типу реплики (config.nlp.response_budgets дополняет их)
+DEFAULT_RESPONSE_BUDGETS = {
+    'confirmation': {'max_new_tokens': 32, 'max_newlines': 0},
+    'conversation': {'max_new_tokens': 96, 'max_newlines': 2},
+    'explanation': {'max_new_tokens': 200, 'max_newlines': 6},
+}
+
+RESPONSE_KIND_PATTERNS = {
+    'confirmation': r'^(да|нет|ок|окей|хорошо|понял|ясно|привет|спасибо|благодарю|отлично|пока)\b',
+    'explanation': r'(почему|зачем|объясни|расскажи|как работает|как устроен|что такое|в чём разница|подробно)',
+}
+
+
+CPU_MODES = ('int8', 'bf16', 'fp32')
+
+
+def _cpu_flags():
+    """Флаги CPU из /proc/cpuinfo (None - файла нет, например не Linux)"""
+    try:
+        with open('/proc/cpuinfo', 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('flags'):
+                    return set(line.split(':', 1)[1].split())
+    except OSError:
+        return None
+    return set()
+
+
+def _bf16_supported():
+    """
+    Есть ли у CPU аппаратная поддержка bfloat16 (AVX512-BF16/AMX)
+    
+    Обычный AVX512 считает bfloat16 эмуляцией через float32 - это медленнее int8
+    """
+    flags = _cpu_flags()
+    if flags is not None:
+        return 'avx512_bf16' in flags or 'amx_bf16' in flags
+    
+    # Без /proc/cpuinfo: AMX всегда с bfloat16, AVX512-BF16 по уровню ядер не отличить
+    try:
+        capability = torch.backends.cpu.get_cpu_capability()
+    except AttributeError:
+        return False
+    return 'AMX' in capability
+
+
+def _resident_memory_mb():
+    """Резидентная память процесса в МБ (None - не удалось определить)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024**2
+    except ImportError:
+        pass
+    try:
+        import resource
+        # Пиковое значение; на Linux - в КБ
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return None
+
+
+class StopOnMarkers(StoppingCriteria):
+    """Остановка генерации на реплике следующего хода или по числу переводов строк"""
+    
+    def __init__(self, tokenizer, prompt_length, stops=ROLE_MARKERS, max_newlines=None):
+        """
+        Args:
+            tokenizer: Токенизатор модели
+            prompt_length: Длина промпта в токенах (декодируется только то, что после)
+            stops: Стоп-строки
+            max_newlines: Максимум переводов строк в ответе (None - без ограничения)
+        """
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.stops = stops
+        self.max_newlines = max_newlines
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        text = self.tokenizer.decode(input_ids[0, self.prompt_length:], skip_special_tokens=True).lstrip()
+        done = any(stop in text for stop in self.stops)
+        if not done and self.max_newlines is not None:
+            done = text.strip().count("\n") > self.max_newlines
+        return torch.full((input_ids.shape[0],), done, dtype=torch.bool, device=input_ids.device)
+
 
 class NLPProcessor:
     """Класс для обработки естественного языка"""
     
-    def __init__(self, config):
+    def __init__(self, config, lazy=False):
+        """
+        Args:
+            config: Конфигурация
+            lazy: Не загружать LLM в конструкторе (загрузка - через load(),
+                  до её завершения ответы идут через _fallback_response)
+        """
         self.config = config
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.model = None
         self.tokenizer = None
+        self.small_model = None
+        self.small_tokenizer = None
         self.intent_classifier = None
+        self.cpu_mode = None
+        self.load_metrics = {}
+        
+        # KV-кэш системного промпта: (уровень, personality) -> {'input_ids', 'past_key_values'}
+        self._prefix_cache = {}
+        self._prefix_lock = threading.Lock()
+        self.prefix_cache_enabled = self.config.get('nlp', {}).get('prefix_cache', True)
         
         # Загрузка настроек личности
+        self._personality_mtime = self._personality_file_mtime()
         self.personality = self._load_personality()
         
+        # Уровни генерации: шаблон -> кэш -> малая модель -> большая
+        self.router_config = self.config.get('nlp', {}).get('router', {})
+        self.router = ResponseRouter(self.router_config, templates=self._template_responses)
+        
+        # Классификатор намерений лёгкий и нужен сразу
+        self._load_intent_classifier()
+        
+        if not lazy:
+            self._initialize_small_model()
+            self._initialize_models()
+    
+    def load(self):
+        """Загрузка LLM (для фонового потока)"""
+        # Малая модель грузится быстро и отвечает на простые реплики,
+        # пока загружается большая
+        self._initialize_small_model()
         self._initialize_models()
+        if self.model is None:
+            raise RuntimeError("LLM недоступна, используется упрощенный режим")
+    
+    def is_ready(self):
+        """Загружена ли LLM"""
+        return self.model is not None
     
     def _initialize_models(self):
         """Инициализация языковых моделей"""
@@ -38,21 +174,38 @@ class NLPProcessor:
             model_name = self.config.get('llm_model', 'mistralai/Mistral-7B-Instruct-v0.2')
             
             logger.info(f"Загрузка модели: {model_name}")
+            load_start = time.perf_counter()
             
             # Загрузка токенизатора и модели
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(
-                model_name,
-                torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
-                device_map="auto" if self.device == "cuda" else None,
-                low_cpu_mem_usage=True
-            )
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            if self.device == "cuda":
+                model = AutoModelForCausalLM.from_pretrained(
+                    model_name,
+                    torch_dtype=torch.float16,
+                    device_map="auto",
+                    low_cpu_mem_usage=True
+                )
+            else:
+                model, self.cpu_mode = self._load_cpu_model(model_name, self.config.get('nlp', {}).get('cpu', {}))
             
-            if self.device == "cpu":
-                self.model = self.model.to(self.device)
+            self.load_metrics.update({
+                'device': self.device,
+                'cpu_mode': self.cpu_mode,
+                'load_seconds': time.perf_counter() - load_start,
+                'resident_mb': _resident_memory_mb(),
+            })
             
-            # Загрузка классификатора намерений
-            self._load_intent_classifier()
+            # Прогрев до публикации модели: первый запрос не платит за инициализацию ядер
+            cpu_config = self.config.get('nlp', {}).get('cpu', {})
+            if cpu_config.get('warmup', True):
+                self.load_metrics['tokens_per_second'] = self._warmup(model, tokenizer, cpu_config)
+            
+            self._log_load_metrics(self.load_metrics, "LLM")
+            
+            # Модель публикуется последней: generate_response проверяет self.model
+            self._clear_prefix_cache('large')
+            self.tokenizer = tokenizer
+            self.model = model
             
             logger.info("NLP модели загружены успешно")
             logger.info(f" Личность: {self.personality['personality']['style'].upper()}")
@@ -62,9 +215,175 @@ class NLPProcessor:
             logger.info("Используется упрощенный режим без LLM")
             self.model = None
     
+    def _initialize_small_model(self):
+        """Загрузка малой модели на CPU (config.nlp.router.small.model, None - уровень выключен)"""
+        small_config = self.router_config.get('small', {})
+        model_name = small_config.get('model')
+        if not model_name or not self.router.enabled:
+            return
+        
+        try:
+            logger.info(f"Загрузка малой модели: {model_name}")
+            load_start = time.perf_counter()
+            
+            cpu_config = small_config.get('cpu', {})
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            model, mode = self._load_cpu_model(model_name, cpu_config)
+            
+            metrics = {
+                'device': 'cpu',
+                'cpu_mode': mode,
+                'load_seconds': time.perf_counter() - load_start,
+                'resident_mb': _resident_memory_mb(),
+            }
+            if cpu_config.get('warmup', True):
+                metrics['tokens_per_second'] = self._warmup(model, tokenizer, cpu_config)
+            self.load_metrics['small'] = metrics
+            self._log_load_metrics(metrics, "Малая модель")
+            
+            self._clear_prefix_cache('small')
+            self.small_tokenizer = tokenizer
+            self.small_model = model
+        
+        except Exception as e:
+            logger.error(f"Ошибка загрузки малой модели: {e}")
+            self.small_model = None
+    
+    def _tier_model(self, tier):
+        """(модель, токенизатор) уровня small или large"""
+        if tier == 'small':
+            return self.small_model, self.small_tokenizer
+        return self.model, self.tokenizer
+    
+    def _clear_prefix_cache(self, tier=None):
+        """Сброс KV-кэша промпта уровня (None - всех)"""
+        with self._prefix_lock:
+            for key in list(self._prefix_cache):
+                if tier is None or key[0] == tier:
+                    del self._prefix_cache[key]
+    
+    def _personality_file_mtime(self):
+        """Время изменения personality.json (None - файла нет)"""
+        try:
+            return PERSONALITY_FILE.stat().st_mtime_ns
+        except OSError:
+            return None
+    
+    def _reload_personality_if_changed(self):
+        """
+        Перечитывание personality.json, если файл изменился
+        
+        Returns:
+            bool: True, если настройки перезагружены (KV-кэш сброшен)
+        """
+        mtime = self._personality_file_mtime()
+        if mtime == self._personality_mtime:
+            return False
+        
+        self._personality_mtime = mtime
+        self.personality = self._load_personality()
+        self._clear_prefix_cache()
+        self.router.clear_cache()
+        return True
+    
+    def _load_cpu_model(self, model_name, cpu_config):
+        """
+        Загрузка LLM для CPU
+        
+        mode: int8 - динамическое квантование весов Linear-слоёв в int8,
+        bf16 - bfloat16 (если CPU поддерживает, иначе int8), fp32 - без изменений.
+        
+        Args:
+            model_name: Имя модели
+            cpu_config: Настройки (config.nlp.cpu или config.nlp.router.small.cpu)
+            
+        Returns:
+            tuple: (модель в режиме eval, итоговый режим)
+        """
+        mode = cpu_config.get('mode', 'int8')
+        if mode not in CPU_MODES:
+            logger.warning(f"Неизвестный режим CPU: {mode} (доступны: {', '.join(CPU_MODES)}), используется int8")
+            mode = 'int8'
+        if mode == 'bf16' and not _bf16_supported():
+            logger.warning("CPU без поддержки bfloat16, используется int8")
+            mode = 'int8'
+        
+        self._configure_cpu_threads(cpu_config)
+        
+        # quantize_dynamic работает с float32-слоями
+        model = AutoModelForCausalLM.from_pretrained(
+            model_name,
+            torch_dtype=torch.bfloat16 if mode == 'bf16' else torch.float32,
+            low_cpu_mem_usage=True
+        )
+        model.eval()
+        
+        if mode == 'int8':
+            # На месте: без копии модели на время квантования; float32-веса
+            # заменённых слоёв освобождаются сразу
+            torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+            gc.collect()
+        
+        return model, mode
+    
+    def _configure_cpu_threads(self, cpu_config):
+        """Число потоков PyTorch: внутри операций (threads) и между ними (interop_threads)"""
+        threads = cpu_config.get('threads')
+        if not threads:
+            try:
+                import psutil
+                threads = psutil.cpu_count(logical=False)
+            except ImportError:
+                threads = None
+            threads = threads or os.cpu_count() or 1
+        torch.set_num_threads(threads)
+        
+        interop_threads = cpu_config.get('interop_threads', 1)
+        if interop_threads:
+            try:
+                torch.set_num_interop_threads(interop_threads)
+            except RuntimeError as e:
+                # Задаётся один раз до первой параллельной операции
+                logger.debug(f"interop_threads не изменён: {e}")
+        
+        logger.info(f"Потоков PyTorch: {torch.get_num_threads()}, interop: {torch.get_num_interop_threads()}")
+    
+    def _warmup(self, model, tokenizer, cpu_config):
+        """
+        Прогон короткой генерации
+        
+        Returns:
+            float: Скорость генерации, токенов/сек (None при ошибке)
+        """
+        max_new_tokens = cpu_config.get('warmup_tokens', 8)
+        try:
+            inputs = tokenizer("Пользователь: Привет\nДжарвис:", return_tensors="pt").to(model.device)
+            start = time.perf_counter()
+            with torch.no_grad():
+                outputs = model.generate(
+                    **inputs,
+                    max_new_tokens=max_new_tokens,
+                    min_new_tokens=max_new_tokens,
+                    do_sample=False,
+                    pad_token_id=tokenizer.eos_token_id
+                )
+            elapsed = time.perf_counter() - start
+            generated = outputs.shape[-1] - inputs['input_ids'].shape[-1]
+            return generated / elapsed if elapsed > 0 else None
+        except Exception as e:
+            logger.error(f"Ошибка прогрева модели: {e}")
+            return None
+    
+    def _log_load_metrics(self, metrics, label):
+        """Время загрузки, память и скорость генерации"""
+        mode = f", режим {metrics['cpu_mode']}" if metrics.get('cpu_mode') else ""
+        memory = f", память {metrics['resident_mb']:.0f} МБ" if metrics.get('resident_mb') else ""
+        speed = f", {metrics['tokens_per_second']:.1f} ток/с" if metrics.get('tokens_per_second') else ""
+        logger.info(f"{label} загружена за {metrics['load_seconds']:.1f} с ({metrics['device']}{mode}){memory}{speed}")
+    
     def _load_personality(self):
         """Загрузка настроек личности"""
-        personality_file = Path("config/personality.json")
+        personality_file = PERSONALITY_FILE
         
         if personality_file.exists():
             try:
@@ -206,7 +525,7 @@ class NLPProcessor:
         
         return entities
     
-    async def generate_response(self, user_input, context=None, personality="jarvis"):
+    async def generate_response(self, user_input, context=None, personality="jarvis", kind=None):
         """
         Генерация ответа на запрос
         
@@ -214,56 +533,360 @@ class NLPProcessor:
             user_input: Текст от пользователя
             context: Контекст разговора
             personality: Стиль персонажа (jarvis по умолчанию)
+            kind: Тип ответа для бюджета токенов (None - по реплике, см. response_kind)
             
         Returns:
             str: Сгенерированный ответ
         """
         try:
-            if self.model is None:
-                return self._fallback_response(user_input)
-            
-            # Формирование промпта с личностью Джарвиса
-            system_prompt = self._get_personality_prompt(personality)
+            kind = kind or self.response_kind(user_input)
+            start = time.perf_counter()
             
-            # Добавление контекста
-            context_text = ""
-            if context and context.get('relevant_memories'):
-                context_text = "Известная информация:\n"
-                for memory in context['relevant_memories'][:3]:
-                    context_text += f"- {memory}\n"
-            
-            # Формирование полного промпта
-            full_prompt = f"""{system_prompt}
-
-{context_text}
-
-Пользователь: {user_input}
-Джарвис:"""
-            
-            # Генерация ответа
-            inputs = self.tokenizer(full_prompt, return_tensors="pt").to(self.device)
+            # Генерация блокирующая - в пул потоков
+            loop = asyncio.get_running_loop()
+            response, tier = await loop.run_in_executor(
+                None, self._respond, user_input, context, personality, kind
+            )
             
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    **inputs,
-                    max_new_tokens=150,
-                    temperature=0.7,
-                    top_p=0.9,
-                    do_sample=True,
-                    pad_token_id=self.tokenizer.eos_token_id
-                )
+            self.router.record(tier, time.perf_counter() - start)
+            return response
             
-            response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+        except Exception as e:
+            logger.error(f"Ошибка генерации ответа: {e}")
+            return self._fallback_response(user_input)
+    
+    def _respond(self, user_input, context, personality, kind, use_large=True):
+        """
+        Ответ через уровни маршрутизатора
+        
+        Args:
+            use_large: Генерировать большой моделью (False - вернуть None,
+                       если нужна большая модель)
             
-            # Извлечение только ответа Джарвиса
-            response = response.split("Джарвис:")[-1].strip()
-            response = response.split("Пользователь:")[0].strip()
+        Returns:
+            tuple: (ответ или None, уровень)
+        """
+        response = self.router.template(user_input)
+        if response:
+            return response, 'template'
+        
+        response = self.router.cached(user_input, context)
+        if response:
+            return response, 'cache'
+        
+        response = None
+        if self.small_model is not None and self.router.prefers_small(user_input, kind):
+            response, confidence, truncated = self._generate(user_input, context, personality, kind, 'small')
+            if self.router.accept(response, confidence, truncated):
+                self.router.remember(user_input, context, response)
+                return response, 'small'
+        
+        if self.model is None:
+            # Большая модель ещё не загружена: лучше неуверенный ответ малой, чем заглушка
+            if response:
+                return response, 'small'
+            return self._fallback_response(user_input), 'fallback'
+        
+        if not use_large:
+            return None, 'large'
+        
+        response, _, _ = self._generate(user_input, context, personality, kind, 'large')
+        self.router.remember(user_input, context, response)
+        return response, 'large'
+    
+    def _generate(self, user_input, context, personality, kind, tier):
+        """
+        Генерация ответа моделью уровня
+        
+        Returns:
+            tuple: (ответ, средняя вероятность токенов или None, упёрся ли в лимит)
+        """
+        model, tokenizer = self._tier_model(tier)
+        
+        # Системный промпт постоянен между ходами: его KV берётся из кэша,
+        # prefill идёт только по контексту и реплике пользователя
+        inputs = self._prepare_inputs(personality, self._format_turn(user_input, context, personality, tier), tier)
+        prompt_length = inputs['input_ids'].shape[-1]
+        generation_kwargs = self._generation_kwargs(prompt_length, kind, tier)
+        
+        # Для малой модели нужны вероятности токенов - по ним решается эскалация
+        with_scores = tier == 'small'
+        with torch.no_grad():
+            outputs = model.generate(
+                **inputs, **generation_kwargs,
+                output_scores=with_scores, return_dict_in_generate=True
+            )
+        
+        generated = outputs.sequences[0, prompt_length:]
+        confidence = None
+        if with_scores and outputs.scores:
+            transition_scores = model.compute_transition_scores(
+                outputs.sequences, outputs.scores, normalize_logits=True
+            )
+            confidence = float(torch.exp(transition_scores[0]).mean())
+        truncated = generated.shape[-1] >= generation_kwargs['max_new_tokens']
+        
+        # Декодируются только новые токены; реплика следующего хода отрезается
+        response = tokenizer.decode(generated, skip_special_tokens=True)
+        response, stopped = split_at_stop(response.lstrip(), ROLE_MARKERS)
+        return response.strip(), confidence, truncated and not stopped
+    
+    async def stream_response(self, user_input, context=None, personality="jarvis", kind=None):
+        """
+        Потоковая генерация ответа
+        
+        Модель генерирует в отдельном потоке, текст отдаётся по мере
+        появления токенов. Поток обрывается на реплике следующего хода.
+        
+        Args:
+            user_input: Текст от пользователя
+            context: Контекст разговора
+            personality: Стиль персонажа
+            kind: Тип ответа для бюджета токенов (None - по реплике)
             
-            return response
+        Yields:
+            str: Фрагменты ответа
+        """
+        kind = kind or self.response_kind(user_input)
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        
+        # Шаблон, кэш и малая модель отвечают целиком; потоком идёт только большая
+        try:
+            response, tier = await loop.run_in_executor(
+                None, self._respond, user_input, context, personality, kind, False
+            )
+        except Exception as e:
+            logger.error(f"Ошибка генерации ответа: {e}")
+            response, tier = self._fallback_response(user_input), 'fallback'
+        
+        if response is not None:
+            self.router.record(tier, time.perf_counter() - start)
+            yield response
+            return
+        
+        try:
+            inputs = self._prepare_inputs(personality, self._format_turn(user_input, context))
+            streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+            generation_kwargs = self._generation_kwargs(inputs['input_ids'].shape[-1], kind)
+            
+            thread = threading.Thread(
+                target=self._generate_into,
+                args=(inputs, streamer, generation_kwargs),
+                name="llm-stream",
+                daemon=True
+            )
+            thread.start()
+        except Exception as e:
+            logger.error(f"Ошибка потоковой генерации: {e}")
+            yield self._fallback_response(user_input)
+            return
+        
+        text = ""
+        emitted = 0
+        stopped = False
+        
+        # Чтение очереди стримера блокирующее - уходит в пул потоков
+        while True:
+            piece = await loop.run_in_executor(None, next, streamer, None)
+            if piece is None:
+                break
             
+            text += piece
+            ready, stopped = split_at_stop(text, ROLE_MARKERS)
+            if len(ready) > emitted:
+                yield ready[emitted:]
+                emitted = len(ready)
+            if stopped:
+                break
+        
+        if not stopped and len(text) > emitted:
+            yield text[emitted:]
+        
+        self.router.record('large', time.perf_counter() - start)
+        self.router.remember(user_input, context, split_at_stop(text.lstrip(), ROLE_MARKERS)[0].strip())
+    
+    def _generate_into(self, inputs, streamer, generation_kwargs):
+        """generate со стримером (в отдельном потоке); стример закрывается и при ошибке"""
+        try:
+            with torch.no_grad():
+                self.model.generate(**inputs, streamer=streamer, **generation_kwargs)
         except Exception as e:
             logger.error(f"Ошибка генерации ответа: {e}")
-            return self._fallback_response(user_input)
+            streamer.end()
+    
+    def response_kind(self, user_input):
+        """
+        Тип ответа по реплике: confirmation (короткое подтверждение),
+        explanation (развёрнутое объяснение) или conversation
+        """
+        text = user_input.lower().strip()
+        for kind, pattern in RESPONSE_KIND_PATTERNS.items():
+            if re.search(pattern, text):
+                return kind
+        return 'conversation'
+    
+    def _response_budget(self, kind, tier='large'):
+        """
+        Бюджет ответа: max_new_tokens и max_newlines (config.nlp.response_budgets);
+        для малой модели лимит токенов дополнительно ограничен router.small.max_new_tokens
+        """
+        nlp_config = self.config.get('nlp', {})
+        budget = {
+            'max_new_tokens': nlp_config.get('max_tokens', 150),
+            'max_newlines': None,
+        }
+        budget.update(DEFAULT_RESPONSE_BUDGETS.get(kind, {}))
+        budget.update(nlp_config.get('response_budgets', {}).get(kind, {}))
+        if tier == 'small':
+            small_limit = self.router_config.get('small', {}).get('max_new_tokens')
+            if small_limit:
+                budget['max_new_tokens'] = min(budget['max_new_tokens'], small_limit)
+        return budget
+    
+    def _generation_kwargs(self, prompt_length, kind='conversation', tier='large'):
+        """
+        Параметры generate: сэмплирование (config.nlp), бюджет по типу ответа
+        и остановка на реплике следующего хода
+        
+        Args:
+            prompt_length: Длина промпта в токенах
+            kind: Тип ответа (response_kind)
+            tier: Уровень модели (small/large)
+        """
+        nlp_config = self.config.get('nlp', {})
+        _, tokenizer = self._tier_model(tier)
+        budget = self._response_budget(kind, tier)
+        return {
+            'max_new_tokens': budget['max_new_tokens'],
+            'temperature': nlp_config.get('temperature', 0.7),
+            'top_p': nlp_config.get('top_p', 0.9),
+            'do_sample': True,
+            'pad_token_id': tokenizer.eos_token_id,
+            'stopping_criteria': StoppingCriteriaList([
+                StopOnMarkers(tokenizer, prompt_length, max_newlines=budget['max_newlines'])
+            ]),
+        }
+    
+    def _format_turn(self, user_input, context=None, personality="jarvis", tier='large'):
+        """
+        Переменная часть промпта: контекст из памяти и реплика пользователя
+        
+        Для модели с chat-шаблоном (_chat_tokenizer) - продолжение диалога
+        из шаблона после системной части (_prefix_text)
+        """
+        context_text = ""
+        if context and context.get('relevant_memories'):
+            context_text = "Известная информация:\n"
+            for memory in context['relevant_memories'][:3]:
+                context_text += f"- {memory}\n"
+        
+        tokenizer = self._chat_tokenizer(tier)
+        if tokenizer is not None:
+            messages = [
+                {'role': 'system', 'content': self._get_personality_prompt(personality)},
+                {'role': 'user', 'content': f"{context_text}\n{user_input}".strip()},
+            ]
+            dialog = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+            return dialog[len(self._prefix_text(personality, tier)):]
+        
+        return f"""{context_text}
+
+Пользователь: {user_input}
+Джарвис:"""
+    
+    def _prepare_inputs(self, personality, turn_text, tier='large'):
+        """
+        Входы generate: токены системного промпта и хода с KV-кэшем префикса
+        
+        Args:
+            personality: Стиль персонажа
+            turn_text: Переменная часть промпта (_format_turn)
+            tier: Уровень модели (small/large)
+            
+        Returns:
+            dict: input_ids, attention_mask и (если кэш доступен) past_key_values
+        """
+        self._reload_personality_if_changed()
+        
+        model, tokenizer = self._tier_model(tier)
+        prefix = self._get_prefix_cache(personality, tier)
+        turn_ids = tokenizer(
+            turn_text, return_tensors="pt", add_special_tokens=False
+        ).input_ids.to(model.device)
+        input_ids = torch.cat([prefix['input_ids'], turn_ids], dim=-1)
+        
+        inputs = {
+            'input_ids': input_ids,
+            'attention_mask': torch.ones_like(input_ids),
+        }
+        if prefix['past_key_values'] is not None:
+            # generate дописывает в кэш новые токены - отдаём копию
+            inputs['past_key_values'] = copy.deepcopy(prefix['past_key_values'])
+        return inputs
+    
+    def _get_prefix_cache(self, personality, tier='large'):
+        """
+        Токены и past_key_values системного промпта (считаются один раз
+        на уровень модели, personality и версию personality.json)
+        """
+        with self._prefix_lock:
+            entry = self._prefix_cache.get((tier, personality))
+            if entry is not None:
+                return entry
+            
+            model, tokenizer = self._tier_model(tier)
+            # Спецтокены chat-шаблона уже в тексте
+            input_ids = tokenizer(
+                self._prefix_text(personality, tier), return_tensors="pt",
+                add_special_tokens=self._chat_tokenizer(tier) is None
+            ).input_ids.to(model.device)
+            
+            past_key_values = None
+            if self.prefix_cache_enabled:
+                try:
+                    with torch.no_grad():
+                        outputs = model(input_ids=input_ids, use_cache=True)
+                    past_key_values = outputs.past_key_values
+                    logger.info(f"KV-кэш системного промпта: {input_ids.shape[-1]} токенов")
+                except Exception as e:
+                    logger.error(f"Ошибка построения KV-кэша промпта: {e}")
+            
+            entry = {'input_ids': input_ids, 'past_key_values': past_key_values}
+            self._prefix_cache[(tier, personality)] = entry
+            return entry
+    
+    def _prefix_text(self, personality, tier='large'):
+        """Постоянная часть промпта: системный промпт (в chat-шаблоне модели, если он есть)"""
+        system_prompt = self._get_personality_prompt(personality)
+        tokenizer = self._chat_tokenizer(tier)
+        if tokenizer is not None:
+            return tokenizer.apply_chat_template([{'role': 'system', 'content': system_prompt}], tokenize=False)
+        return f"{system_prompt}\n\n"
+    
+    def _chat_tokenizer(self, tier):
+        """
+        Токенизатор уровня, если промпт строится его chat-шаблоном (None - строкой)
+        
+        Шаблон используется для малой instruct-модели, если он принимает системный
+        промпт и системная часть - префикс диалога (иначе KV-кэш промпта неприменим)
+        """
+        if tier != 'small':
+            return None
+        _, tokenizer = self._tier_model(tier)
+        if not getattr(tokenizer, 'chat_template', None):
+            return None
+        
+        system = [{'role': 'system', 'content': "S"}]
+        try:
+            prefix = tokenizer.apply_chat_template(system, tokenize=False)
+            dialog = tokenizer.apply_chat_template(
+                system + [{'role': 'user', 'content': "U"}], tokenize=False, add_generation_prompt=True
+            )
+        except Exception as e:
+            logger.debug(f"chat-шаблон без системного промпта: {e}")
+            return None
+        return tokenizer if dialog.startswith(prefix) else None
     
     def _get_personality_prompt(self, personality):
         """Получение системного промпта для персонажа"""
@@ -315,25 +938,27 @@ class NLPProcessor:
         
         return "Ты полезный AI-ассистент."
     
-    def _fallback_response(self, user_input):
-        """Запасной вариант ответа при недоступности LLM"""
+    def _template_responses(self):
+        """Готовые ответы на типовые реплики (фраза -> ответ)"""
         
         # Загрузка кастомных фраз
         phrases = self.personality.get('custom_phrases', {})
         address = self.personality.get('personality', {}).get('address_user_as', 'сэр')
         
-        fallback_responses = {
+        return {
             'привет': phrases.get('affirmative', ["Да, сэр"])[0].replace("Да", "Приветствую вас"),
             'как дела': f"Все системы функционируют в штатном режиме, {address}",
             'спасибо': f"Всегда рад помочь, {address}",
             'что ты умеешь': "Я могу управлять задачами, напоминаниями, календарем, искать информацию, работать с файлами и многое другое",
         }
+    
+    def _fallback_response(self, user_input):
+        """Запасной вариант ответа при недоступности LLM"""
+        address = self.personality.get('personality', {}).get('address_user_as', 'сэр')
         
-        user_lower = user_input.lower()
-        
-        for key, response in fallback_responses.items():
-            if key in user_lower:
-                return response
+        response = self.router.match_template(user_input)
+        if response:
+            return response
         
         return f"Понял вас, {address}. Чем могу помочь?"
     
@@ -359,20 +984,26 @@ class NLPProcessor:
             # Использование модели для суммаризации
             prompt = f"Кратко резюмируй следующий текст:\n\n{text}\n\nРезюме:"
             
-            inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
+            inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
+            prompt_length = inputs['input_ids'].shape[-1]
+            
+            # Резюме - один абзац: остановка на пустой строке или новом «Резюме:»
+            stops = ("\n\n", "Резюме:")
             
             with torch.no_grad():
                 outputs = self.model.generate(
                     **inputs,
                     max_new_tokens=max_length,
                     temperature=0.5,
-                    do_sample=True
+                    do_sample=True,
+                    pad_token_id=self.tokenizer.eos_token_id,
+                    stopping_criteria=StoppingCriteriaList([
+                        StopOnMarkers(self.tokenizer, prompt_length, stops=stops)
+                    ])
                 )
             
-            summary = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            summary = summary.split("Резюме:")[-1].strip()
-            
-            return summary
+            summary = self.tokenizer.decode(outputs[0, prompt_length:], skip_special_tokens=True)
+            return split_at_stop(summary.lstrip(), stops)[0].strip()
             
         except Exception as e:
             logger.error(f"Ошибка суммаризации: {e}")
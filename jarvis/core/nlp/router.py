@@ -0,0 +1,194 @@
+"""
+Маршрутизация реплик по уровням генерации
+template (шаблон) -> cache (готовый ответ) -> small (малая модель на CPU) -> large (7B)
+Большая модель вызывается только для сложных реплик или при неуверенном ответе малой
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+TIERS = ('template', 'cache', 'small', 'large', 'fallback')
+
+DEFAULT_ESCALATE_PATTERNS = [
+    r'(код|программ|скрипт|функци)',
+    r'(посчитай|вычисли|сравни|проанализируй|составь план|переведи)',
+]
+
+DEFAULT_ADDRESS_WORDS = ('джарвис', 'сэр')
+
+
+def normalize_utterance(text):
+    """Реплика без регистра, пунктуации и лишних пробелов (ключ шаблонов и кэша)"""
+    return " ".join(re.sub(r'[^\w\s]', ' ', text.lower()).split())
+
+
+class ResponseRouter:
+    """Выбор уровня генерации и метрики задержек по уровням"""
+
+    def __init__(self, config=None, templates=None):
+        """
+        Args:
+            config: Настройки маршрутизации (config.nlp.router)
+            templates: Функция без аргументов, возвращающая {фраза: ответ}
+        """
+        config = config or {}
+        self.enabled = config.get('enabled', True)
+        self.templates = templates or dict
+
+        template_config = config.get('template', {})
+        self.template_max_words = template_config.get('max_words', 4)
+        # Обращения в начале и конце реплики не мешают совпадению с шаблоном
+        self.address_words = set(template_config.get('address_words', DEFAULT_ADDRESS_WORDS))
+
+        cache_config = config.get('cache', {})
+        self.cache_enabled = cache_config.get('enabled', True)
+        self.cache_max_entries = cache_config.get('max_entries', 256)
+        self.cache_ttl = cache_config.get('ttl_seconds', 3600)
+
+        small_config = config.get('small', {})
+        self.small_max_words = small_config.get('max_words', 12)
+        self.min_confidence = small_config.get('min_confidence', 0.35)
+        self.escalate_patterns = [
+            re.compile(pattern) for pattern in small_config.get('escalate_patterns', DEFAULT_ESCALATE_PATTERNS)
+        ]
+
+        # Ключ -> (ответ, время записи)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.metrics = {tier: {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0} for tier in TIERS}
+        self.metrics['escalations'] = 0
+
+    def template(self, user_input):
+        """Ответ по шаблону для коротких типовых реплик (None - шаблона нет)"""
+        if not self.enabled:
+            return None
+
+        text = normalize_utterance(user_input)
+        if not text or len(text.split()) > self.template_max_words:
+            return None
+        return self.match_template(text)
+
+    def match_template(self, user_input):
+        """
+        Шаблон, совпадающий с репликой целиком (с точностью до обращения)
+
+        "Привет, Джарвис" совпадает с "привет", "Привет, объясни..." - нет
+        """
+        words = normalize_utterance(user_input).split()
+        while words and words[0] in self.address_words:
+            words.pop(0)
+        while words and words[-1] in self.address_words:
+            words.pop()
+        text = " ".join(words)
+        if not text:
+            return None
+
+        for phrase, response in self.templates().items():
+            if normalize_utterance(phrase) == text:
+                return response
+        return None
+
+    def cached(self, user_input, context=None):
+        """Ранее сгенерированный ответ на ту же реплику с тем же контекстом"""
+        if not (self.enabled and self.cache_enabled):
+            return None
+
+        key = self._cache_key(user_input, context)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            response, stored_at = entry
+            if time.monotonic() - stored_at > self.cache_ttl:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return response
+
+    def remember(self, user_input, context, response):
+        """Сохранение ответа в кэш (LRU)"""
+        if not (self.enabled and self.cache_enabled and response):
+            return
+
+        key = self._cache_key(user_input, context)
+        with self._lock:
+            self._cache[key] = (response, time.monotonic())
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self):
+        """Сброс кэша ответов (например, после смены настроек личности)"""
+        with self._lock:
+            self._cache.clear()
+
+    def prefers_small(self, user_input, kind='conversation'):
+        """
+        Подходит ли реплика малой модели
+
+        Сложность: объяснения, длинные реплики и паттерны эскалации
+        (код, вычисления, анализ)
+        """
+        if not self.enabled or kind == 'explanation':
+            return False
+
+        text = normalize_utterance(user_input)
+        if len(text.split()) > self.small_max_words:
+            return False
+        return not any(pattern.search(text) for pattern in self.escalate_patterns)
+
+    def accept(self, response, confidence=None, truncated=False):
+        """
+        Принимается ли ответ малой модели
+
+        Args:
+            response: Текст ответа
+            confidence: Средняя вероятность выбранных токенов (None - неизвестна)
+            truncated: Ответ упёрся в лимит токенов
+
+        Returns:
+            bool: False - эскалация на большую модель
+        """
+        if not response or truncated:
+            accepted = False
+        elif confidence is not None and confidence < self.min_confidence:
+            accepted = False
+        else:
+            accepted = True
+
+        if not accepted:
+            with self._lock:
+                self.metrics['escalations'] += 1
+        return accepted
+
+    def record(self, tier, seconds):
+        """Учёт задержки ответа уровня"""
+        with self._lock:
+            metric = self.metrics[tier]
+            metric['count'] += 1
+            metric['total_seconds'] += seconds
+            metric['max_seconds'] = max(metric['max_seconds'], seconds)
+
+    def stats(self):
+        """Метрики по уровням: число ответов, средняя и максимальная задержка (мс)"""
+        with self._lock:
+            stats = {'escalations': self.metrics['escalations'], 'cache_size': len(self._cache)}
+            for tier in TIERS:
+                metric = self.metrics[tier]
+                count = metric['count']
+                stats[tier] = {
+                    'count': count,
+                    'avg_ms': metric['total_seconds'] / count * 1000 if count else 0.0,
+                    'max_ms': metric['max_seconds'] * 1000,
+                }
+            return stats
+
+    def _cache_key(self, user_input, context):
+        memories = tuple((context.get('relevant_memories') or [])[:3]) if context else ()
+        return normalize_utterance(user_input), memories
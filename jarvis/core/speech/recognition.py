@@ -18,15 +18,29 @@ logger = logging.getLogger(__name__)
 class SpeechRecognizer:
     """Класс для распознавания речи"""
     
-    def __init__(self, config):
+    def __init__(self, config, lazy=False):
+        """
+        Args:
+            config: Конфигурация
+            lazy: Не загружать модель Vosk в конструкторе (загрузка - через load())
+        """
         self.config = config
         self.sample_rate = 16000
         self.audio_queue = queue.Queue()
         self.model = None
         self.recognizer = None
         
+        if not lazy:
+            self._initialize_model()
+    
+    def load(self):
+        """Загрузка модели (для фонового потока)"""
         self._initialize_model()
     
+    def is_ready(self):
+        """Загружена ли модель"""
+        return self.model is not None
+    
     def _initialize_model(self):
         """Инициализация модели Vosk"""
         model_path = Path("models/vosk-model-ru")
@@ -38,9 +52,10 @@ class SpeechRecognizer:
             raise FileNotFoundError("Модель Vosk не найдена")
         
         logger.info(f"Загрузка модели из {model_path}")
-        self.model = vosk.Model(str(model_path))
-        self.recognizer = vosk.KaldiRecognizer(self.model, self.sample_rate)
+        model = vosk.Model(str(model_path))
+        self.recognizer = vosk.KaldiRecognizer(model, self.sample_rate)
         self.recognizer.SetWords(True)
+        self.model = model
         logger.info("Модель загружена успешно")
     
     def _audio_callback(self, indata, frames, time, status):
@@ -87,7 +102,8 @@ class SpeechRecognizer:
                         return None
                     
                     try:
-                        data = self.audio_queue.get(timeout=0.1)
+                        # Без блокировки: цикл событий обслуживает память и TTS
+                        data = self.audio_queue.get_nowait()
                         
                         # Определение уровня звука
                         audio_level = np.frombuffer(data, dtype=np.int16).astype(np.float32)
@@ -129,19 +145,16 @@ class SpeechRecognizer:
         Returns:
             str: Распознанный текст
         """
-        if not audio_data:
+        if not audio_data or self.model is None:
             return ""
         
         try:
-            # Сброс распознавателя
-            self.recognizer = vosk.KaldiRecognizer(self.model, self.sample_rate)
-            self.recognizer.SetWords(True)
-            
-            # Обработка аудио
-            if self.recognizer.AcceptWaveform(audio_data):
-                result = json.loads(self.recognizer.Result())
-            else:
-                result = json.loads(self.recognizer.FinalResult())
+            # Декодирование Vosk выполняется в executor, не блокируя цикл событий
+            result = await asyncio.get_event_loop().run_in_executor(
+                None,
+                self._recognize_sync,
+                audio_data
+            )
             
             text = result.get('text', '')
             
@@ -155,6 +168,17 @@ class SpeechRecognizer:
             logger.error(f"Ошибка распознавания: {e}")
             return ""
     
+    def _recognize_sync(self, audio_data):
+        """Синхронное распознавание (вызывается в отдельном потоке)"""
+        # Сброс распознавателя
+        self.recognizer = vosk.KaldiRecognizer(self.model, self.sample_rate)
+        self.recognizer.SetWords(True)
+        
+        # Обработка аудио
+        if self.recognizer.AcceptWaveform(audio_data):
+            return json.loads(self.recognizer.Result())
+        return json.loads(self.recognizer.FinalResult())
+    
     async def recognize_file(self, audio_file_path):
         """
         Распознавание речи из аудиофайла
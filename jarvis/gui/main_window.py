@@ -581,44 +581,14 @@ class JarvisGUIExtended:
             if not self.jarvis or not hasattr(self.jarvis, 'memory_system'):
                 return
             
-            memory = self.jarvis.memory_system
-            all_data = memory.collection.get()
+            # Счётчики ведутся системой памяти, база не сканируется
+            stats = self.jarvis.memory_system.stats()
             
-            total = len(all_data['ids'])
-            self.memory_details['total_records'] = total
-            
-            # Подсчет по типам и источникам
-            by_type = {}
-            by_source = {}
-            recent = []
-            
-            for i, metadata in enumerate(all_data['metadatas']):
-                mem_type = metadata.get('type', 'unknown')
-                by_type[mem_type] = by_type.get(mem_type, 0) + 1
-                
-                source = metadata.get('source', 'unknown')
-                by_source[source] = by_source.get(source, 0) + 1
-                
-                if i >= total - 10:  # Последние 10
-                    recent.append({
-                        'id': all_data['ids'][i],
-                        'content': all_data['documents'][i],
-                        'metadata': metadata
-                    })
-            
-            self.memory_details['by_type'] = by_type
-            self.memory_details['by_source'] = by_source
-            self.memory_details['recent_records'] = recent
-            
-            # Размер БД
-            db_path = self.memory_details['db_path']
-            if os.path.exists(db_path):
-                total_size = sum(
-                    os.path.getsize(os.path.join(root, file))
-                    for root, dirs, files in os.walk(db_path)
-                    for file in files
-                )
-                self.memory_details['db_size_mb'] = total_size / (1024 * 1024)
+            self.memory_details['total_records'] = stats['total']
+            self.memory_details['by_type'] = stats['by_type']
+            self.memory_details['by_source'] = stats['by_source']
+            self.memory_details['recent_records'] = stats['recent']
+            self.memory_details['db_size_mb'] = stats['db_size_mb']
             
             # Обновление GUI
             self._update_memory_display()
@@ -732,7 +702,7 @@ class JarvisGUIExtended:
     def _get_speed_delay(self):
         """Получение задержки для текущей скорости"""
         speeds = {'slow': 300, 'normal': 60, 'fast': 10, 'turbo': 1}
-        if self.jarvis and hasattr(self.jarvis, 'continuous_learning'):
+        if self.jarvis and getattr(self.jarvis, 'continuous_learning', None):
             speed = self.jarvis.continuous_learning.learning_speed
             return speeds.get(speed, 60)
         return 60
@@ -741,12 +711,12 @@ class JarvisGUIExtended:
         """Обновление реальных данных из JARVIS"""
         try:
             if hasattr(self.jarvis, 'memory_system'):
-                real_memory = len(self.jarvis.memory_system.collection.get()['ids'])
+                real_memory = self.jarvis.memory_system.stats()['total']
                 if real_memory != self.stats['memory_items']:
                     self.stats['memory_items'] = real_memory
                     self.stats_queue.put({'memory_items': real_memory})
             
-            if hasattr(self.jarvis, 'continuous_learning'):
+            if getattr(self.jarvis, 'continuous_learning', None):
                 cl_stats = self.jarvis.continuous_learning.stats
                 self.stats['articles_learned'] = cl_stats.get('articles_processed', 0)
                 self.stats['uptime'] = cl_stats.get('uptime_hours', 0)
@@ -820,7 +790,7 @@ class JarvisGUIExtended:
     
     def _change_learning_speed(self, speed):
         """Изменение скорости обучения"""
-        if self.jarvis and hasattr(self.jarvis, 'continuous_learning'):
+        if self.jarvis and getattr(self.jarvis, 'continuous_learning', None):
             self.jarvis.continuous_learning.change_speed(speed.lower())
             self.log_queue.put(f">> Скорость обучения изменена на: {speed}")
         else:
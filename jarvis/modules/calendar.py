@@ -11,6 +11,8 @@ import uuid
 from dataclasses import dataclass, asdict
 from typing import Optional
 
+from jarvis.utils.persistence import save_json_later
+
 logger = logging.getLogger(__name__)
 
 
@@ -49,9 +51,8 @@ class CalendarManager:
                 self.events = [CalendarEvent(**event) for event in data]
     
     def _save_events(self):
-        """Сохранение событий"""
-        with open(self.events_file, 'w', encoding='utf-8') as f:
-            json.dump([asdict(event) for event in self.events], f, ensure_ascii=False, indent=2)
+        """Сохранение событий (отложенная атомарная запись)"""
+        save_json_later(self.events_file, lambda: [asdict(event) for event in self.events])
     
     async def handle_command(self, user_input, entities):
         """Обработка команд календаря"""
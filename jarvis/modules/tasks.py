@@ -14,6 +14,8 @@ import schedule
 import time
 import threading
 
+from jarvis.utils.persistence import save_json_later
+
 logger = logging.getLogger(__name__)
 
 
@@ -79,14 +81,12 @@ class TaskManager:
             logger.info(f"Загружено напоминаний: {len(self.reminders)}")
     
     def _save_tasks(self):
-        """Сохранение задач в файл"""
-        with open(self.tasks_file, 'w', encoding='utf-8') as f:
-            json.dump([asdict(task) for task in self.tasks], f, ensure_ascii=False, indent=2)
+        """Сохранение задач в файл (отложенная атомарная запись)"""
+        save_json_later(self.tasks_file, lambda: [asdict(task) for task in self.tasks])
     
     def _save_reminders(self):
-        """Сохранение напоминаний в файл"""
-        with open(self.reminders_file, 'w', encoding='utf-8') as f:
-            json.dump([asdict(reminder) for reminder in self.reminders], f, ensure_ascii=False, indent=2)
+        """Сохранение напоминаний в файл (отложенная атомарная запись)"""
+        save_json_later(self.reminders_file, lambda: [asdict(reminder) for reminder in self.reminders])
     
     async def handle_command(self, user_input, entities):
         """
@@ -142,8 +142,8 @@ class TaskManager:
             self.tasks.append(task)
             self._save_tasks()
             
-            # Сохранение в память
-            await self.memory.store_memory(
+            # Сохранение в память (через очередь пакетной записи)
+            await self.memory.ingest_async(
                 f"Задача: {task.title}",
                 memory_type="task",
                 metadata={
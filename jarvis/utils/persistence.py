@@ -0,0 +1,225 @@
+"""
+Отложенное атомарное сохранение JSON-файлов
+Изменения только помечают файл «грязным», запись выполняется фоновым
+потоком после паузы в изменениях (несколько изменений подряд - одна запись).
+Файл пишется во временный и заменяется через os.replace
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def write_json_atomic(path, data, compact=True):
+    """
+    Атомарная запись JSON: временный файл, fsync, os.replace
+
+    Args:
+        path: Путь к файлу
+        data: Данные для сериализации
+        compact: Без отступов и пробелов
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        if compact:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        else:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+
+
+class DebouncedJsonWriter:
+    """Фоновая запись JSON-файлов с объединением частых изменений"""
+
+    # Попыток сериализации подряд, если данные меняются во время записи
+    SERIALIZE_ATTEMPTS = 3
+
+    def __init__(self, delay=1.0, max_delay=5.0):
+        """
+        Args:
+            delay: Пауза в изменениях файла, после которой он записывается (сек)
+            max_delay: Максимальная задержка записи при непрерывных изменениях (сек)
+        """
+        self.delay = delay
+        self.max_delay = max_delay
+
+        # Путь -> [функция получения данных, время первого и последнего изменения]
+        self._dirty = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+        self.stats = {'marked': 0, 'written': 0, 'errors': 0}
+
+    def mark_dirty(self, path, producer):
+        """
+        Пометка файла для записи (O(1), без сериализации)
+
+        Args:
+            path: Путь к файлу
+            producer: Функция без аргументов, возвращающая данные на момент записи
+        """
+        path = Path(path)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._dirty.get(path)
+            if entry is None:
+                self._dirty[path] = [producer, now, now]
+            else:
+                entry[0] = producer
+                entry[2] = now
+            self.stats['marked'] += 1
+
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                self._ensure_thread()
+                self._wakeup.notify()
+
+        # После закрытия фонового потока нет - пишем сразу
+        if closed:
+            self.flush(path)
+
+    def pending(self):
+        """Количество файлов, ожидающих записи"""
+        with self._lock:
+            return len(self._dirty)
+
+    def flush(self, path=None):
+        """
+        Немедленная запись «грязных» файлов
+
+        Args:
+            path: Только этот файл (None - все)
+
+        Returns:
+            bool: True, если всё записано без ошибок
+        """
+        with self._lock:
+            if path is None:
+                entries = list(self._dirty.items())
+                self._dirty.clear()
+            else:
+                path = Path(path)
+                entry = self._dirty.pop(path, None)
+                entries = [(path, entry)] if entry else []
+
+        return self._write(entries)
+
+    def close(self):
+        """Запись всего несохранённого и остановка фонового потока"""
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join(timeout=10)
+
+        return self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="json-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+
+                now = time.monotonic()
+                due = []
+                wait = None
+                for path, (_, first, last) in self._dirty.items():
+                    deadline = min(last + self.delay, first + self.max_delay)
+                    if deadline <= now:
+                        due.append(path)
+                    else:
+                        wait = deadline - now if wait is None else min(wait, deadline - now)
+
+                entries = [(path, self._dirty.pop(path)) for path in due]
+
+                if not entries:
+                    self._wakeup.wait(timeout=wait)
+                    continue
+
+            self._write(entries)
+
+    def _write(self, entries):
+        ok = True
+        retry = []
+        with self._write_lock:
+            for path, (producer, _, _) in entries:
+                for attempt in range(1, self.SERIALIZE_ATTEMPTS + 1):
+                    try:
+                        write_json_atomic(path, producer())
+                        self.stats['written'] += 1
+                        break
+                    except RuntimeError as e:
+                        # Данные изменились во время сериализации - повтор сразу,
+                        # затем при следующей записи
+                        logger.debug(f"Повтор записи {path} ({attempt}): {e}")
+                        if attempt == self.SERIALIZE_ATTEMPTS:
+                            retry.append((path, producer))
+                            ok = False
+                    except Exception as e:
+                        logger.error(f"Ошибка сохранения {path}: {e}")
+                        self.stats['errors'] += 1
+                        ok = False
+                        break
+
+        # Не через mark_dirty: после close() он пишет сразу и снова зашёл бы сюда
+        if retry:
+            now = time.monotonic()
+            with self._lock:
+                for path, producer in retry:
+                    # Более свежая пометка уже в очереди
+                    self._dirty.setdefault(path, [producer, now, now])
+                if not self._closed:
+                    self._ensure_thread()
+                    self._wakeup.notify()
+        return ok
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Общий экземпляр DebouncedJsonWriter (сбрасывается на диск при выходе)"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = DebouncedJsonWriter()
+            atexit.register(_writer.close)
+        return _writer
+
+
+def save_json_later(path, producer):
+    """Отложенное сохранение через общий экземпляр"""
+    get_writer().mark_dirty(path, producer)
+
+
+def flush_all():
+    """Запись всех отложенных файлов общего экземпляра"""
+    if _writer is None:
+        return True
+    return _writer.flush()
@@ -0,0 +1,146 @@
+"""
+Фоновая загрузка тяжёлых компонентов с отслеживанием готовности
+Каждый компонент грузится в своём потоке, остальные части работают без ожидания
+"""
+
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class _Component:
+    """Состояние одного компонента"""
+
+    def __init__(self, name):
+        self.name = name
+        self.state = PENDING
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.event = threading.Event()
+
+    def seconds(self):
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+
+class Readiness:
+    """Реестр компонентов и их готовности"""
+
+    def __init__(self):
+        self.created_at = time.monotonic()
+        self._components = {}
+        self._lock = threading.Lock()
+
+    def _component(self, name):
+        with self._lock:
+            if name not in self._components:
+                self._components[name] = _Component(name)
+            return self._components[name]
+
+    def start(self, name, loader, after=None):
+        """
+        Запуск загрузки компонента в фоновом потоке
+
+        Args:
+            name: Имя компонента
+            loader: Функция загрузки (исключение - компонент недоступен)
+            after: Имена компонентов, которые должны загрузиться раньше
+                   (если один из них не загрузился, компонент тоже не загружается)
+        """
+        component = self._component(name)
+        dependencies = [self._component(dep) for dep in (after or [])]
+
+        def run():
+            for dependency in dependencies:
+                dependency.event.wait()
+
+            failed = [dependency.name for dependency in dependencies if dependency.state != READY]
+            if failed:
+                component.state = FAILED
+                component.error = f"не загружены зависимости: {', '.join(failed)}"
+                logger.error(f"Компонент {name} пропущен: {component.error}")
+                component.event.set()
+                return
+
+            component.state = LOADING
+            component.started_at = time.monotonic()
+            logger.info(f"Загрузка компонента: {name}")
+
+            try:
+                loader()
+                component.state = READY
+                component.finished_at = time.monotonic()
+                logger.info(f"Компонент {name} готов за {component.seconds():.1f} с")
+            except Exception as e:
+                component.state = FAILED
+                component.error = str(e)
+                component.finished_at = time.monotonic()
+                logger.error(f"Компонент {name} не загружен: {e}")
+            finally:
+                component.event.set()
+
+        threading.Thread(target=run, name=f"load-{name}", daemon=True).start()
+
+    def mark_ready(self, name):
+        """Отметка компонента, загруженного синхронно"""
+        component = self._component(name)
+        component.state = READY
+        component.started_at = component.finished_at = time.monotonic()
+        component.event.set()
+
+    def is_ready(self, name):
+        """Готов ли компонент"""
+        return self._component(name).state == READY
+
+    def wait(self, name, timeout=None):
+        """
+        Ожидание завершения загрузки (в потоке)
+
+        Returns:
+            bool: True, если компонент готов
+        """
+        component = self._component(name)
+        component.event.wait(timeout)
+        return component.state == READY
+
+    async def wait_async(self, name, timeout=None):
+        """
+        Ожидание завершения загрузки из корутины
+
+        Returns:
+            bool: True, если компонент готов
+        """
+        component = self._component(name)
+        if not component.event.is_set():
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, component.event.wait, timeout)
+        return component.state == READY
+
+    def status(self):
+        """Состояние всех компонентов"""
+        with self._lock:
+            components = list(self._components.values())
+
+        return {
+            component.name: {
+                'state': component.state,
+                'seconds': round(component.seconds(), 2),
+                'error': component.error,
+            }
+            for component in components
+        }
+
+    def since_start(self):
+        """Секунды с создания реестра (для метрики времени до первого ответа)"""
+        return time.monotonic() - self.created_at
@@ -0,0 +1,66 @@
+"""
+Нарезка потокового текста на предложения
+Используется для озвучивания ответа LLM по мере генерации
+"""
+
+import re
+
+# Конец предложения: знак препинания (с закрывающей кавычкой/скобкой) и пробел,
+# либо перевод строки
+_SENTENCE_END = re.compile(r'(?<=[.!?…])["»)\]]?\s+|\n+')
+
+
+def split_at_stop(text, stops):
+    """
+    Отделение текста, который точно не является началом стоп-строки
+
+    Args:
+        text: Накопленный текст
+        stops: Стоп-строки (например, "Пользователь:")
+
+    Returns:
+        tuple: (безопасная часть, найдена ли стоп-строка). Хвост, совпадающий
+               с началом стоп-строки, придерживается до следующего фрагмента
+    """
+    positions = [text.find(stop) for stop in stops if stop in text]
+    if positions:
+        return text[:min(positions)], True
+
+    hold = 0
+    for stop in stops:
+        for size in range(min(len(stop) - 1, len(text)), 0, -1):
+            if text.endswith(stop[:size]):
+                hold = max(hold, size)
+                break
+    return text[:len(text) - hold], False
+
+
+async def iter_sentences(fragments, min_chars=12):
+    """
+    Предложения из асинхронного потока фрагментов текста
+
+    Args:
+        fragments: Асинхронный итератор строк (токены/слова от генератора)
+        min_chars: Минимальная длина предложения (короткие склеиваются со следующим)
+
+    Yields:
+        str: Законченные предложения; остаток - после окончания потока
+    """
+    buffer = ""
+    async for fragment in fragments:
+        if not fragment:
+            continue
+        buffer += fragment
+
+        while True:
+            match = next((m for m in _SENTENCE_END.finditer(buffer) if m.start() >= min_chars), None)
+            if match is None:
+                break
+            sentence = buffer[:match.end()].strip()
+            buffer = buffer[match.end():]
+            if sentence:
+                yield sentence
+
+    tail = buffer.strip()
+    if tail:
+        yield tail
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Скорость бэкендов эмбеддингов на CPU (предложений в секунду)
+
+Запуск:
+    python scripts/benchmark_embedders.py --sentences 2000 --threads 4
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jarvis.core.memory.embedders import DEFAULT_MODEL, create_embedding_model, embedding_label
+
+SAMPLE = [
+    "Какие задачи у меня на сегодня?",
+    "Машинное обучение - раздел искусственного интеллекта, изучающий методы построения алгоритмов.",
+    "Напомни позвонить маме в семь вечера",
+    "Python поддерживает несколько парадигм программирования, включая объектно-ориентированную.",
+    "Квантовый компьютер использует кубиты, которые могут находиться в суперпозиции состояний.",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение бэкендов эмбеддингов")
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--sentences', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=None)
+    args = parser.parse_args()
+
+    texts = [f"{SAMPLE[i % len(SAMPLE)]} ({i})" for i in range(args.sentences)]
+    specs = [
+        {'name': args.model, 'backend': 'sentence-transformers', 'device': 'cpu'},
+        {'name': args.model, 'backend': 'torch-int8', 'threads': args.threads},
+        {'name': args.model, 'backend': 'onnx', 'quantize': False, 'threads': args.threads},
+        {'name': args.model, 'backend': 'onnx', 'quantize': True, 'threads': args.threads},
+    ]
+
+    reference = None
+    print(f"{'бэкенд':<45}{'предл/с':>10}{'мин. косинус':>15}")
+
+    for spec in specs:
+        try:
+            model = create_embedding_model(spec)
+        except Exception as e:
+            print(f"{embedding_label(spec):<45}{'недоступен':>10}  {e}")
+            continue
+
+        model.encode(texts[:args.batch_size], batch_size=args.batch_size)  # прогрев
+
+        started = time.perf_counter()
+        vectors = model.encode(texts, batch_size=args.batch_size, normalize_embeddings=True)
+        elapsed = time.perf_counter() - started
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if reference is None:
+            reference = vectors
+        min_cosine = float((reference * vectors).sum(axis=1).min())
+
+        print(f"{embedding_label(spec):<45}{len(texts) / elapsed:>10.1f}{min_cosine:>15.4f}")
+
+
+if __name__ == '__main__':
+    main()
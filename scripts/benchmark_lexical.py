@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Задержка лексического поиска личных записей в зависимости от размера базы знаний
+
+Строит LexicalIndex с фиксированным числом личных задач и растущим числом
+статей knowledge (с частыми словами вроде "на") и замеряет запрос
+get_daily_context ("задачи на <дата>") с фильтром по типу task.
+Задержка не должна расти вместе с базой знаний.
+
+Запуск:
+    python scripts/benchmark_lexical.py --tasks 2000 --sizes 0 10000 100000 --queries 200
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jarvis.core.memory.lexical import LexicalIndex
+
+WORDS = ["история", "наука", "город", "река", "война", "музыка", "язык", "закон", "море", "звезда"]
+
+
+def build_index(path, tasks, knowledge, seed=0):
+    """Индекс с tasks личными задачами и knowledge статьями"""
+    rng = random.Random(seed)
+    index = LexicalIndex(path=path)
+
+    index.add(
+        [f"task_{i}" for i in range(tasks)],
+        [f"Задачи на 2024-05-{i % 28 + 1:02d}: {rng.choice(WORDS)} {i}" for i in range(tasks)],
+        [{'type': 'task'}] * tasks
+    )
+
+    page = 5000
+    for start in range(0, knowledge, page):
+        count = min(page, knowledge - start)
+        index.add(
+            [f"knowledge_{start + i}" for i in range(count)],
+            [
+                f"Статья {start + i} на тему {rng.choice(WORDS)}: {' '.join(rng.choices(WORDS, k=20))} на"
+                for i in range(count)
+            ],
+            [{'type': 'knowledge'}] * count
+        )
+    return index
+
+
+def measure(index, queries, n_results=10):
+    """Средняя и максимальная задержка запроса (мс)"""
+    timings = []
+    for i in range(queries):
+        query = f"задачи на 2024-05-{i % 28 + 1:02d}"
+        started = time.perf_counter()
+        index.search(query, n_results=n_results, memory_type='task')
+        timings.append(time.perf_counter() - started)
+    return sum(timings) / len(timings) * 1000, max(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка поиска личных записей при росте базы знаний")
+    parser.add_argument('--tasks', type=int, default=2000, help="Число личных задач")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[0, 10000, 100000],
+                        help="Размеры базы знаний")
+    parser.add_argument('--queries', type=int, default=200, help="Запросов на замер")
+    args = parser.parse_args()
+
+    print(f"Личных задач: {args.tasks}, запросов: {args.queries}")
+    print(f"{'knowledge':>12}{'сред. мс':>12}{'макс. мс':>12}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            index = build_index(Path(tmp) / "lexical.pkl", args.tasks, size)
+            avg_ms, max_ms = measure(index, args.queries)
+            print(f"{size:>12}{avg_ms:>12.3f}{max_ms:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Оценка квантованного хранения эмбеддингов (float16 / int8)
+
+Берёт эмбеддинги из базы памяти (или синтетические, если база пуста),
+откладывает часть записей как запросы и сравнивает top-k по
+квантованным векторам с точным поиском по float32.
+
+Размеры - только шарда знаний: дисковый кэш эмбеддингов выученные знания
+не сохраняет (memory.embedding_cache.disk_learned = false). С disk_learned = true
+к каждому вектору добавляется float32-копия в data/cache/embeddings,
+и экономия на диске пропадает.
+
+Запуск:
+    python scripts/benchmark_quantized.py --limit 50000 --queries 500 --k 10
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jarvis.core.memory.quantized import QUANTIZATION_MODES, evaluate_recall
+
+
+def load_vectors(db_path, limit, page_size=5000):
+    """Эмбеддинги из ChromaDB (пустой массив, если базы нет)"""
+    try:
+        import chromadb
+        from chromadb.config import Settings
+    except ImportError:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    if not Path(db_path).exists():
+        return np.zeros((0, 0), dtype=np.float32)
+
+    client = chromadb.PersistentClient(path=str(db_path), settings=Settings(anonymized_telemetry=False))
+    collection = client.get_or_create_collection(name="jarvis_memory", metadata={"hnsw:space": "cosine"})
+
+    vectors = []
+    offset = 0
+    while offset < limit:
+        page = collection.get(limit=min(page_size, limit - offset), offset=offset, include=["embeddings"])
+        if not len(page['ids']):
+            break
+        vectors.extend(page['embeddings'])
+        offset += len(page['ids'])
+
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Потеря качества поиска при квантовании эмбеддингов")
+    parser.add_argument('--db', default='data/memory_db', help="Папка ChromaDB")
+    parser.add_argument('--limit', type=int, default=50000, help="Сколько векторов взять из базы")
+    parser.add_argument('--queries', type=int, default=500, help="Сколько векторов отложить как запросы")
+    parser.add_argument('--k', type=int, default=10, help="Глубина сравнения top-k")
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.db, args.limit)
+    source = "база памяти"
+    if len(vectors) <= args.queries:
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((20000 + args.queries, 384)).astype(np.float32)
+        source = "синтетические векторы"
+
+    rng = np.random.default_rng(1)
+    order = rng.permutation(len(vectors))
+    queries = vectors[order[:args.queries]]
+    base = vectors[order[args.queries:]]
+
+    print(f"Источник: {source}, база: {len(base)} x {base.shape[1]}, запросов: {len(queries)}")
+    print(f"{'режим':<10}{'recall@' + str(args.k):>12}{'МБ float32':>14}{'МБ сжатые':>14}{'сжатие':>10}{'сек':>8}")
+
+    for mode in QUANTIZATION_MODES:
+        started = time.perf_counter()
+        result = evaluate_recall(base, queries, mode, k=args.k)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{mode:<10}{result['recall_at_k']:>12.4f}"
+            f"{result['float32_bytes'] / 2**20:>14.1f}{result['quantized_bytes'] / 2**20:>14.1f}"
+            f"{result['compression']:>9.2f}x{elapsed:>8.2f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
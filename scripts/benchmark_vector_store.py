@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Сравнение векторных хранилищ: встроенное NumPy + SQLite и ChromaDB (HNSW)
+
+Заполняет оба хранилища одними и теми же синтетическими векторами во
+временной папке и измеряет скорость записи, задержку поиска и recall@k
+относительно точного поиска.
+
+Запуск:
+    python scripts/benchmark_vector_store.py --count 50000 --queries 200 --k 10
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jarvis.core.memory.vector_store import ChromaVectorStore, NumpyVectorStore
+
+
+def exact_top_k(base, queries, k):
+    """Точный top-k по косинусу"""
+    base = base / np.linalg.norm(base, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = queries @ base.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def measure(name, store, base, queries, truth, k, batch_size):
+    """Запись и поиск в одном хранилище"""
+    types = ['knowledge', 'fact', 'conversation']
+
+    started = time.perf_counter()
+    for start in range(0, len(base), batch_size):
+        end = min(start + batch_size, len(base))
+        store.add(
+            [f"v{i}" for i in range(start, end)],
+            [f"документ {i}" for i in range(start, end)],
+            [{'type': types[i % len(types)]} for i in range(start, end)],
+            base[start:end]
+        )
+    insert_seconds = time.perf_counter() - started
+
+    latencies = []
+    overlap = 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        result = store.query(query[None, :], n_results=k)
+        latencies.append(time.perf_counter() - started)
+        found = {int(memory_id[1:]) for memory_id in result['ids'][0]}
+        overlap += len(found & set(expected.tolist()))
+
+    started = time.perf_counter()
+    for query in queries[:50]:
+        store.query(query[None, :], n_results=k, where={'type': 'fact'})
+    filtered_ms = (time.perf_counter() - started) / min(50, len(queries)) * 1000
+
+    latencies = np.asarray(latencies) * 1000
+    print(
+        f"{name:<10}{len(base) / insert_seconds:>12.0f}"
+        f"{np.percentile(latencies, 50):>10.2f}{np.percentile(latencies, 95):>10.2f}"
+        f"{filtered_ms:>12.2f}{overlap / (len(queries) * k):>10.4f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NumPy + SQLite против ChromaDB")
+    parser.add_argument('--count', type=int, default=50000, help="Размер базы")
+    parser.add_argument('--dim', type=int, default=384, help="Размерность векторов")
+    parser.add_argument('--queries', type=int, default=200, help="Количество запросов")
+    parser.add_argument('--k', type=int, default=10, help="Глубина top-k")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Размер батча записи")
+    parser.add_argument('--dtype', default='float32', help="Тип хранения для NumPy")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    base = rng.standard_normal((args.count, args.dim)).astype(np.float32)
+    queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    truth = exact_top_k(base, queries, args.k)
+
+    workdir = Path(tempfile.mkdtemp(prefix="jarvis_vector_bench_"))
+    print(f"База: {args.count} x {args.dim}, запросов: {args.queries}, папка: {workdir}")
+    print(f"{'хранилище':<10}{'записей/с':>12}{'p50 мс':>10}{'p95 мс':>10}{'фильтр мс':>12}{'recall':>10}")
+
+    try:
+        started = time.perf_counter()
+        numpy_store = NumpyVectorStore(workdir / "numpy", dtype=args.dtype)
+        print(f"  (старт NumPy: {time.perf_counter() - started:.3f} с)")
+        measure("numpy", numpy_store, base, queries, truth, args.k, args.batch_size)
+        numpy_store.close()
+
+        try:
+            started = time.perf_counter()
+            chroma_store = ChromaVectorStore(workdir / "chroma", name="benchmark")
+            print(f"  (старт ChromaDB: {time.perf_counter() - started:.3f} с)")
+        except ImportError:
+            print("chromadb не установлен - сравнение пропущено")
+        else:
+            measure("chroma", chroma_store, base, queries, truth, args.k, args.batch_size)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты чанкера текста под окно модели эмбеддингов
+"""
+
+from jarvis.core.memory.chunker import TextChunker, estimate_tokens, join_documents
+
+
+def _words(text):
+    return len(text.split())
+
+
+def test_chunks_follow_sentence_boundaries_and_budget():
+    chunker = TextChunker(max_tokens=12, overlap_tokens=0, count_tokens=_words)
+    text = "Один два три. Четыре пять шесть семь. Восемь девять! Десять одиннадцать двенадцать тринадцать?"
+
+    chunks = chunker.split(text)
+
+    assert chunks == [
+        "Один два три. Четыре пять шесть семь. Восемь девять!",
+        "Десять одиннадцать двенадцать тринадцать?",
+    ]
+    assert all(_words(chunk) <= chunker.budget for chunk in chunks)
+
+
+def test_streaming_input_matches_whole_text_and_prefix_counts_in_budget():
+    chunker = TextChunker(max_tokens=10, overlap_tokens=0, count_tokens=_words)
+    documents = ["Первый документ короткий. Второе предложение тут.", "Другой документ. Конец."]
+    whole = chunker.split("\n\n".join(documents), prefix="тема: ")
+
+    # Документы приходят кусками, границы кусков - посреди слов
+    pieces = [fragment for document in join_documents(documents)
+              for fragment in (document[:7], document[7:])]
+    streamed = list(chunker.chunks(iter(pieces), prefix="тема: "))
+
+    assert streamed == whole
+    assert all(chunk.startswith("тема: ") and _words(chunk) <= chunker.budget for chunk in streamed)
+
+
+def test_overlap_repeats_trailing_sentences():
+    chunker = TextChunker(max_tokens=10, overlap_tokens=2, count_tokens=_words)
+
+    chunks = chunker.split("А б в г. Г д. Е ж з. И к.")
+
+    assert chunks == ["А б в г. Г д.", "Г д. Е ж з. И к."]
+
+
+def test_long_sentence_is_split_by_words_and_fills_current_chunk():
+    chunker = TextChunker(max_tokens=7, overlap_tokens=0, count_tokens=_words)
+
+    chunks = chunker.split("Коротко. " + " ".join(f"слово{i}" for i in range(12)) + ". Хвост.")
+
+    assert chunks[0].startswith("Коротко. слово0")
+    assert all(_words(chunk) <= chunker.budget for chunk in chunks)
+    assert " ".join(chunks).split() == ("Коротко. " + " ".join(f"слово{i}" for i in range(12)) + ". Хвост.").split()
+
+
+def test_estimate_and_model_window():
+    assert estimate_tokens("Машинное обучение.") > 3
+
+    class Tokenizer:
+        def tokenize(self, text):
+            return text.split()
+
+    class Model:
+        max_seq_length = 64
+        tokenizer = Tokenizer()
+
+    class Wrapper:
+        model = Model()
+
+    chunker = TextChunker.for_model(Wrapper(), max_chunks=1)
+    assert chunker.max_tokens == 64
+    assert chunker.count_tokens("a b c") == 3
+    assert len(list(chunker.chunks("Раз. " * 200))) == 1
+
+    assert TextChunker.for_model(None).max_tokens == 128
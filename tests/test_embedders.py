@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты бэкендов эмбеддингов: разбор конфига и совпадение векторов
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from jarvis.core.memory.embedders import create_embedding_model, embedding_label, parse_embedding_spec
+
+SENTENCES = [
+    "Какие задачи на сегодня?",
+    "Квентин Тарантино снял фильм Криминальное чтиво",
+    "Python - язык программирования",
+    "Напомни купить молоко вечером",
+]
+
+
+def test_spec_parsing_and_labels():
+    assert parse_embedding_spec("model-x")['backend'] == 'sentence-transformers'
+    assert embedding_label("model-x") == "model-x"
+    assert embedding_label({'name': 'model-x', 'backend': 'onnx'}) == "model-x@onnx-int8"
+    assert embedding_label({'name': 'model-x', 'backend': 'torch-int8'}) == "model-x@torch-int8"
+
+    with pytest.raises(ValueError):
+        parse_embedding_spec({'name': 'model-x', 'backend': 'tpu'})
+
+
+@pytest.mark.parametrize("spec, tolerance", [
+    ({'backend': 'onnx', 'quantize': False, 'threads': 2}, 0.999),
+    ({'backend': 'onnx', 'quantize': True, 'threads': 2}, 0.97),
+    ({'backend': 'torch-int8', 'threads': 2}, 0.97),
+])
+def test_backend_parity_with_sentence_transformers(tmp_path, spec, tolerance):
+    """Векторы оптимизированных бэкендов совпадают с эталоном по косинусу"""
+    pytest.importorskip("sentence_transformers")
+    if spec['backend'] == 'onnx':
+        pytest.importorskip("onnxruntime")
+
+    spec = dict(spec, name='paraphrase-multilingual-MiniLM-L12-v2', onnx_dir=str(tmp_path))
+    reference = create_embedding_model(spec['name'])
+    candidate = create_embedding_model(spec)
+
+    expected = reference.encode(SENTENCES, normalize_embeddings=True)
+    actual = candidate.encode(SENTENCES, normalize_embeddings=True)
+
+    assert actual.shape == expected.shape
+    cosines = (expected * actual).sum(axis=1)
+    assert cosines.min() >= tolerance
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты кэша эмбеддингов: LRU, дисковый уровень и перезагрузка
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from jarvis.core.memory.embedding_cache import CachedEmbedder, EmbeddingCache, make_cache_key
+
+
+class CountingModel:
+    """Детерминированная модель: вектор из длины текста, считает вызовы"""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, sentences, batch_size=32, normalize_embeddings=False, **kwargs):
+        self.encoded.extend(sentences)
+        return np.array([[len(text), 1.0, 0.0] for text in sentences], dtype=np.float32)
+
+
+def test_ram_lru_eviction(tmp_path):
+    cache = EmbeddingCache("model", cache_dir=tmp_path, max_ram_entries=2, disk_enabled=False)
+    cache.put_many(['a', 'b'], np.eye(2, dtype=np.float32))
+    cache.get_many(['a'])
+    cache.put_many(['c'], np.ones((1, 2), dtype=np.float32))
+
+    # 'b' - самый давний, вытеснен; 'a' был прочитан и остался
+    assert set(cache.get_many(['a', 'b', 'c'])) == {'a', 'c'}
+    assert cache.stats()['ram_entries'] == 2
+
+
+def test_cached_vector_is_a_copy_of_the_batch_row(tmp_path):
+    cache = EmbeddingCache("model", cache_dir=tmp_path, disk_enabled=False)
+    batch = np.ones((2, 3), dtype=np.float32)
+    cache.put_many(['a', 'b'], batch)
+
+    batch[:] = 0
+    assert cache.get_many(['a'])['a'].tolist() == [1.0, 1.0, 1.0]
+    assert cache.get_many(['a'])['a'].base is not batch
+
+
+def test_disk_tier_persists_across_reload(tmp_path):
+    cache = EmbeddingCache("model/x", cache_dir=tmp_path, max_ram_entries=1)
+    vectors = np.arange(12, dtype=np.float32).reshape(4, 3)
+    cache.put_many(['k0', 'k1', 'k2', 'k3'], vectors)
+    cache.close()
+
+    reloaded = EmbeddingCache("model/x", cache_dir=tmp_path, max_ram_entries=1)
+    found = reloaded.get_many(['k2', 'k0', 'missing'])
+
+    assert found['k2'].tolist() == vectors[2].tolist()
+    assert found['k0'].tolist() == vectors[0].tolist()
+    assert reloaded.stats()['disk_hits'] == 2
+    assert reloaded.stats()['misses'] == 1
+    assert reloaded.stats()['disk_entries'] == 4
+
+
+def test_cached_embedder_encodes_only_unique_misses(tmp_path):
+    model = CountingModel()
+    embedder = CachedEmbedder(model, "model", EmbeddingCache("model", cache_dir=tmp_path))
+
+    first = embedder.encode(["раз", "два", "раз"])
+    second = embedder.encode("два")
+
+    assert model.encoded == ["раз", "два"]
+    assert first.shape == (3, 3)
+    assert second.tolist() == first[1].tolist()
+    assert make_cache_key(" два ", "model") == make_cache_key("два", "model")
+
+
+def test_cached_embedder_honors_convert_to_tensor(tmp_path):
+    torch = pytest.importorskip("torch")
+    embedder = CachedEmbedder(CountingModel(), "model", EmbeddingCache("model", cache_dir=tmp_path))
+
+    assert isinstance(embedder.encode(["раз"], convert_to_tensor=True), torch.Tensor)
+
+
+def test_encode_can_skip_disk_tier(tmp_path):
+    cache = EmbeddingCache("model", cache_dir=tmp_path)
+    embedder = CachedEmbedder(CountingModel(), "model", cache)
+
+    embedder.encode(["знание"], cache_disk=False)
+    embedder.encode(["задача"])
+
+    assert cache.stats()['disk_entries'] == 1
+    assert cache.stats()['ram_entries'] == 2
+
+
+def test_index_outliving_vectors_is_truncated_on_disk(tmp_path):
+    cache = EmbeddingCache("model", cache_dir=tmp_path)
+    vectors = np.arange(6, dtype=np.float32).reshape(2, 3)
+    cache.put_many(['k0', 'k1'], vectors)
+    cache.close()
+
+    # Авария: ключи записаны, а файл векторов короче индекса
+    index_path = cache.cache_dir / "index.txt"
+    with open(index_path, 'a', encoding='ascii') as f:
+        f.write("lost\nhalf")
+    with open(cache.cache_dir / "vectors.f32", 'r+b') as f:
+        f.truncate(2 * 3 * 4)
+
+    recovered = EmbeddingCache("model", cache_dir=tmp_path)
+    assert index_path.read_text(encoding='ascii') == "k0\nk1\n"
+    recovered.put_many(['k2'], np.full((1, 3), 7, dtype=np.float32))
+    recovered.close()
+
+    reloaded = EmbeddingCache("model", cache_dir=tmp_path)
+    found = reloaded.get_many(['k0', 'k1', 'k2', 'lost'])
+    assert found['k0'].tolist() == vectors[0].tolist()
+    assert found['k1'].tolist() == vectors[1].tolist()
+    assert found['k2'].tolist() == [7.0, 7.0, 7.0]
+    assert 'lost' not in found
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты записи изученных тем бесконечного обучения
+"""
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("bs4")
+
+from jarvis.core.learning.infinite_learning import InfiniteLearningSystem
+from jarvis.core.memory.chunker import TextChunker
+
+CONTENT = "Сатурн - шестая планета от Солнца. У Сатурна есть кольца из льда и камней."
+
+
+class FakeWikipedia:
+    """Сборщик с одной готовой статьёй"""
+
+    def search_all_languages(self, topic, max_languages=10):
+        return [{'content': CONTENT, 'url': "https://ru.wikipedia.org/wiki/Сатурн", 'language': 'ru'}]
+
+
+class FakeMemory:
+    def text_chunker(self):
+        return TextChunker(max_tokens=16, overlap_tokens=0)
+
+
+class FakeTurbo:
+    """Turbo-система: запоминает переданные батчи"""
+
+    def __init__(self, memory_system=None):
+        self.memory_system = memory_system
+        self.embeddings = None
+        self.batches = []
+
+    def learn_batch(self, topics, category="mixed"):
+        self.batches.append(list(topics))
+        return {'processed': len(topics)}
+
+
+def _learn(tmp_path, monkeypatch, turbo):
+    monkeypatch.chdir(tmp_path)
+    system = InfiniteLearningSystem(turbo_system=turbo)
+    system.wiki_collector = FakeWikipedia()
+    assert system.learn_topic("Сатурн")
+    return system
+
+
+def test_topic_chunks_go_to_memory_writer(tmp_path, monkeypatch):
+    turbo = FakeTurbo(memory_system=FakeMemory())
+    _learn(tmp_path, monkeypatch, turbo)
+
+    assert turbo.batches == [list(FakeMemory().text_chunker().chunks(CONTENT, prefix="Сатурн: "))]
+
+
+def test_without_memory_nothing_is_encoded(tmp_path, monkeypatch):
+    turbo = FakeTurbo()
+    system = _learn(tmp_path, monkeypatch, turbo)
+
+    # Векторы некому сохранить - кодирования нет, тема сохранена на диск
+    assert turbo.batches == []
+    assert list(system.data_dir.glob("*.json"))
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты детерминированных id и дедупликации при записи
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from jarvis.core.memory.dedup import Deduplicator, make_memory_id
+from jarvis.core.memory.vector_store import NumpyVectorStore
+
+
+class CountingEncoder:
+    """Кодировщик со счётчиком закодированных текстов"""
+
+    def __init__(self):
+        self.encoded = 0
+
+    def __call__(self, texts):
+        self.encoded += len(texts)
+        return np.stack([
+            np.random.default_rng(sum(map(ord, text))).standard_normal(16).astype(np.float32)
+            for text in texts
+        ])
+
+
+def _batch(texts, topic="python"):
+    documents = list(texts)
+    metadatas = [{'type': 'knowledge', 'topic': topic, 'source': 'web_crawler'} for _ in documents]
+    return documents, metadatas
+
+
+def _write(store, dedup, encoder, documents, metadatas):
+    ids, documents, metadatas, embeddings = dedup.prepare(documents, metadatas, encoder)
+    if ids:
+        store.upsert(ids, documents, metadatas, embeddings)
+    return ids
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_relearning_costs_no_embedding_and_no_rows(tmp_path, enabled):
+    store = NumpyVectorStore(tmp_path / "store")
+    dedup = Deduplicator(store, enabled=enabled, threshold=0.999)
+    encoder = CountingEncoder()
+
+    first = _write(store, dedup, encoder, *_batch(["первый факт", "второй факт", "первый факт"]))
+    assert len(first) == 2
+    assert encoder.encoded == 2
+
+    again = _write(store, dedup, encoder, *_batch(["второй факт", "первый факт"]))
+    assert again == []
+    assert encoder.encoded == 2
+    assert store.count() == 2
+
+
+def test_ids_depend_on_content_topic_and_source():
+    base = {'type': 'knowledge', 'content_hash': 'abc', 'topic': 'python', 'source': 'web_crawler'}
+
+    assert make_memory_id(dict(base)) == make_memory_id(dict(base))
+    assert make_memory_id(base).startswith("knowledge_")
+    assert make_memory_id(base) != make_memory_id(dict(base, topic='java'))
+    assert make_memory_id(base) != make_memory_id(dict(base, content_hash='abd'))
+    assert make_memory_id(base) != make_memory_id(dict(base, source='rss'))
+
+
+class FixedEncoder:
+    """Кодировщик с заданными векторами: текст -> вектор"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.encoded = []
+
+    def __call__(self, texts):
+        self.encoded.extend(texts)
+        return np.stack([np.asarray(self.vectors[text], dtype=np.float32) for text in texts])
+
+
+def test_same_content_under_another_topic_is_an_exact_duplicate(tmp_path):
+    store = NumpyVectorStore(tmp_path / "store")
+    dedup = Deduplicator(store, threshold=0.999)
+    encoder = CountingEncoder()
+
+    assert len(_write(store, dedup, encoder, *_batch(["Python - язык"], topic="python"))) == 1
+    assert _write(store, dedup, encoder, *_batch(["  Python -   язык "], topic="languages")) == []
+
+    assert store.count() == 1
+    assert encoder.encoded == 1
+    stored = store.get(include=["metadatas"])['metadatas'][0]
+    assert stored['seen_count'] == 2
+    assert dedup.stats['exact_duplicates'] == 1
+
+
+def test_near_duplicates_are_dropped_in_batch_and_against_store(tmp_path):
+    store = NumpyVectorStore(tmp_path / "store")
+    dedup = Deduplicator(store, threshold=0.95)
+    encoder = FixedEncoder({
+        "Земля вращается вокруг Солнца": [1.0, 0.0, 0.0],
+        "Земля обращается вокруг Солнца": [0.99, 0.05, 0.0],
+        "Луна - спутник Земли": [0.0, 1.0, 0.0],
+        "Планета Земля вращается вокруг Солнца": [0.98, 0.0, 0.08],
+    })
+
+    first = _write(store, dedup, encoder, *_batch([
+        "Земля вращается вокруг Солнца", "Земля обращается вокруг Солнца", "Луна - спутник Земли",
+    ]))
+    assert len(first) == 2
+    assert dedup.stats['near_duplicates'] == 1
+
+    again = _write(store, dedup, encoder, *_batch(["Планета Земля вращается вокруг Солнца"]))
+    assert again == []
+    assert store.count() == 2
+    assert dedup.stats['near_duplicates'] == 2
+
+    metadatas = store.get(ids=[first[0]], include=["metadatas"])['metadatas']
+    assert metadatas[0]['seen_count'] == 3
+
+
+def test_personal_types_are_only_checked_for_exact_duplicates(tmp_path):
+    store = NumpyVectorStore(tmp_path / "store")
+    dedup = Deduplicator(store, threshold=0.95)
+    encoder = FixedEncoder({
+        "Встреча в 15:00": [1.0, 0.0],
+        "Встреча в 16:00": [1.0, 0.01],
+    })
+    documents = ["Встреча в 15:00", "Встреча в 16:00"]
+    metadatas = [{'type': 'event'} for _ in documents]
+
+    assert len(_write(store, dedup, encoder, documents, metadatas)) == 2
+    assert dedup.stats['near_duplicates'] == 0
+
+
+def test_same_content_of_another_type_is_kept(tmp_path):
+    store = NumpyVectorStore(tmp_path / "store")
+    dedup = Deduplicator(store, threshold=0.999)
+    encoder = CountingEncoder()
+
+    _write(store, dedup, encoder, ["Позвонить маме"], [{'type': 'task'}])
+    added = _write(store, dedup, encoder, ["Позвонить маме"], [{'type': 'conversation'}])
+
+    assert len(added) == 1
+    assert store.count() == 2
+
+
+def test_repeats_raise_importance_only_up_to_cap(tmp_path):
+    store = NumpyVectorStore(tmp_path / "store")
+    dedup = Deduplicator(store, threshold=0.999, repeat_importance_cap=0.6)
+    encoder = CountingEncoder()
+
+    _write(store, dedup, encoder, ["частый факт"], [{'type': 'knowledge', 'importance': 0.5}])
+    _write(store, dedup, encoder, ["частый факт"] * 10, [{'type': 'knowledge'} for _ in range(10)])
+
+    meta = store.get(include=["metadatas"])['metadatas'][0]
+    assert meta['seen_count'] == 11
+    assert meta['importance'] == pytest.approx(0.6)
+
+    # Заданная при записи важность выше предела не понижается
+    _write(store, dedup, encoder, ["важный факт"], [{'type': 'knowledge', 'importance': 0.9}])
+    _write(store, dedup, encoder, ["важный факт"], [{'type': 'knowledge'}])
+    important = store.get(where={'importance': {'$gte': 0.8}}, include=["metadatas"])['metadatas']
+    assert [m['importance'] for m in important] == [0.9]
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты пула эмбеддингов и поиска: тяжёлые вызовы не блокируют цикл событий
+"""
+
+import asyncio
+import threading
+import time
+
+from jarvis.core.memory.executor import MemoryExecutor
+
+
+class SlowEmbedder:
+    """Блокирующая модель: запоминает поток вызова"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.threads = []
+
+    def encode(self, texts, **kwargs):
+        self.threads.append(threading.current_thread().name)
+        time.sleep(self.delay)
+        return [len(text) for text in texts]
+
+
+def test_encode_runs_in_pool_and_loop_stays_responsive():
+    executor = MemoryExecutor(max_workers=2)
+    embedder = SlowEmbedder(delay=0.3)
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        task = asyncio.create_task(ticker())
+        result = await executor.encode(embedder, ["раз", "двадцать"], batch_size=8)
+        task.cancel()
+        return result
+
+    try:
+        assert asyncio.run(main()) == [3, 8]
+    finally:
+        executor.shutdown()
+
+    assert embedder.threads[0].startswith("memory-worker")
+    # Цикл событий продолжал работать, пока модель «кодировала»
+    assert len(ticks) >= 10
+
+
+def test_concurrency_is_bounded_by_max_workers():
+    executor = MemoryExecutor(max_workers=2)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def work(value):
+        with lock:
+            active.append(value)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(value)
+        return value * 2
+
+    async def main():
+        return await asyncio.gather(*(executor.run(work, i) for i in range(6)))
+
+    try:
+        assert asyncio.run(main()) == [0, 2, 4, 6, 8, 10]
+    finally:
+        executor.shutdown()
+
+    assert max(peak) == 2
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты горячего уровня памяти
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from jarvis.core.memory.hot_tier import HotTier
+
+
+def _unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_admission_search_and_type_filter():
+    tier = HotTier(capacity=10, threshold=0.9)
+    tier.add(
+        ['t1', 'k1', 'k2'],
+        ['задача', 'знание', 'важное знание'],
+        [{'type': 'task'}, {'type': 'knowledge', 'importance': 0.5},
+         {'type': 'knowledge', 'importance': 0.9}],
+        [_unit(1, 0, 0), _unit(0, 1, 0), _unit(0, 0, 1)]
+    )
+
+    # Обычное знание не попадает сразу, важное - попадает
+    assert len(tier) == 2
+
+    hits = tier.search(_unit(1, 0.1, 0), n_results=2)
+    assert hits[0][0] == 't1'
+    assert tier.is_confident(hits, 2)
+
+    assert [h[0] for h in tier.search(_unit(1, 0, 0), memory_type='knowledge')] == ['k2']
+    assert tier.search(_unit(1, 0, 0), memory_type='event') == []
+
+
+def test_promotion_after_repeated_cold_access_and_demotion():
+    tier = HotTier(capacity=2, promote_after=2, hot_types=[])
+    vectors = [_unit(1, 0), _unit(0, 1), _unit(1, 1)]
+    metas = [{'type': 'knowledge'}] * 3
+
+    tier.record_cold_access(['a'], ['A'], metas[:1], vectors[:1])
+    assert len(tier) == 0
+    tier.record_cold_access(['a'], ['A'], metas[:1], vectors[:1])
+    assert len(tier) == 1
+
+    tier.add(['b', 'c'], ['B', 'C'], metas[1:], vectors[1:], only_admitted=False)
+
+    # Вытесняется запись с наименьшим числом обращений, 'a' остаётся
+    assert len(tier) == 2
+    assert 'a' in tier._rows
+    assert tier.stats['demoted'] == 1
+
+    tier.remove(['a'])
+    assert len(tier) == 1
+
+
+def test_short_result_is_confident_only_when_type_is_fully_resident():
+    tier = HotTier(capacity=10, threshold=0.5)
+    tier.add(['t1'], ['задача'], [{'type': 'task'}], [_unit(1, 0)])
+    hits = tier.search(_unit(1, 0), n_results=5, memory_type='task')
+
+    assert tier.resident('task') == 1
+    assert tier.is_confident(hits, 5, 'task', stored=1)
+    # Часть задач лежит только в хранилище (вытеснены или не загружены)
+    assert not tier.is_confident(hits, 5, 'task', stored=3)
+    assert not tier.is_confident(hits, 5, 'task')
+
+
+def test_full_tier_demotes_a_batch_of_least_used_rows():
+    tier = HotTier(capacity=4, hot_types=[], demote_batch=2)
+    metas = [{'type': 'knowledge'}] * 4
+    tier.add(['a', 'b', 'c', 'd'], list('ABCD'), metas,
+             [_unit(1, 0), _unit(0, 1), _unit(1, 1), _unit(1, -1)], only_admitted=False)
+    tier.search(_unit(1, 0), n_results=1)
+    tier.search(_unit(0, 1), n_results=1)
+
+    tier.add(['e'], ['E'], metas[:1], [_unit(-1, 0)], only_admitted=False)
+
+    assert sorted(tier._rows) == ['a', 'b', 'e']
+    assert tier.stats['demoted'] == 2
+    assert all(tier._ids[row] == memory_id for memory_id, row in tier._rows.items())
+
+    # Место освободилось пачкой: следующее добавление без вытеснения
+    tier.add(['f'], ['F'], metas[:1], [_unit(-1, 1)], only_admitted=False)
+    assert tier.stats['demoted'] == 2
+    assert len(tier) == 4
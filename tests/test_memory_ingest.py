@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты очереди пакетной записи в память
+"""
+
+import threading
+
+from jarvis.core.memory.ingest import IngestQueue
+
+
+def test_flush_writes_everything_in_batches():
+    """flush() дожидается записи, элементы объединяются в батчи"""
+    batches = []
+    ingest = IngestQueue(batches.append, max_pending=1000, batch_size=50, flush_interval=5.0)
+
+    for i in range(120):
+        assert ingest.put(i)
+
+    assert ingest.flush(timeout=5)
+    written = [item for batch in batches for item in batch]
+    assert written == list(range(120))
+    assert max(len(batch) for batch in batches) <= 50
+    assert ingest.pending() == 0
+
+    ingest.close()
+
+
+def test_producers_from_many_threads():
+    """Элементы из нескольких потоков не теряются"""
+    batches = []
+    ingest = IngestQueue(batches.append, max_pending=16, batch_size=8, flush_interval=0.05)
+
+    def produce(offset):
+        for i in range(100):
+            ingest.put(offset + i)
+
+    threads = [threading.Thread(target=produce, args=(n * 1000,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert ingest.flush(timeout=5)
+    written = sorted(item for batch in batches for item in batch)
+    assert written == sorted(n * 1000 + i for n in range(4) for i in range(100))
+
+    ingest.close()
+
+
+def test_writer_error_does_not_stop_queue():
+    """Ошибка записи батча не останавливает поток-писатель"""
+    calls = []
+
+    def writer(batch):
+        calls.append(list(batch))
+        if len(calls) == 1:
+            raise RuntimeError("сбой базы")
+
+    ingest = IngestQueue(writer, batch_size=10, flush_interval=0.01)
+
+    ingest.put("a")
+    assert ingest.flush(timeout=5)
+    ingest.put("b")
+    assert ingest.flush(timeout=5)
+
+    assert ingest.stats['errors'] == 1
+    assert calls[-1] == ["b"]
+
+    ingest.close()
+
+
+def test_failed_batch_is_retried_then_reported_by_flush():
+    """Батч повторяется; если все повторы упали, flush() возвращает False"""
+    attempts = []
+    healthy = threading.Event()
+
+    def writer(batch):
+        attempts.append(list(batch))
+        if not healthy.is_set():
+            raise RuntimeError("база недоступна")
+
+    ingest = IngestQueue(writer, batch_size=10, flush_interval=0.01, max_retries=2, retry_delay=0.01)
+
+    ingest.put("a")
+    assert not ingest.flush(timeout=5)
+
+    stats = ingest.get_stats()
+    assert len(attempts) == 3
+    assert stats['retries'] == 2
+    assert stats['failed'] == 1
+    assert stats['written'] == 0
+
+    # После восстановления потерянные элементы ставятся повторно
+    healthy.set()
+    assert ingest.requeue_failed() == 1
+    assert ingest.flush(timeout=5)
+    assert attempts[-1] == ["a"]
+    assert ingest.get_stats()['written'] == 1
+
+    ingest.close()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты лексического индекса и слияния ранжирований
+"""
+
+from jarvis.core.memory.lexical import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+
+def _index(tmp_path):
+    index = LexicalIndex(path=tmp_path / "lexical.pkl")
+    index.add(
+        ['a', 'b', 'c'],
+        [
+            "Квентин Тарантино снял Криминальное чтиво",
+            "Кино и режиссёры девяностых",
+            "Купить молоко",
+        ],
+        [
+            {'type': 'knowledge'},
+            {'type': 'knowledge', 'url': 'https://example.com/kino'},
+            {'type': 'task', 'title': 'Покупки'},
+        ]
+    )
+    return index
+
+
+def test_tokenize_keeps_urls_and_folds_case():
+    assert tokenize("Смотри https://example.com/a?b=1 ЁЛКА") == ['смотри', 'https://example.com/a?b=1', 'елка']
+
+
+def test_bm25_ranks_exact_names_and_filters_type(tmp_path):
+    index = _index(tmp_path)
+
+    assert index.search("тарантино", n_results=3)[0][0] == 'a'
+    assert [doc_id for doc_id, _ in index.search("молоко", memory_type='knowledge')] == []
+    # URL из метаданных индексируется вместе с текстом
+    assert index.candidates_with_all_terms("https://example.com/kino") == ['b']
+
+
+def test_remove_and_snapshot_roundtrip(tmp_path):
+    index = _index(tmp_path)
+    index.remove(['a'])
+    assert index.search("тарантино") == []
+
+    index.ready = True
+    index.save()
+
+    restored = LexicalIndex(path=tmp_path / "lexical.pkl")
+    assert restored._load()
+    assert len(restored) == 2
+    assert restored.search("молоко")[0][0] == 'c'
+
+
+def test_reciprocal_rank_fusion_prefers_agreement():
+    fused = reciprocal_rank_fusion([['x', 'y', 'z'], ['y', 'w']])
+    assert fused[0] == 'y'
+    assert set(fused) == {'x', 'y', 'z', 'w'}
+
+
+def test_type_filter_only_touches_its_partition(tmp_path):
+    index = LexicalIndex(path=tmp_path / "lexical.pkl")
+    index.add(['t1', 't2'], ["Задачи на 2024-05-01", "Позвонить маме"], [{'type': 'task'}, {'type': 'task'}])
+    index.add(
+        [f"k{i}" for i in range(50)],
+        [f"Статья {i} на тему истории" for i in range(50)],
+        [{'type': 'knowledge'}] * 50
+    )
+
+    assert set(index.postings) == {'task', 'knowledge'}
+    assert set(index.postings['task']['на']) == {'t1'}
+    assert index.search("задачи на 2024-05-01", memory_type='task')[0][0] == 't1'
+
+    # С фильтром - тот же порядок, что у личных записей в общей выдаче
+    unfiltered = [doc_id for doc_id, _ in index.search("задачи на 2024-05-01", n_results=100)]
+    filtered = [doc_id for doc_id, _ in index.search("задачи на 2024-05-01", memory_type='task')]
+    assert filtered == [doc_id for doc_id in unfiltered if doc_id.startswith('t')]
+
+    assert index.candidates_with_all_terms("на тему", memory_type='task') == []
+    assert len(index.candidates_with_all_terms("на тему", memory_type='knowledge')) == 50
+
+
+def test_common_terms_are_skipped_next_to_rare_ones(tmp_path):
+    index = LexicalIndex(path=tmp_path / "lexical.pkl", max_df_ratio=0.5)
+    index.add(
+        [f"k{i}" for i in range(10)] + ['x'],
+        [f"на складе {i}" for i in range(10)] + ["на Марсе"],
+        [{'type': 'knowledge'}] * 11
+    )
+
+    # Только редкий термин: записи с одним "на" не попадают в выдачу
+    assert [doc_id for doc_id, _ in index.search("на марсе", n_results=20)] == ['x']
+    # Запрос только из частых терминов ищется как есть
+    assert len(index.search("на", n_results=20)) == 11
+
+
+def test_partitions_survive_snapshot(tmp_path):
+    index = _index(tmp_path)
+    index.ready = True
+    index.save()
+
+    restored = LexicalIndex(path=tmp_path / "lexical.pkl")
+    assert restored._load()
+    restored.add(['d'], ["Купить хлеб"], [{'type': 'task'}])
+    assert {doc_id for doc_id, _ in restored.search("купить", memory_type='task')} == {'c', 'd'}
+    assert restored.search("купить", memory_type='knowledge') == []
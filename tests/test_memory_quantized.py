@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты квантованного хранилища эмбеддингов
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from jarvis.core.memory.quantized import QuantizedStore, evaluate_recall
+from jarvis.core.memory.vector_store import ChainedCollection, _where_to_sql
+
+
+def _vectors(count, dim=32, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+
+
+@pytest.mark.parametrize("mode", ["float16", "int8"])
+def test_store_query_filter_and_delete(tmp_path, mode):
+    store = QuantizedStore(tmp_path / "store", mode=mode)
+    vectors = _vectors(50)
+    ids = [f"k{i}" for i in range(50)]
+    metas = [{'type': 'knowledge' if i % 2 else 'deep_knowledge', 'importance': 0.5} for i in range(50)]
+    store.add(ids, [f"doc {i}" for i in range(50)], metas, vectors)
+
+    result = store.query(vectors[7:8], n_results=3)
+    assert result['ids'][0][0] == 'k7'
+    assert result['distances'][0][0] < 0.01
+
+    filtered = store.query(vectors[7:8], n_results=3, where={'type': 'deep_knowledge'})
+    assert all(int(i[1:]) % 2 == 0 for i in filtered['ids'][0])
+
+    store.delete(['k7'])
+    assert store.count() == 49
+    assert 'k7' not in store.query(vectors[7:8], n_results=3)['ids'][0]
+
+    # Повторное открытие читает те же данные
+    store.close()
+    reopened = QuantizedStore(tmp_path / "store", mode=mode)
+    assert reopened.count() == 49
+    assert reopened.get(where={'type': 'knowledge'}, limit=2)['ids'] == ['k1', 'k3']
+
+
+def test_quantization_keeps_recall_and_shrinks():
+    vectors = _vectors(2000, dim=64)
+    queries = _vectors(50, dim=64, seed=1)
+
+    for mode, min_compression in (("float16", 2.0), ("int8", 3.5)):
+        result = evaluate_recall(vectors, queries, mode, k=10)
+        assert result['recall_at_k'] > 0.9
+        assert result['compression'] >= min_compression
+
+
+def test_where_translation():
+    sql, params = _where_to_sql({"$and": [{"epoch": {"$lt": 10}}, {"type": {"$in": ["a", "b"]}}]})
+    assert sql == "(epoch < ? AND type IN (?, ?))"
+    assert params == [10, "a", "b"]
+
+    # Поля без столбца читаются из JSON
+    sql, params = _where_to_sql({"topic": "python"})
+    assert sql == "json_extract(metadata, ?) = ?"
+    assert params == ["$.topic", "python"]
+
+
+def test_chained_get_pages_across_collections(tmp_path):
+    first = QuantizedStore(tmp_path / "a", mode='int8')
+    second = QuantizedStore(tmp_path / "b", mode='int8')
+    first.add(['a0', 'a1', 'a2'], ['x'] * 3, [{'type': 't'}] * 3, _vectors(3))
+    second.add(['b0', 'b1'], ['y'] * 2, [{'type': 't'}] * 2, _vectors(2, seed=2))
+
+    chained = ChainedCollection(first, second)
+    pages = [chained.get(limit=2, offset=offset, where={'type': 't'})['ids'] for offset in (0, 2, 4)]
+
+    assert pages == [['a0', 'a1'], ['a2', 'b0'], ['b1']]
+    assert chained.count() == 5
+    assert chained.count_matching(where={'type': 't'}) == 5
+    assert chained.count_matching(ids=['a1', 'b1', 'zz']) == 2
+
+
+def test_chained_offset_uses_counts_not_id_lists(tmp_path, monkeypatch):
+    first = QuantizedStore(tmp_path / "a", mode='int8')
+    second = QuantizedStore(tmp_path / "b", mode='int8')
+    first.add(['a0', 'a1', 'a2'], ['x'] * 3, [{'type': 't'}] * 3, _vectors(3))
+    second.add(['b0', 'b1'], ['y'] * 2, [{'type': 't'}] * 2, _vectors(2, seed=2))
+
+    calls = []
+    original = QuantizedStore.get
+
+    def spy(self, *args, **kwargs):
+        calls.append(kwargs.get('limit'))
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(QuantizedStore, 'get', spy)
+
+    page = ChainedCollection(first, second).get(limit=2, offset=4, where={'type': 't'})
+    assert page['ids'] == ['b1']
+    # Только постраничные выборки, без выборки всех id под фильтр
+    assert None not in calls
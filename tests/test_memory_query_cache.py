@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты кэша результатов поиска
+"""
+
+from jarvis.core.memory.query_cache import QueryCache
+
+
+def test_normalized_queries_share_entry():
+    cache = QueryCache()
+    key = QueryCache.make_key("Какие задачи?", "task", 5)
+    cache.put(key, [{'content': 'купить молоко'}], cache.generation("task"))
+
+    assert cache.get(QueryCache.make_key("  какие   задачи ", "task", 5)) == [{'content': 'купить молоко'}]
+    assert cache.get(QueryCache.make_key("какие задачи", "task", 3)) is None
+    assert cache.snapshot()['hit_rate'] == 0.5
+
+
+def test_invalidation_by_type_and_global():
+    cache = QueryCache()
+    task_key = QueryCache.make_key("задачи", "task", 5)
+    event_key = QueryCache.make_key("события", "event", 5)
+    any_key = QueryCache.make_key("всё", None, 5)
+    for key in (task_key, event_key, any_key):
+        cache.put(key, ['x'], cache.generation(key[1]))
+
+    cache.invalidate(["task"])
+
+    assert cache.get(task_key) is None
+    assert cache.get(event_key) == ['x']
+    # Запросы без фильтра зависят от любых записей
+    assert cache.get(any_key) is None
+
+
+def test_write_during_search_makes_result_stale():
+    cache = QueryCache()
+    key = QueryCache.make_key("задачи", "task", 5)
+    generation = cache.generation("task")
+    cache.invalidate(["task"])
+    cache.put(key, ['old'], generation)
+
+    assert cache.get(key) is None
+
+
+def test_ttl_and_lru_bounds(monkeypatch):
+    cache = QueryCache(max_entries=2, ttl=10)
+    now = [100.0]
+    monkeypatch.setattr("jarvis.core.memory.query_cache.time.monotonic", lambda: now[0])
+
+    for text in ("a", "b", "c"):
+        cache.put(QueryCache.make_key(text, None, 5), [text], 0)
+
+    assert cache.get(QueryCache.make_key("a", None, 5)) is None
+    assert cache.get(QueryCache.make_key("c", None, 5)) == ['c']
+
+    now[0] += 11
+    assert cache.get(QueryCache.make_key("c", None, 5)) is None
+    assert cache.stats['expired'] == 1
+
+
+def test_background_additions_keep_unfiltered_entries():
+    cache = QueryCache(background_types=["knowledge"])
+    any_key = QueryCache.make_key("всё", None, 5)
+    knowledge_key = QueryCache.make_key("сатурн", "knowledge", 5)
+    for key in (any_key, knowledge_key):
+        cache.put(key, ['x'], cache.generation(key[1]))
+
+    cache.invalidate(["knowledge"], added=True)
+
+    # Запрос без фильтра доживает до TTL, запрос по типу знаний сброшен
+    assert cache.get(any_key) == ['x']
+    assert cache.get(knowledge_key) is None
+
+    # Удаление знаний и запись персональных типов сбрасывают запросы без фильтра
+    cache.invalidate(["knowledge"])
+    assert cache.get(any_key) is None
+
+    cache.put(any_key, ['y'], cache.generation(None))
+    cache.invalidate(["knowledge", "conversation"], added=True)
+    assert cache.get(any_key) is None
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты постраничной очистки старых воспоминаний
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from jarvis.core.memory.retention import RetentionSweeper
+from jarvis.core.memory.vector_store import NumpyVectorStore
+
+
+def _store(tmp_path, records):
+    store = NumpyVectorStore(tmp_path / "store")
+    ids = [memory_id for memory_id, _ in records]
+    metadatas = [meta for _, meta in records]
+    embeddings = np.eye(len(ids), 8, dtype=np.float32)
+    store.upsert(ids, [f"запись {memory_id}" for memory_id in ids], metadatas, embeddings)
+    return store
+
+
+def test_backfill_adds_epoch_and_sweep_keeps_recent_and_important(tmp_path):
+    now = datetime.now()
+    old = (now - timedelta(days=400)).isoformat()
+    recent = (now - timedelta(days=1)).isoformat()
+    store = _store(tmp_path, [
+        ("old", {'type': 'conversation', 'timestamp': old}),
+        ("old_important", {'type': 'fact', 'timestamp': old, 'importance': 0.9}),
+        ("recent", {'type': 'conversation', 'timestamp': recent}),
+        ("broken", {'type': 'conversation', 'timestamp': 'вчера'}),
+    ])
+    deleted_pages = []
+    sweeper = RetentionSweeper(
+        store, state_path=tmp_path / "state.json", page_size=1,
+        on_delete=lambda ids, metas: deleted_pages.append(ids)
+    )
+
+    cutoff = (now - timedelta(days=365)).timestamp()
+    result = sweeper.run(cutoff, max_importance=0.7)
+
+    assert result == {'backfilled': 4, 'deleted': 2}
+    assert sorted(store.get()['ids']) == ["old_important", "recent"]
+    assert sorted(sum(deleted_pages, [])) == ["broken", "old"]
+    assert all(len(page) == 1 for page in deleted_pages)
+    assert sweeper.state['last_sweep']['deleted'] == 2
+
+
+def test_backfill_resumes_from_saved_offset_and_runs_once(tmp_path):
+    timestamp = datetime.now().isoformat()
+    store = _store(tmp_path, [(f"m{i}", {'type': 'fact', 'timestamp': timestamp}) for i in range(5)])
+    state_path = tmp_path / "state.json"
+
+    sweeper = RetentionSweeper(store, state_path=state_path, page_size=2)
+    sweeper.state['backfill_offset'] = 2
+    assert sweeper.backfill() == 3
+
+    # Прогресс сохранён на диск: повторный запуск миграцию не повторяет
+    assert RetentionSweeper(store, state_path=state_path).backfill() == 0
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты разделения памяти на персональный шард и шард знаний
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from jarvis.core.memory.sharding import ShardedStore, types_in_filter
+from jarvis.core.memory.vector_store import NumpyVectorStore
+
+
+def _vectors(count, dim=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+
+
+def test_types_in_filter():
+    assert types_in_filter(None) is None
+    assert types_in_filter({'type': 'task'}) == {'task'}
+    assert types_in_filter({'type': {'$in': ['task', 'event']}}) == {'task', 'event'}
+    assert types_in_filter({'$and': [{'epoch': {'$lt': 5}}, {'type': 'knowledge'}]}) == {'knowledge'}
+    assert types_in_filter({'epoch': {'$lt': 5}}) is None
+
+
+def test_writes_and_queries_are_routed(tmp_path):
+    personal = NumpyVectorStore(tmp_path / "personal")
+    learned = NumpyVectorStore(tmp_path / "learned")
+    store = ShardedStore(personal, learned)
+    store.migrated = True
+
+    vectors = _vectors(6)
+    types = ['task', 'knowledge', 'event', 'knowledge', 'preference', 'continuous_learning']
+    store.upsert([f"m{i}" for i in range(6)], [f"d{i}" for i in range(6)],
+                 [{'type': t} for t in types], vectors)
+
+    assert personal.count() == 3
+    assert learned.count() == 3
+
+    assert store.query(vectors[1:2], n_results=1, where={'type': 'task'})['ids'] == [['m0']]
+    assert store.query(vectors[1:2], n_results=1)['ids'] == [['m1']]
+    assert store.stats == {'routed': 1, 'fanned_out': 1, 'migrated': 0}
+
+
+def test_migration_moves_learned_rows(tmp_path):
+    personal = NumpyVectorStore(tmp_path / "personal")
+    learned = NumpyVectorStore(tmp_path / "learned")
+    vectors = _vectors(4)
+    personal.add(['a', 'b', 'c', 'd'], ['x'] * 4,
+                 [{'type': 'knowledge'}, {'type': 'task'}, {'type': 'deep_knowledge'}, {'type': 'event'}], vectors)
+
+    store = ShardedStore(personal, learned)
+    assert store.shards_for({'type': 'knowledge'}) == [personal, learned]
+
+    store.migrate(page_size=1)
+    store._migration_thread.join(timeout=5)
+
+    assert store.migrated
+    assert sorted(learned.get()['ids']) == ['a', 'c']
+    assert sorted(personal.get()['ids']) == ['b', 'd']
+    assert store.shards_for({'type': 'knowledge'}) == [learned]
+    assert store.query(vectors[2:3], n_results=1, where={'type': 'deep_knowledge'})['ids'] == [['c']]
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты инкрементальной статистики памяти
+"""
+
+from jarvis.core.memory.stats import MemoryStats
+
+
+class FakeCollection:
+    """Коллекция с постраничным get по метаданным"""
+
+    def __init__(self, metadatas):
+        self.metadatas = metadatas
+
+    def count(self):
+        return len(self.metadatas)
+
+    def get(self, limit=None, offset=0, include=None):
+        page = self.metadatas[offset:offset + limit]
+        return {'ids': [f"id_{offset + i}" for i in range(len(page))], 'metadatas': page}
+
+
+def test_counters_follow_adds_and_removes(tmp_path):
+    """Счётчики и буфер последних записей обновляются без скана базы"""
+    stats = MemoryStats(tmp_path / "db", snapshot_path=tmp_path / "stats.json", recent_size=3)
+
+    metas = [{'type': 'knowledge', 'source': 'web_crawler'} for _ in range(4)] + [{'type': 'task'}]
+    stats.record_added([f"id_{i}" for i in range(5)], [f"doc {i}" for i in range(5)], metas)
+    stats.record_removed([{'type': 'task'}])
+
+    snapshot = stats.snapshot()
+    assert snapshot['total'] == 4
+    assert snapshot['by_type'] == {'knowledge': 4}
+    assert snapshot['by_source'] == {'web_crawler': 4}
+    assert [r['id'] for r in snapshot['recent']] == ['id_2', 'id_3', 'id_4']
+
+
+def test_bootstrap_rebuilds_then_uses_snapshot(tmp_path):
+    """Без снимка - пересчёт страницами, при совпадении количества - снимок"""
+    collection = FakeCollection([{'type': 'fact', 'source': 'user'}] * 7)
+
+    stats = MemoryStats(tmp_path / "db", snapshot_path=tmp_path / "stats.json")
+    stats.bootstrap(collection, page_size=3)
+    stats._rebuild_thread.join(timeout=5)
+
+    assert stats.ready
+    assert stats.snapshot()['by_type'] == {'fact': 7}
+
+    restored = MemoryStats(tmp_path / "db", snapshot_path=tmp_path / "stats.json")
+    restored.bootstrap(collection)
+
+    assert restored.ready
+    assert restored._rebuild_thread is None
+    assert restored.total == 7
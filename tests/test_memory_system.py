@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты MemorySystem на встроенном хранилище NumPy
+"""
+
+import asyncio
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from jarvis.core.memory.embedding_cache import CachedEmbedder, EmbeddingCache
+from jarvis.core.memory.system import MemorySystem
+from jarvis.core.memory.vector_store import NumpyVectorStore
+from jarvis.utils.persistence import flush_all
+
+
+class HashEmbedder:
+    """Детерминированные эмбеддинги по тексту, со счётчиком вызовов"""
+
+    max_seq_length = 128
+
+    def __init__(self, dim=16):
+        self.dim = dim
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        self.calls.append(list(texts))
+        vectors = np.stack([
+            np.random.default_rng(sum(map(ord, text))).standard_normal(self.dim).astype(np.float32)
+            for text in texts
+        ]) if texts else np.zeros((0, self.dim), dtype=np.float32)
+        return vectors[0] if single else vectors
+
+
+def _wait_background(memory):
+    if memory._bootstrap_thread is not None:
+        memory._bootstrap_thread.join(timeout=10)
+    for component in (memory.memory_stats, memory.lexical_index, memory.hot_tier):
+        for name in ('_rebuild_thread', '_bootstrap_thread'):
+            thread = getattr(component, name, None)
+            if thread is not None:
+                thread.join(timeout=10)
+
+
+def _config(tmp_path, **memory_config):
+    config = {
+        'vector_store': {'backend': 'numpy', 'path': str(tmp_path / "vector_store")},
+        'ingest': {'flush_interval': 0.05},
+    }
+    config.update(memory_config)
+    return {'memory': config}
+
+
+@pytest.fixture
+def make_memory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    embedder = HashEmbedder()
+    monkeypatch.setattr(MemorySystem, '_create_embedder', lambda self: embedder)
+    systems = []
+
+    def make(**memory_config):
+        system = MemorySystem(_config(tmp_path, **memory_config))
+        systems.append(system)
+        _wait_background(system)
+        return system
+
+    yield make
+
+    for system in systems:
+        system.ingest_queue.close()
+        system.executor.shutdown(wait=True)
+        system.memory_store.close()
+    # Отложенные записи JSON - до возврата в исходный каталог
+    flush_all()
+
+
+@pytest.fixture
+def memory(make_memory):
+    return make_memory()
+
+
+def test_ingest_batch_updates_store_and_derived_indexes(memory):
+    vector = np.ones(16, dtype=np.float32)
+    imported = memory.ingest_batch([
+        {'content': "Любимый цвет - синий", 'memory_type': 'preference',
+         'metadata': {'type': 'preference', 'importance': 0.9}, 'id': "pref_1", 'embedding': vector},
+        {'content': "Сатурн - шестая планета", 'memory_type': 'knowledge', 'metadata': {'topic': 'космос'}},
+    ])
+
+    assert imported == 2
+    assert memory.memory_store.count() == 2
+    assert memory.memory_stats.total == 2
+    assert memory.memory_stats.by_type['preference'] == 1
+    assert memory.memory_stats.by_type['knowledge'] == 1
+    assert len(memory.lexical_index) == 2
+    assert [memory_id for memory_id, _, _ in memory.hot_tier.search(vector, n_results=1)] == ["pref_1"]
+
+    # Повторный импорт той же записи заменяет её, а не удваивает счётчики
+    memory.ingest_batch([
+        {'content': "Любимый цвет - зелёный", 'metadata': {'type': 'preference'},
+         'id': "pref_1", 'embedding': vector},
+    ])
+    assert memory.memory_store.count() == 2
+    assert memory.memory_stats.total == 2
+    assert memory.memory_stats.by_type['preference'] == 1
+    assert memory.lexical_index.search("зелёный")
+    assert not memory.lexical_index.search("синий")
+
+
+def _seed(memory):
+    memory.ingest_batch([
+        {'content': "Купить молоко", 'memory_type': 'task'},
+        {'content': "Позвонить маме", 'memory_type': 'task'},
+        {'content': "Встреча с командой в 15:00", 'memory_type': 'event'},
+        {'content': "Сатурн - шестая планета", 'memory_type': 'knowledge'},
+    ])
+    memory.embedder.calls.clear()
+
+
+def test_recall_many_encodes_once_and_filters_per_query(memory):
+    _seed(memory)
+
+    tasks, events, anything = asyncio.run(memory.recall_many(
+        ["купить молоко", "встреча", "сатурн"], filters=["task", "event", None], n_results=3
+    ))
+
+    assert memory.embedder.calls == [["купить молоко", "встреча", "сатурн"]]
+    assert {m['metadata']['type'] for m in tasks} == {'task'}
+    assert tasks[0]['content'] == "Купить молоко"
+    assert [m['content'] for m in events] == ["Встреча с командой в 15:00"]
+    assert anything[0]['content'] == "Сатурн - шестая планета"
+
+    # Повтор тех же запросов - из кэша, без кодирования
+    asyncio.run(memory.recall_many(["купить молоко", "встреча"], filters=["task", "event"], n_results=3))
+    assert len(memory.embedder.calls) == 1
+
+    with pytest.raises(ValueError):
+        asyncio.run(memory.recall_many(["a", "b"], filters=["task"]))
+
+
+def test_daily_context_is_one_batched_recall(memory):
+    _seed(memory)
+
+    context = asyncio.run(memory.get_daily_context())
+
+    assert len(memory.embedder.calls) == 1
+    assert len(memory.embedder.calls[0]) == 2
+    assert sorted(context['pending_tasks']) == ["Купить молоко", "Позвонить маме"]
+    assert context['scheduled_events'] == ["Встреча с командой в 15:00"]
+
+
+def test_indexes_are_built_after_shard_migration(tmp_path, make_memory):
+    # База до разделения на шарды: знания лежат вместе с персональными записями
+    legacy = NumpyVectorStore(tmp_path / "vector_store")
+    count = 40
+    types = ['knowledge' if i % 2 else 'task' for i in range(count)]
+    legacy.add([f"m{i}" for i in range(count)], [f"запись {i}" for i in range(count)],
+               [{'type': memory_type} for memory_type in types],
+               np.random.default_rng(0).standard_normal((count, 16)).astype(np.float32))
+    legacy.close()
+
+    memory = make_memory(sharding={'migration_page_size': 3})
+
+    assert memory.memory_store.migrated
+    assert memory.memory_store.learned.count() == count // 2
+    assert memory.memory_stats.total == count
+    assert memory.memory_stats.by_type['knowledge'] == count // 2
+    assert len(memory.lexical_index) == count
+    assert memory.hot_tier.resident('task') == count // 2
+
+
+def test_learned_writes_skip_disk_embedding_cache(tmp_path, memory):
+    cache = EmbeddingCache("hash", cache_dir=tmp_path / "embeddings")
+    memory.embedder = CachedEmbedder(memory.embedder, "hash", cache)
+
+    memory.ingest_batch([
+        {'content': "Купить молоко", 'memory_type': 'task'},
+        {'content': "Сатурн - шестая планета", 'memory_type': 'knowledge'},
+        {'content': "Юпитер - пятая планета", 'memory_type': 'knowledge'},
+    ])
+
+    # Знания - только в RAM: шард хранит их сам, float32-копия на диске не нужна
+    assert cache.stats()['disk_entries'] == 1
+    assert cache.stats()['ram_entries'] == 3
+    assert memory.memory_store.count() == 3
+    assert memory.lexical_index.search("юпитер")
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты потокового экспорта/импорта памяти
+"""
+
+import json
+
+from jarvis.core.memory import transfer
+from jarvis.core.memory.chunker import TextChunker
+
+
+class FakeCollection:
+    """Минимальная коллекция с постраничным get и upsert"""
+
+    def __init__(self, records=None):
+        self.records = records or []
+
+    def get(self, limit=None, offset=0, include=None):
+        page = self.records[offset:offset + limit]
+        result = {
+            'ids': [r['id'] for r in page],
+            'documents': [r['document'] for r in page],
+            'metadatas': [r['metadata'] for r in page],
+        }
+        if include and 'embeddings' in include:
+            result['embeddings'] = [r['embedding'] for r in page]
+        return result
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        for values in zip(ids, documents, metadatas, embeddings):
+            self.records.append(dict(zip(('id', 'document', 'metadata', 'embedding'), values)))
+
+
+class FakeMemory:
+    """Заглушка MemorySystem: пишет батчи в список"""
+
+    def __init__(self):
+        self.collection = FakeCollection()
+        self.written = []
+
+    def text_chunker(self):
+        return TextChunker(max_tokens=14, overlap_tokens=0)
+
+    def ingest_batch(self, records):
+        encoded = [r for r in records if r.get('embedding') is not None]
+        if encoded:
+            self.collection.upsert(
+                [r['id'] for r in encoded],
+                [r['content'] for r in encoded],
+                [r['metadata'] for r in encoded],
+                [r['embedding'] for r in encoded],
+            )
+        self.written.extend(r for r in records if r.get('embedding') is None)
+        return len(records)
+
+
+def _make_records(count):
+    return [
+        {
+            'id': f"knowledge_{i}",
+            'document': f"Тема {i}: содержание",
+            'metadata': {'type': 'knowledge', 'importance': 0.5},
+            'embedding': [0.5, -1.25, float(i)],
+        }
+        for i in range(count)
+    ]
+
+
+def test_export_import_roundtrip_with_embeddings(tmp_path):
+    """Экспорт с эмбеддингами импортируется без перекодирования"""
+    source = FakeCollection(_make_records(25))
+    path = tmp_path / "export.ndjson.gz"
+
+    exported = transfer.export_ndjson(source, path, include_embeddings=True, page_size=10,
+                                      user_profile={'name': 'сэр'})
+    assert exported == 25
+
+    memory = FakeMemory()
+    imported = transfer.import_ndjson(memory, path, batch_size=7)
+
+    assert imported == 25
+    assert memory.written == []
+    assert [r['id'] for r in memory.collection.records] == [f"knowledge_{i}" for i in range(25)]
+    assert memory.collection.records[3]['embedding'] == [0.5, -1.25, 3.0]
+    assert not (tmp_path / "export.ndjson.gz.progress").exists()
+
+
+def test_import_resumes_from_progress(tmp_path):
+    """Прерванный импорт продолжается с сохранённой строки"""
+    source = FakeCollection(_make_records(5))
+    path = tmp_path / "export.ndjson"
+    transfer.export_ndjson(source, path)
+
+    # Заголовок и две записи уже обработаны
+    (tmp_path / "export.ndjson.progress").write_text("3")
+
+    memory = FakeMemory()
+    imported = transfer.import_ndjson(memory, path)
+
+    assert imported == 3
+    assert [item['content'] for item in memory.written] == [f"Тема {i}: содержание" for i in (2, 3, 4)]
+
+
+def test_import_knowledge_dir(tmp_path):
+    """Темы из data/*_knowledge режутся на чанки и пишутся батчами"""
+    content = "Первый абзац про синтаксис.\n\nВторой абзац про типы данных."
+    (tmp_path / "Python.json").write_text(
+        json.dumps({'content': content, 'sources': []}, ensure_ascii=False),
+        encoding='utf-8'
+    )
+    (tmp_path / "knowledge_graph.json").write_text("{}", encoding='utf-8')
+
+    memory = FakeMemory()
+    imported = transfer.import_knowledge_dir(memory, tmp_path)
+
+    # Чанки - от общего чанкера памяти, с темой в префиксе
+    expected = list(memory.text_chunker().chunks(content, prefix="Python: "))
+    assert len(expected) == 2
+    assert imported == 2
+    assert [item['content'] for item in memory.written] == expected
+    assert all(item['memory_type'] == 'knowledge' for item in memory.written)
+
+
+def test_import_knowledge_dir_resumes_by_file_name(tmp_path):
+    """Файл, добавленный краулером перед сохранённой позицией, не пропускается"""
+    def write_topic(name):
+        (tmp_path / f"{name}.json").write_text(
+            json.dumps({'content': f"Коротко про {name}."}, ensure_ascii=False), encoding='utf-8'
+        )
+
+    for name in ("b", "d", "f"):
+        write_topic(name)
+
+    class FailingMemory(FakeMemory):
+        def ingest_batch(self, records):
+            if self.written:
+                raise RuntimeError("прервано")
+            return super().ingest_batch(records)
+
+    first = FailingMemory()
+    try:
+        transfer.import_knowledge_dir(first, tmp_path, batch_size=1)
+    except RuntimeError:
+        pass
+    assert [item['metadata']['topic'] for item in first.written] == ["b"]
+
+    write_topic("a")
+    second = FakeMemory()
+    transfer.import_knowledge_dir(second, tmp_path, batch_size=1)
+
+    assert [item['metadata']['topic'] for item in second.written] == ["a", "d", "f"]
+    assert not (tmp_path / "_import.progress").exists()
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты генерации NLPProcessor на крошечной случайной модели (без загрузки весов)
+"""
+
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from tokenizers import Tokenizer, decoders, models, pre_tokenizers
+from transformers import GPT2Config, GPT2LMHeadModel, PreTrainedTokenizerFast
+
+from jarvis.core.nlp import processor as processor_module
+from jarvis.core.nlp.processor import NLPProcessor, StopOnMarkers
+
+
+def make_tokenizer():
+    """Побайтовый токенизатор: любой текст кодируется без словаря модели"""
+    vocab = {char: index for index, char in enumerate(sorted(pre_tokenizers.ByteLevel.alphabet()))}
+    vocab["<eos>"] = len(vocab)
+    tokenizer = Tokenizer(models.BPE(vocab=vocab, merges=[]))
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False, use_regex=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    return PreTrainedTokenizerFast(tokenizer_object=tokenizer, eos_token="<eos>")
+
+
+def make_model(tokenizer):
+    torch.manual_seed(0)
+    eos = tokenizer.eos_token_id
+    config = GPT2Config(
+        vocab_size=len(tokenizer), n_positions=4096, n_embd=32, n_layer=2, n_head=2,
+        bos_token_id=eos, eos_token_id=eos, pad_token_id=eos
+    )
+    return GPT2LMHeadModel(config).eval()
+
+
+def encode(tokenizer, text):
+    return tokenizer(text, return_tensors="pt", add_special_tokens=False).input_ids
+
+
+def fake_generate(tokenizer, continuation, calls=None):
+    """generate, дописывающий к промпту заданный текст"""
+    def generate(input_ids, **kwargs):
+        if calls is not None:
+            calls.append(dict(kwargs, input_ids=input_ids))
+        sequences = torch.cat([input_ids, encode(tokenizer, continuation)], dim=-1)
+        return SimpleNamespace(sequences=sequences, scores=None)
+    return generate
+
+
+def write_personality(path, address):
+    path.write_text(json.dumps({'personality': {'address_user_as': address}}, ensure_ascii=False), encoding='utf-8')
+
+
+@pytest.fixture
+def personality_file(tmp_path, monkeypatch):
+    path = tmp_path / "personality.json"
+    write_personality(path, "сэр")
+    monkeypatch.setattr(processor_module, "PERSONALITY_FILE", path)
+    return path
+
+
+@pytest.fixture
+def processor(personality_file):
+    nlp = NLPProcessor({'nlp': {}}, lazy=True)
+    nlp.tokenizer = make_tokenizer()
+    nlp.model = make_model(nlp.tokenizer)
+    return nlp
+
+
+def test_prompt_kv_cache_is_reused_across_turns(processor):
+    first = processor._prepare_inputs("jarvis", processor._format_turn("Который час?"))
+    entry = processor._prefix_cache[('large', 'jarvis')]
+    prefix_length = entry['input_ids'].shape[-1]
+
+    second = processor._prepare_inputs("jarvis", processor._format_turn("Какая погода?"))
+
+    assert len(processor._prefix_cache) == 1
+    assert processor._prefix_cache[('large', 'jarvis')] is entry
+    assert torch.equal(second['input_ids'][:, :prefix_length], entry['input_ids'])
+    # Каждый ход получает свою копию: generate дописывает в неё токены хода
+    assert second['past_key_values'] is not entry['past_key_values']
+    assert first['past_key_values'] is not second['past_key_values']
+
+    # Продолжение с кэша даёт те же логиты, что полный прогон промпта
+    input_ids = second['input_ids']
+    with torch.no_grad():
+        cached = processor.model(
+            input_ids=input_ids[:, prefix_length:], past_key_values=second['past_key_values'], use_cache=True
+        ).logits[0, -1]
+        full = processor.model(input_ids=input_ids).logits[0, -1]
+    assert torch.allclose(cached, full, atol=1e-4)
+    assert entry['past_key_values'].get_seq_length() == prefix_length
+
+
+def test_generate_continues_from_cached_prefix(processor):
+    processor._generate("Который час?", None, "jarvis", "conversation", "large")
+    entry = processor._prefix_cache[('large', 'jarvis')]
+
+    calls = []
+    generate = processor.model.generate
+
+    def spy(**kwargs):
+        calls.append(kwargs)
+        return generate(**kwargs)
+
+    processor.model.generate = spy
+    processor._generate("Какая погода?", None, "jarvis", "conversation", "large")
+
+    assert processor._prefix_cache[('large', 'jarvis')] is entry
+    assert calls[0]['past_key_values'] is not entry['past_key_values']
+    assert entry['past_key_values'].get_seq_length() == entry['input_ids'].shape[-1]
+
+
+def test_prompt_kv_cache_is_rebuilt_when_personality_changes(processor, personality_file):
+    processor._prepare_inputs("jarvis", processor._format_turn("Привет"))
+    old_entry = processor._prefix_cache[('large', 'jarvis')]
+    processor.router.remember("Который час?", None, "Полдень, сэр")
+
+    write_personality(personality_file, "босс")
+    stat = personality_file.stat()
+    os.utime(personality_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    processor._prepare_inputs("jarvis", processor._format_turn("Привет"))
+    new_entry = processor._prefix_cache[('large', 'jarvis')]
+
+    assert new_entry is not old_entry
+    prompt = processor.tokenizer.decode(new_entry['input_ids'][0])
+    assert '"босс"' in prompt
+    assert processor.router.cached("Который час?") is None
+
+
+def test_prefix_cache_can_be_disabled(personality_file):
+    nlp = NLPProcessor({'nlp': {'prefix_cache': False}}, lazy=True)
+    nlp.tokenizer = make_tokenizer()
+    nlp.model = make_model(nlp.tokenizer)
+
+    inputs = nlp._prepare_inputs("jarvis", nlp._format_turn("Привет"))
+
+    assert 'past_key_values' not in inputs
+    assert inputs['input_ids'].shape == inputs['attention_mask'].shape
+
+
+def test_stop_markers_only_look_at_new_tokens():
+    tokenizer = make_tokenizer()
+    prompt = encode(tokenizer, "Пользователь: Привет\nДжарвис:")
+    criteria = StopOnMarkers(tokenizer, prompt.shape[-1], max_newlines=1)
+
+    def stops(text):
+        return bool(criteria(torch.cat([prompt, encode(tokenizer, text)], dim=-1), None)[0])
+
+    # Маркеры в промпте не останавливают генерацию
+    assert not stops(" Добрый день")
+    assert stops(" Добрый день, сэр.\nПользователь: а")
+    assert stops(" Да.Джарвис:")
+    # Ведущий перевод строки не считается, лимит - по переводам внутри ответа
+    assert not stops("\nДа.\nГотово")
+    assert stops("\nДа.\nГотово.\nЕщё")
+
+
+def test_generate_decodes_only_new_tokens_and_cuts_next_turn(processor):
+    calls = []
+    processor.model.generate = fake_generate(processor.tokenizer, "  Полдень, сэр.\nПользователь: а завтра?", calls)
+
+    response, confidence, truncated = processor._generate("Который час?", None, "jarvis", "conversation", "large")
+
+    assert response == "Полдень, сэр."
+    criteria = calls[0]['stopping_criteria'][0]
+    assert criteria.prompt_length == calls[0]['input_ids'].shape[-1]
+    assert criteria.max_newlines == processor._response_budget('conversation')['max_newlines']
+    assert confidence is None
+    assert not truncated
+
+
+def test_generate_reports_truncation_at_token_budget(processor):
+    budget = processor._response_budget('confirmation')['max_new_tokens']
+    processor.model.generate = fake_generate(processor.tokenizer, " " + "а" * budget)
+
+    response, _, truncated = processor._generate("Да", None, "jarvis", "confirmation", "large")
+
+    assert response.startswith("а")
+    assert truncated
+
+
+class FakeAutoModel:
+    """from_pretrained, возвращающий крошечную модель и запоминающий параметры"""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.calls = []
+
+    def from_pretrained(self, model_name, **kwargs):
+        self.calls.append(kwargs)
+        return make_model(self.tokenizer).to(kwargs.get('torch_dtype', torch.float32))
+
+
+@pytest.fixture
+def auto_model(monkeypatch):
+    fake = FakeAutoModel(make_tokenizer())
+    monkeypatch.setattr(processor_module, "AutoModelForCausalLM", fake)
+    threads = torch.get_num_threads()
+    yield fake
+    torch.set_num_threads(threads)
+
+
+def test_cpu_mode_selects_dtype_and_threads(processor, auto_model, monkeypatch):
+    monkeypatch.setattr(processor_module, "_bf16_supported", lambda: True)
+
+    model, mode = processor._load_cpu_model("tiny", {'mode': 'bf16', 'threads': 2})
+    assert mode == 'bf16'
+    assert auto_model.calls[-1]['torch_dtype'] == torch.bfloat16
+    assert next(model.parameters()).dtype == torch.bfloat16
+    assert not model.training
+    assert torch.get_num_threads() == 2
+
+    model, mode = processor._load_cpu_model("tiny", {'mode': 'fp32', 'threads': 1})
+    assert mode == 'fp32'
+    assert auto_model.calls[-1]['torch_dtype'] == torch.float32
+    assert torch.get_num_threads() == 1
+
+
+def test_bf16_falls_back_to_int8_without_hardware_support(processor, auto_model, monkeypatch):
+    monkeypatch.setattr(processor_module, "_bf16_supported", lambda: False)
+
+    model, mode = processor._load_cpu_model("tiny", {'mode': 'bf16', 'threads': 1})
+
+    assert mode == 'int8'
+    assert auto_model.calls[-1]['torch_dtype'] == torch.float32
+    # Linear-слои квантованы на месте
+    assert isinstance(model.lm_head, torch.ao.nn.quantized.dynamic.Linear)
+    assert processor._load_cpu_model("tiny", {'mode': 'fp8', 'threads': 1})[1] == 'int8'
+
+
+def test_bf16_needs_avx512_bf16_or_amx(monkeypatch):
+    monkeypatch.setattr(processor_module, "_cpu_flags", lambda: {'avx2', 'avx512f', 'avx512bw'})
+    assert not processor_module._bf16_supported()
+
+    monkeypatch.setattr(processor_module, "_cpu_flags", lambda: {'avx512f', 'avx512_bf16'})
+    assert processor_module._bf16_supported()
+
+    monkeypatch.setattr(processor_module, "_cpu_flags", lambda: {'amx_bf16', 'amx_tile'})
+    assert processor_module._bf16_supported()
+
+
+def test_warmup_generates_requested_tokens(processor):
+    calls = []
+    generate = processor.model.generate
+
+    def spy(**kwargs):
+        calls.append(kwargs)
+        return generate(**kwargs)
+
+    processor.model.generate = spy
+    speed = processor._warmup(processor.model, processor.tokenizer, {'warmup_tokens': 4})
+
+    assert speed > 0
+    assert calls[0]['max_new_tokens'] == calls[0]['min_new_tokens'] == 4
+    assert not calls[0]['do_sample']
+
+
+def test_warmup_failure_is_not_fatal(processor):
+    def broken(**kwargs):
+        raise RuntimeError("нет ядер")
+
+    processor.model.generate = broken
+    assert processor._warmup(processor.model, processor.tokenizer, {}) is None
+
+
+CHAT_TEMPLATE = (
+    "{% for message in messages %}<|{{ message['role'] }}|>{{ message['content'] }}<|end|>\n{% endfor %}"
+    "{% if add_generation_prompt %}<|assistant|>{% endif %}"
+)
+
+
+def test_small_tier_builds_prompt_with_chat_template(processor):
+    processor.small_tokenizer = make_tokenizer()
+    processor.small_tokenizer.chat_template = CHAT_TEMPLATE
+    processor.small_model = make_model(processor.small_tokenizer)
+    context = {'relevant_memories': ["Встреча в 15:00"]}
+
+    turn = processor._format_turn("Когда встреча?", context, "jarvis", "small")
+    inputs = processor._prepare_inputs("jarvis", turn, "small")
+
+    prompt = processor.small_tokenizer.decode(inputs['input_ids'][0])
+    assert prompt == processor.small_tokenizer.apply_chat_template([
+        {'role': 'system', 'content': processor._get_personality_prompt("jarvis")},
+        {'role': 'user', 'content': "Известная информация:\n- Встреча в 15:00\n\nКогда встреча?"},
+    ], tokenize=False, add_generation_prompt=True)
+    assert processor._prefix_cache[('small', 'jarvis')]['past_key_values'] is not None
+    # Большая модель без изменений - промпт строкой
+    assert processor._format_turn("Когда встреча?").endswith("Пользователь: Когда встреча?\nДжарвис:")
+
+
+def test_small_tier_without_system_role_falls_back_to_plain_prompt(processor):
+    processor.small_tokenizer = make_tokenizer()
+    processor.small_tokenizer.chat_template = (
+        "{% for message in messages %}{% if message['role'] == 'system' %}"
+        "{{ raise_exception('system role not supported') }}{% endif %}{{ message['content'] }}{% endfor %}"
+    )
+    processor.small_model = make_model(processor.small_tokenizer)
+
+    assert processor._chat_tokenizer('small') is None
+    assert processor._format_turn("Привет", None, "jarvis", "small").endswith("Джарвис:")
+
+
+def test_fallback_uses_whole_utterance_templates(processor):
+    assert processor._fallback_response("Спасибо, Джарвис") == "Всегда рад помочь, сэр"
+    assert processor._fallback_response("Привет, объясни как устроен двигатель") == "Понял вас, сэр. Чем могу помочь?"
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты маршрутизации реплик по уровням генерации
+"""
+
+from jarvis.core.nlp.router import ResponseRouter
+
+
+def _router(**config):
+    return ResponseRouter(config, templates=lambda: {'привет': "Приветствую вас, сэр", 'спасибо': "Всегда рад помочь, сэр"})
+
+
+def test_templates_only_for_short_utterances():
+    router = _router()
+
+    assert router.template("Привет!") == "Приветствую вас, сэр"
+    assert router.template("Спасибо, Джарвис") == "Всегда рад помочь, сэр"
+    assert router.template("привет, объясни мне как устроен двигатель") is None
+    assert _router(enabled=False).template("Привет") is None
+
+
+def test_templates_match_whole_utterance():
+    router = _router()
+
+    assert router.template("Джарвис, привет") == "Приветствую вас, сэр"
+    assert router.template("Спасибо, сэр!") == "Всегда рад помочь, сэр"
+    assert router.template("Привет, объясни") is None
+    assert router.template("спасибо не надо") is None
+    assert router.template("Джарвис") is None
+    assert _router(template={'address_words': []}).template("Спасибо, Джарвис") is None
+
+
+def test_cache_is_keyed_on_context_and_bounded():
+    router = _router(cache={'max_entries': 2})
+    context = {'relevant_memories': ["Встреча в 15:00"]}
+
+    router.remember("Когда встреча?", context, "В 15:00, сэр")
+    assert router.cached("когда встреча", context) == "В 15:00, сэр"
+    assert router.cached("Когда встреча?", {'relevant_memories': []}) is None
+
+    router.remember("a", None, "1")
+    router.remember("b", None, "2")
+    assert router.cached("Когда встреча?", context) is None
+    assert router.stats()['cache_size'] == 2
+
+    router.clear_cache()
+    assert router.cached("a") is None
+
+
+def test_complex_turns_escalate_to_large_model():
+    router = _router(small={'max_words': 5})
+
+    assert router.prefers_small("Какая сегодня погода")
+    assert not router.prefers_small("Почему небо голубое", kind='explanation')
+    assert not router.prefers_small("напиши код сортировки")
+    assert not router.prefers_small("раз два три четыре пять шесть")
+
+
+def test_low_confidence_answers_are_rejected_and_metrics_recorded():
+    router = _router(small={'min_confidence': 0.5})
+
+    assert router.accept("Да, сэр", confidence=0.8)
+    assert not router.accept("Возможно...", confidence=0.2)
+    assert not router.accept("Длинный ответ", confidence=0.9, truncated=True)
+    assert not router.accept("")
+
+    router.record('small', 0.2)
+    router.record('small', 0.4)
+    stats = router.stats()
+    assert stats['escalations'] == 3
+    assert stats['small']['count'] == 2
+    assert abs(stats['small']['avg_ms'] - 300) < 1e-6
+    assert abs(stats['small']['max_ms'] - 400) < 1e-6
+    assert stats['large']['count'] == 0
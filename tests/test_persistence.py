@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты отложенного атомарного сохранения JSON
+"""
+
+import json
+import time
+
+from jarvis.utils.persistence import DebouncedJsonWriter, write_json_atomic
+
+
+def test_burst_of_changes_is_written_once(tmp_path):
+    writer = DebouncedJsonWriter(delay=0.2, max_delay=2.0)
+    path = tmp_path / "tasks.json"
+    tasks = []
+
+    for i in range(100):
+        tasks.append({'id': i})
+        writer.mark_dirty(path, lambda: tasks)
+
+    deadline = time.monotonic() + 5
+    while writer.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.close()
+
+    assert writer.stats['marked'] == 100
+    assert writer.stats['written'] == 1
+    assert json.loads(path.read_text(encoding='utf-8')) == tasks
+    assert not (tmp_path / "tasks.json.tmp").exists()
+
+
+def test_close_flushes_pending_and_writes_compact(tmp_path):
+    writer = DebouncedJsonWriter(delay=60, max_delay=60)
+    path = tmp_path / "nested" / "profile.json"
+    writer.mark_dirty(path, lambda: {'name': 'сэр', 'preferences': {}})
+
+    assert not path.exists()
+    assert writer.close()
+    assert path.read_text(encoding='utf-8') == '{"name":"сэр","preferences":{}}'
+
+    # После закрытия изменения пишутся сразу
+    writer.mark_dirty(path, lambda: {'name': 'Тони'})
+    assert json.loads(path.read_text(encoding='utf-8')) == {'name': 'Тони'}
+
+
+def test_atomic_write_replaces_existing_file(tmp_path):
+    path = tmp_path / "stats.json"
+    path.write_text("старое", encoding='utf-8')
+
+    write_json_atomic(path, {'total': 3})
+
+    assert json.loads(path.read_text(encoding='utf-8')) == {'total': 3}
+    assert [p.name for p in tmp_path.iterdir()] == ["stats.json"]
+
+
+def test_changing_data_is_retried_after_close_without_deadlock(tmp_path):
+    writer = DebouncedJsonWriter(delay=60, max_delay=60)
+    path = tmp_path / "profile.json"
+    failures = [RuntimeError("dictionary changed size during iteration")]
+
+    def producer():
+        if failures:
+            raise failures.pop()
+        return {'name': 'сэр'}
+
+    writer.mark_dirty(path, producer)
+    assert writer.close()
+    assert json.loads(path.read_text(encoding='utf-8')) == {'name': 'сэр'}
+    assert writer.pending() == 0
+
+
+def test_always_changing_data_stays_pending(tmp_path):
+    writer = DebouncedJsonWriter(delay=60, max_delay=60)
+    path = tmp_path / "profile.json"
+    calls = []
+
+    def producer():
+        calls.append(1)
+        raise RuntimeError("dictionary changed size during iteration")
+
+    writer.close()
+    writer.mark_dirty(path, producer)
+
+    assert len(calls) == DebouncedJsonWriter.SERIALIZE_ATTEMPTS
+    assert writer.pending() == 1
+    assert not path.exists()
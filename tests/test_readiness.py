@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты фоновой загрузки компонентов
+"""
+
+import asyncio
+import threading
+
+from jarvis.utils.readiness import Readiness, READY, FAILED
+
+
+def test_components_load_in_background_with_dependencies():
+    readiness = Readiness()
+    release = threading.Event()
+    order = []
+
+    def load_memory():
+        release.wait(5)
+        order.append('memory')
+
+    readiness.start('memory', load_memory)
+    readiness.start('learning', lambda: order.append('learning'), after=['memory'])
+
+    # Загрузка не блокирует вызывающий поток
+    assert not readiness.is_ready('memory')
+    assert not readiness.wait('learning', timeout=0.05)
+
+    release.set()
+    assert readiness.wait('learning', timeout=5)
+    assert order == ['memory', 'learning']
+    assert readiness.status()['memory']['state'] == READY
+
+
+def test_failed_component_reports_error_and_wait_async():
+    readiness = Readiness()
+    readiness.mark_ready('tts')
+
+    def broken():
+        raise FileNotFoundError("Модель Vosk не найдена")
+
+    readiness.start('stt', broken)
+
+    async def wait_all():
+        return await readiness.wait_async('tts'), await readiness.wait_async('stt', timeout=5)
+
+    assert asyncio.run(wait_all()) == (True, False)
+    assert readiness.status()['stt'] == {
+        'state': FAILED, 'seconds': readiness.status()['stt']['seconds'], 'error': "Модель Vosk не найдена"
+    }
+
+
+def test_dependents_of_failed_component_are_not_loaded():
+    readiness = Readiness()
+    loaded = []
+
+    def broken():
+        raise RuntimeError("база повреждена")
+
+    readiness.start('memory', broken)
+    readiness.start('learning', lambda: loaded.append('learning'), after=['memory'])
+    readiness.start('scheduler', lambda: loaded.append('scheduler'), after=['learning'])
+
+    assert not readiness.wait('scheduler', timeout=5)
+    assert loaded == []
+    status = readiness.status()
+    assert status['learning']['state'] == FAILED
+    assert status['learning']['error'] == "не загружены зависимости: memory"
+    assert status['scheduler']['error'] == "не загружены зависимости: learning"
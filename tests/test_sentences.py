@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты нарезки потокового ответа на предложения
+"""
+
+import asyncio
+
+from jarvis.utils.sentences import iter_sentences, split_at_stop
+
+
+async def _stream(pieces):
+    for piece in pieces:
+        yield piece
+
+
+def _collect(pieces, **kwargs):
+    async def run():
+        return [sentence async for sentence in iter_sentences(_stream(pieces), **kwargs)]
+    return asyncio.run(run())
+
+
+def test_sentences_are_cut_as_tokens_arrive():
+    pieces = ["Добр", "ый день", ", сэр. Сего", "дня ясно", "! Напомнить о «встрече.» ", "Готово"]
+
+    assert _collect(pieces) == [
+        "Добрый день, сэр.",
+        "Сегодня ясно!",
+        "Напомнить о «встрече.»",
+        "Готово",
+    ]
+
+
+def test_short_fragments_are_joined_and_numbers_are_not_split():
+    assert _collect(["Да. Вер", "сия 3.14 готова.\nВсё"]) == ["Да. Версия 3.14 готова.", "Всё"]
+
+
+def test_split_at_stop_holds_back_marker_prefix():
+    stops = ("Пользователь:",)
+
+    assert split_at_stop("Хорошо, сэр.\nПольз", stops) == ("Хорошо, сэр.\n", False)
+    assert split_at_stop("Хорошо, сэр.\nПользователь: а", stops) == ("Хорошо, сэр.\n", True)
+    assert split_at_stop("Хорошо, сэр.", stops) == ("Хорошо, сэр.", False)
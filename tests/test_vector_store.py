@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты встроенного векторного хранилища NumPy + SQLite
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from jarvis.core.memory.vector_store import NumpyVectorStore, create_vector_store, vector_store_path
+
+
+def _vectors(count, dim=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+
+
+def test_exact_search_across_shards(tmp_path):
+    store = NumpyVectorStore(tmp_path / "store", shard_rows=8)
+    vectors = _vectors(30)
+    ids = [f"m{i}" for i in range(30)]
+    metas = [{'type': 'fact' if i % 3 == 0 else 'knowledge', 'importance': i / 30} for i in range(30)]
+    store.add(ids, [f"документ номер {i}" for i in range(30)], metas, vectors)
+
+    assert len(list((tmp_path / "store").glob("vectors_*.npy"))) == 4
+
+    result = store.query(vectors[[5, 25]], n_results=3)
+    assert [hits[0] for hits in result['ids']] == ['m5', 'm25']
+    assert result['distances'][1][0] < 1e-5
+
+    filtered = store.query(vectors[5:6], n_results=4, where={'importance': {'$gte': 0.5}})
+    assert all(int(i[1:]) >= 15 for i in filtered['ids'][0])
+
+    found = store.get(where={'type': 'fact'}, where_document={'$contains': 'номер 2'}, include=["documents"])
+    assert found['ids'] == ['m21', 'm24', 'm27']
+
+
+def test_upsert_delete_and_reopen(tmp_path):
+    store = NumpyVectorStore(tmp_path / "store", shard_rows=4)
+    vectors = _vectors(6)
+    store.add([f"m{i}" for i in range(6)], ['x'] * 6, [{'type': 'a'}] * 6, vectors)
+
+    store.upsert(['m1'], ['новый'], [{'type': 'b'}], vectors[4:5])
+    store.delete(['m4'])
+    store.close()
+
+    reopened = NumpyVectorStore(tmp_path / "store", shard_rows=128)
+    assert reopened.shard_rows == 4
+    assert reopened.count() == 5
+
+    hits = reopened.query(vectors[4:5], n_results=2, include=["documents", "metadatas", "distances", "embeddings"])
+    assert hits['ids'][0][0] == 'm1'
+    assert hits['metadatas'][0][0] == {'type': 'b'}
+    assert np.allclose(hits['embeddings'][0][0], vectors[4] / np.linalg.norm(vectors[4]), atol=1e-6)
+
+    assert reopened.get(ids=['m1', 'm4'])['documents'] == ['новый']
+
+
+def test_factory_selects_backend(tmp_path):
+    config = {'vector_store': {'backend': 'numpy', 'path': str(tmp_path / "vs"), 'dtype': 'int8'}}
+    store = create_vector_store(config)
+    assert isinstance(store, NumpyVectorStore)
+    assert store.dtype == 'int8'
+
+    assert str(vector_store_path({'vector_db_path': 'data/db'})) == 'data/db'
+    with pytest.raises(ValueError):
+        create_vector_store({'vector_store': {'backend': 'faiss'}})
+
+
+def test_filters_on_indexed_fields_use_columns(tmp_path):
+    store = NumpyVectorStore(tmp_path / "store")
+    metas = [{'type': 'knowledge', 'content_hash': f"h{i}", 'epoch': float(i), 'importance': 0.5}
+             for i in range(4)]
+    store.add([f"m{i}" for i in range(4)], ['x'] * 4, metas, _vectors(4))
+
+    assert store.get(where={'content_hash': {'$in': ['h1', 'h3']}})['ids'] == ['m1', 'm3']
+    assert store.count_matching(where={'$and': [{'epoch': {'$lt': 2}}, {'importance': {'$lt': 0.7}}]}) == 2
+
+    store.update(['m0'], [dict(metas[0], content_hash='new')])
+    assert store.get(where={'content_hash': 'new'})['ids'] == ['m0']
+
+    plan = " ".join(row[-1] for row in store._db.execute(
+        "EXPLAIN QUERY PLAN SELECT row FROM records WHERE deleted = 0 AND content_hash IN (?)", ['h1']
+    ))
+    assert "records_content_hash" in plan
+
+
+def test_columns_are_added_to_existing_store(tmp_path):
+    import sqlite3
+
+    path = tmp_path / "store"
+    store = NumpyVectorStore(path)
+    store.add(['old'], ['x'], [{'type': 'fact', 'content_hash': 'abc'}], _vectors(1))
+    store.close()
+
+    # Хранилище в старой схеме: без генерируемых столбцов
+    db = sqlite3.connect(str(path / "records.sqlite"))
+    for field in ('content_hash', 'epoch', 'timestamp', 'importance'):
+        db.execute(f"DROP INDEX records_{field}")
+        db.execute(f"ALTER TABLE records DROP COLUMN {field}")
+    db.commit()
+    db.close()
+
+    store = NumpyVectorStore(path)
+    assert store.count_matching(where={'content_hash': 'abc'}) == 1